@@ -1,8 +1,9 @@
 # Gasby_Ai/action_service/app.py
 
 import cv2
-import json
 import os
+import sys
+import time
 import boto3
 import subprocess
 import traceback
@@ -10,14 +11,22 @@ import traceback
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import dotenv_values
+from botocore.exceptions import ClientError
 
-from service.tracking import build_tracks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.tracking import build_tracks, fragmentation
+from service.track_stitching import stitch_tracks
 from service.action_recognition import run_action_recognition
 from service.game_intelligence import enrich_game_intelligence
 from service.highlight_engine import generate_highlights
 from service.tts_engine import generate_tts_audio_from_events
 from service.commentary_engine import generate_gemini_commentary
 from service.instagram_engine import post_broadcast_and_highlights
+from common.detection_format import load_detections, DETECTION_NPZ, DETECTION_JSON
+from common.detection_stream import DetectionStream, DETECTION_STREAM, STREAM_MANIFEST
+from common.s3_transfer import parallel_download
+from common.metrics import Metrics
 
 
 # ---------------------------------------------------------
@@ -33,7 +42,8 @@ s3 = boto3.client(
     "s3",
     aws_access_key_id=env.get("AWS_ACCESS_KEY_ID"),
     aws_secret_access_key=env.get("AWS_SECRET_ACCESS_KEY"),
-    region_name="us-east-1"
+    region_name="us-east-1",
+    endpoint_url=env.get("S3_ENDPOINT_URL") or None
 )
 
 VIDEO_BUCKET = "gasby-reqs"
@@ -43,6 +53,65 @@ OUTPUT_BUCKET = "gasby-action-result"
 app = Flask(__name__)
 CORS(app)
 
+metrics = Metrics("action")
+
+
+# ---------------------------------------------------------
+# DETECTIONS
+# ---------------------------------------------------------
+
+def detection_stream(uuid, local_path, tail=False):
+    """
+    Opens the chunked detection stream in S3, or returns None if there is
+    none. With `tail`, waits for the stream to appear, so a request can
+    start while YOLO is still writing it.
+    """
+
+    def fetch(name, path):
+        try:
+            s3.download_file(DETECTION_BUCKET, f"{uuid}/{DETECTION_STREAM}/{name}", path)
+            return True
+        except ClientError:
+            return False
+
+    directory = f"{local_path}/{DETECTION_STREAM}"
+    os.makedirs(directory, exist_ok=True)
+
+    if not tail and not fetch(STREAM_MANIFEST, f"{directory}/{STREAM_MANIFEST}"):
+        return None
+
+    return DetectionStream(
+        directory,
+        fetch=fetch,
+        poll_sec=float(env.get("DETECTION_STREAM_POLL_SEC") or 1.0),
+        timeout=float(env.get("DETECTION_STREAM_TIMEOUT_SEC") or 3600)
+    )
+
+
+def download_detections(uuid, local_path, tail=False):
+    """
+    Fetches the detections: the chunked stream if YOLO wrote one, else the
+    NPZ, falling back to JSON for older results. Streams are returned
+    already open; files are returned as local paths.
+    """
+
+    stream = detection_stream(uuid, local_path, tail)
+
+    if stream is not None:
+        return stream
+
+    npz_path = f"{local_path}/{DETECTION_NPZ}"
+
+    try:
+        parallel_download(s3, DETECTION_BUCKET, f"{uuid}/{DETECTION_NPZ}", npz_path)
+        return npz_path
+    except ClientError:
+        print("⚠ No NPZ detections found, falling back to JSON.")
+
+    json_path = f"{local_path}/{DETECTION_JSON}"
+    parallel_download(s3, DETECTION_BUCKET, f"{uuid}/{DETECTION_JSON}", json_path)
+    return json_path
+
 
 # ---------------------------------------------------------
 # BUILD TIMELINE
@@ -71,6 +140,9 @@ def predict():
 
     uuid = request.json.get("uuid")
 
+    # Tail the detection stream while YOLO is still running
+    tail = bool(request.json.get("stream", False))
+
     if not uuid:
         return jsonify({"status": "error", "message": "UUID missing"}), 400
 
@@ -83,22 +155,25 @@ def predict():
     os.makedirs(local_path, exist_ok=True)
     os.makedirs(output_path, exist_ok=True)
 
+    timer = metrics.request(uuid)
+
     try:
 
         # -------------------------------------------------
         # DOWNLOAD FROM S3
         # -------------------------------------------------
 
-        print("⬇ Downloading video + detection JSON...")
+        print("⬇ Downloading video + detections...")
 
         video_path = f"{local_path}/{uuid}.mp4"
-        json_path = f"{local_path}/frame_level_detection.json"
 
-        s3.download_file(VIDEO_BUCKET, f"{uuid}/{uuid}.mp4", video_path)
-        s3.download_file(DETECTION_BUCKET, f"{uuid}/frame_level_detection.json", json_path)
+        with timer.stage("download"):
+            parallel_download(s3, VIDEO_BUCKET, f"{uuid}/{uuid}.mp4", video_path)
+            detections = download_detections(uuid, local_path, tail)
 
-        with open(json_path) as f:
-            frame_data = json.load(f)
+        # A stream is read while tracking consumes it and replayed by later stages
+        with timer.stage("load_detections"):
+            frame_data = detections if isinstance(detections, DetectionStream) else load_detections(detections)
 
         # -------------------------------------------------
         # GET FPS
@@ -114,39 +189,62 @@ def predict():
         # TRACKING
         # -------------------------------------------------
 
-        tracked_players = build_tracks(frame_data)
-
-        # -------------------------------------------------
-        # LOAD FRAMES
-        # -------------------------------------------------
+        with timer.stage("tracking"):
+            tracked_players = build_tracks(
+                frame_data,
+                motion=(env.get("TRACKING_MOTION") or "1") != "0",
+                fps=fps
+            )
 
-        cap = cv2.VideoCapture(video_path)
-        video_frames = []
+        # Merge tracklets of the same player, so each starts no extra CNN windows
+        stitch_report = None
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            video_frames.append(frame)
+        if (env.get("TRACK_STITCHING") or "1") != "0":
+            with timer.stage("stitching"):
+                tracked_players, stitch_report = stitch_tracks(tracked_players, video_path, fps)
 
-        cap.release()
+        tracking_report = dict(fragmentation(tracked_players), stitching=stitch_report)
+        print("🧵 Track Fragmentation:", tracking_report)
 
         # -------------------------------------------------
         # ACTION RECOGNITION
         # -------------------------------------------------
 
-        cnn_events = run_action_recognition(video_frames, tracked_players)
+        # Frames are decoded on demand: only those the clips reference,
+        # keeping crops rather than full frames. Decoding and cropping run
+        # interleaved with inference, so they are timed inside the provider
+        # and reported as their own stage.
+        cnn_start = time.perf_counter()
+        cnn_report = {}
+        clips_per_slice = env.get("ACTION_CLIPS_PER_SLICE")
+
+        cnn_events = run_action_recognition(
+            video_path,
+            tracked_players,
+            crop_budget_mb=float(env.get("ACTION_CROP_BUDGET_MB") or 0) or None,
+            batch_size=int(env.get("ACTION_BATCH_SIZE") or 0) or None,
+            frame_detections=frame_data,
+            fps=fps,
+            clips_per_slice=int(clips_per_slice) if clips_per_slice else None,
+            static_gate=(env.get("ACTION_STATIC_GATE") or "0") != "0",
+            report=cnn_report
+        )
+
+        decode_sec = cnn_report["frames"]["decode_sec"]
+        timer.add("decode", decode_sec)
+        timer.add("cnn", time.perf_counter() - cnn_start - decode_sec)
 
         # -------------------------------------------------
         # GAME INTELLIGENCE
         # -------------------------------------------------
 
-        enriched_events = enrich_game_intelligence(
-            players=tracked_players,
-            fps=fps,
-            frame_detections=frame_data,
-            cnn_events=cnn_events
-        )
+        with timer.stage("game_intelligence"):
+            enriched_events = enrich_game_intelligence(
+                players=tracked_players,
+                fps=fps,
+                frame_detections=frame_data,
+                cnn_events=cnn_events
+            )
 
         # -------------------------------------------------
         # FILTER EVENTS
@@ -168,7 +266,8 @@ def predict():
         # -------------------------------------------------
 
         print("🎙 Generating commentary...")
-        commentary = generate_gemini_commentary(timeline)
+        with timer.stage("commentary"):
+            commentary = generate_gemini_commentary(timeline)
 
         if not commentary:
             print("⚠ Using fallback commentary.")
@@ -186,7 +285,8 @@ def predict():
 
         audio_path = f"{output_path}/{uuid}_commentary.mp3"
 
-        tts_success = generate_tts_audio_from_events(commentary, audio_path)
+        with timer.stage("tts"):
+            tts_success = generate_tts_audio_from_events(commentary, audio_path)
 
         if not tts_success:
             print("❌ TTS failed.")
@@ -200,16 +300,17 @@ def predict():
 
         print("🎬 Merging broadcast video...")
 
-        merge_process = subprocess.run([
-            "ffmpeg", "-y",
-            "-i", video_path,
-            "-i", audio_path,
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            "-movflags", "+faststart",
-            "-c:a", "aac",
-            final_video
-        ])
+        with timer.stage("ffmpeg_merge"):
+            merge_process = subprocess.run([
+                "ffmpeg", "-y",
+                "-i", video_path,
+                "-i", audio_path,
+                "-c:v", "libx264",
+                "-pix_fmt", "yuv420p",
+                "-movflags", "+faststart",
+                "-c:a", "aac",
+                final_video
+            ])
 
         if merge_process.returncode != 0 or not os.path.exists(final_video):
             print("❌ Broadcast video creation failed.")
@@ -221,12 +322,13 @@ def predict():
 
         highlight_video_path = f"{output_path}/{uuid}_highlights.mp4"
 
-        generate_highlights(
-            video_path,
-            filtered_events,
-            fps,
-            highlight_video_path
-        )
+        with timer.stage("highlights"):
+            generate_highlights(
+                video_path,
+                filtered_events,
+                fps,
+                highlight_video_path
+            )
 
         # -------------------------------------------------
         # UPLOAD TO S3
@@ -237,15 +339,16 @@ def predict():
         broadcast_key = f"{uuid}/{uuid}_broadcast.mp4"
         highlight_key = f"{uuid}/{uuid}_highlights.mp4"
 
-        if os.path.exists(final_video):
-            s3.upload_file(final_video, OUTPUT_BUCKET, broadcast_key)
-        else:
+        if not os.path.exists(final_video):
             return jsonify({"status": "error", "message": "Broadcast missing"}), 500
 
-        if os.path.exists(highlight_video_path):
-            s3.upload_file(highlight_video_path, OUTPUT_BUCKET, highlight_key)
-        else:
-            print("⚠ Highlight video not generated. Skipping upload.")
+        with timer.stage("upload"):
+            s3.upload_file(final_video, OUTPUT_BUCKET, broadcast_key)
+
+            if os.path.exists(highlight_video_path):
+                s3.upload_file(highlight_video_path, OUTPUT_BUCKET, highlight_key)
+            else:
+                print("⚠ Highlight video not generated. Skipping upload.")
 
         broadcast_url = f"https://{OUTPUT_BUCKET}.s3.amazonaws.com/{broadcast_key}"
         highlight_url = f"https://{OUTPUT_BUCKET}.s3.amazonaws.com/{highlight_key}"
@@ -256,12 +359,13 @@ def predict():
 
         print("🚀 Posting to Instagram...")
 
-        ig_results = post_broadcast_and_highlights(
-            broadcast_url=broadcast_url,
-            highlight_url=highlight_url,
-            access_token=IG_ACCESS_TOKEN,
-            ig_user_id=IG_USER_ID
-        )
+        with timer.stage("instagram"):
+            ig_results = post_broadcast_and_highlights(
+                broadcast_url=broadcast_url,
+                highlight_url=highlight_url,
+                access_token=IG_ACCESS_TOKEN,
+                ig_user_id=IG_USER_ID
+            )
 
         print("📲 Instagram Results:", ig_results)
 
@@ -269,7 +373,10 @@ def predict():
 
         return jsonify({
             "status": "success",
-            "instagram": ig_results
+            "instagram": ig_results,
+            "tracking": tracking_report,
+            "action_recognition": cnn_report,
+            "timings": timer.finish("success")
         })
 
     except Exception:
@@ -277,6 +384,19 @@ def predict():
         print(traceback.format_exc())
         return jsonify({"status": "error"}), 500
 
+    finally:
+        # Early error returns and exceptions land here without a breakdown
+        timer.finish("error")
+
+
+@app.route("/action-predict/metrics", methods=["GET"])
+def metrics_endpoint():
+
+    if request.args.get("format") == "prometheus":
+        return metrics.prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    return jsonify(metrics.snapshot())
+
 
 if __name__ == "__main__":
     app.run(port=5001, debug=False)
\ No newline at end of file
@@ -3,13 +3,13 @@
 # Gasby-Ai/action_service/service/action_recognition.py
 
 from __future__ import print_function
-import numpy as np
-import cv2
 from easydict import EasyDict
 import torch
 import torch.nn as nn
 from torchvision import models
 from utils.checkpoints import load_weights
+from service.frame_provider import ClipCropProvider, plan_clips, CROP_H, CROP_W
+from service.clip_gating import gate_clips, is_static
 
 
 # =====================================================
@@ -41,7 +41,22 @@ args = EasyDict({
 
     # 🔥 Increased stride for speed
     'seq_length': 8,
-    'vid_stride': 16   # was 8 → now 16 (2x faster)
+    'vid_stride': 16,   # was 8 → now 16 (2x faster)
+
+    # Crops held in memory while clips are filled (frames are never kept)
+    'crop_budget_mb': 512,
+
+    # Clips per forward pass, across players
+    'batch_size': 16,
+
+    # Ball-proximity gating: best clips kept per time slice. Off (0, every
+    # clip runs) until event recall is measured; e.g. 4 to enable
+    'gate_slice_sec': 2.0,
+    'gate_clips_per_slice': 0,
+
+    # Still player + unchanged crops -> no_action without a CNN pass. Off
+    # until benchmarks/static_gating shows time saved with events kept
+    'static_gate': False
 })
 
 
@@ -66,97 +81,155 @@ print("✅ 3D CNN Ready")
 
 
 # =====================================================
-# SAFE CROP
+# OPTIMIZED 3D CNN PIPELINE
 # =====================================================
 
-def cropVideo(clip, crop_window):
+class ClipBatch:
+    """
+    Reusable buffers for one batch: a uint8 host array that crops are
+    copied into (pinned on CUDA, so the transfer is asynchronous) and the
+    float model input on the device.
+    """
 
-    processed = []
+    def __init__(self, batch_size, seq_length):
 
-    min_len = min(len(clip), len(crop_window))
+        host = torch.empty((batch_size, seq_length, CROP_H, CROP_W, 3), dtype=torch.uint8)
 
-    for i in range(min_len):
+        if device.type == "cuda":
+            host = host.pin_memory()
 
-        frame = clip[i]
-        h, w, _ = frame.shape
+        self.host = host
+        self.array = host.numpy()
+        self.inputs = torch.empty(
+            (batch_size, 3, seq_length, CROP_H, CROP_W), dtype=torch.float32, device=device
+        )
 
-        try:
-            x1, y1, x2, y2 = map(int, crop_window[i])
-        except:
-            processed.append(np.zeros((176, 128, 3), dtype=np.uint8))
-            continue
 
-        x1 = max(0, min(x1, w - 1))
-        x2 = max(0, min(x2, w - 1))
-        y1 = max(0, min(y1, h - 1))
-        y2 = max(0, min(y2, h - 1))
+def classify_clips(batch, inputs=None):
+    """
+    Labels a (B, seq_length, 176, 128, 3) uint8 batch in one forward pass.
+    The batch is moved as uint8, then converted, permuted and normalized
+    in place inside `inputs` (allocated if not given).
+    """
 
-        if x2 <= x1 or y2 <= y1:
-            resized = np.zeros((176, 128, 3), dtype=np.uint8)
-        else:
-            cropped = frame[y1:y2, x1:x2]
-            resized = cv2.resize(cropped, (128, 176))
+    n = len(batch)
 
-        processed.append(resized)
+    with torch.inference_mode():
 
-    return processed
+        host = batch if torch.is_tensor(batch) else torch.from_numpy(batch)
 
+        if inputs is None:
+            inputs = torch.empty(
+                (n, 3) + tuple(host.shape[1:4]), dtype=torch.float32, device=device
+            )
 
-# =====================================================
-# OPTIMIZED 3D CNN PIPELINE
-# =====================================================
+        input_tensor = inputs[:n]
+        input_tensor.copy_(host.to(device, non_blocking=True).permute(0, 4, 1, 2, 3))
+        input_tensor.div_(255.0)
+
+        # tolist() synchronizes, so the host buffer is free to refill on return
+        preds = ACTION_MODEL(input_tensor).argmax(1).tolist()
+
+    return [args.labels.get(str(pred), "unknown") for pred in preds]
+
+
+def run_action_recognition(video, tracked_players, crop_budget_mb=None, batch_size=None,
+                           frame_detections=None, fps=30, clips_per_slice=None, static_gate=None,
+                           report=None):
+    """
+    `video` is the video file path (frames are decoded on demand, see
+    frame_provider) or a list of already decoded frames.
+
+    Given `frame_detections`, only the clips nearest the ball / most in
+    motion are classified: `clips_per_slice` per args.gate_slice_sec
+    (args.gate_clips_per_slice by default, 0 runs every clip).
 
-def run_action_recognition(videoFrames, tracked_players):
+    With `static_gate` (args.static_gate by default), clips whose player
+    stands still are labelled no_action without running the CNN.
+
+    Clips from all players are classified together in batches of
+    `batch_size` (args.batch_size by default). `report`, if given, is
+    filled with the gating and frame access stats and per-label counts.
+    """
 
     print("🎯 Running Optimized 3D CNN Action Recognition...")
 
     cnn_events = []
 
-    for player in tracked_players:
+    clips = plan_clips(tracked_players, args.seq_length, args.vid_stride)
 
-        bbox_items = sorted(player.bboxes.items())
+    if clips_per_slice is None:
+        clips_per_slice = args.gate_clips_per_slice
 
-        # 🔥 Skip very short tracks
-        if len(bbox_items) < args.seq_length:
-            continue
+    if frame_detections is None:
+        clips_per_slice = 0
 
-        for start in range(0, len(bbox_items) - args.seq_length + 1, args.vid_stride):
+    clips, gating = gate_clips(clips, frame_detections, fps, args.gate_slice_sec, clips_per_slice)
+    print("🏀 Clip Gating:", gating)
 
-            clip_boxes = bbox_items[start:start + args.seq_length]
-            frame_indices = [f[0] for f in clip_boxes]
+    budget_mb = crop_budget_mb or args.crop_budget_mb
+    provider = ClipCropProvider(video, clips, budget_mb * 1024 * 1024)
 
-            clip_frames = []
-            for idx in frame_indices:
-                if idx < len(videoFrames):
-                    clip_frames.append(videoFrames[idx])
+    batch_size = max(1, int(batch_size or args.batch_size))
 
-            if len(clip_frames) != args.seq_length:
-                continue
+    # Crops are copied in, since the provider recycles a clip's buffer once the next one is requested
+    batch = ClipBatch(batch_size, args.seq_length)
+    batch_clips = []
 
-            crop_boxes = [f[1] for f in clip_boxes]
-            cropped = cropVideo(clip_frames, crop_boxes)
+    if static_gate is None:
+        static_gate = args.static_gate
 
-            if len(cropped) != args.seq_length:
-                continue
+    label_counts = {}
+    static_clips = 0
 
-            input_array = np.array(cropped, dtype=np.float32) / 255.0
-            input_tensor = torch.tensor(input_array).unsqueeze(0)
-            input_tensor = input_tensor.permute(0, 4, 1, 2, 3).to(device)
+    def flush():
 
-            with torch.no_grad():
-                output = ACTION_MODEL(input_tensor)
-                _, pred = torch.max(output, 1)
+        labels = classify_clips(batch.host[:len(batch_clips)], batch.inputs)
 
-            action_label = args.labels.get(str(pred.item()), "unknown")
+        for (order, frame, team), action_label in zip(batch_clips, labels):
 
-            if action_label not in ["no_action", "unknown"]:
+            label_counts[action_label] = label_counts.get(action_label, 0) + 1
 
-                cnn_events.append({
+            if action_label not in ["no_action", "unknown"]:
+                cnn_events.append((order, {
                     "type": action_label,
-                    "frame": frame_indices[0],
-                    "team": getattr(player, "team", "unknown"),
+                    "frame": frame,
+                    "team": team,
                     "source": "cnn"
-                })
+                }))
+
+        batch_clips.clear()
+
+    for clip in provider:
+
+        # Synthesized no_action: counted like a CNN result, never an event
+        if static_gate and is_static(clip):
+            static_clips += 1
+            label_counts["no_action"] = label_counts.get("no_action", 0) + 1
+            continue
+
+        batch.array[len(batch_clips)] = clip.crops
+        batch_clips.append((clip.order, clip.frames[0], getattr(clip.player, "team", "unknown")))
+
+        if len(batch_clips) == batch_size:
+            flush()
+
+    if batch_clips:
+        flush()
+
+    # Clips complete in frame order; keep the per-player order events always had
+    cnn_events = [event for _, event in sorted(cnn_events, key=lambda e: e[0])]
+
+    print("🎞 Clip Frames:", provider.stats())
+    print("🧍 Static Clips Skipped:", static_clips)
+
+    if report is not None:
+        report.update(
+            gating=gating,
+            static={"enabled": bool(static_gate), "skipped": static_clips},
+            labels=label_counts,
+            frames=provider.stats()
+        )
 
     print("🔥 CNN Events:", len(cnn_events))
-    return cnn_events
\ No newline at end of file
+    return cnn_events
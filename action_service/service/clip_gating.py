@@ -0,0 +1,182 @@
+# Gasby-Ai/action_service/service/clip_gating.py
+#
+# Chooses which action clips are worth a CNN pass.
+#
+# Each planned clip is scored from the detections alone: how close the
+# player is to the ball over the clip, and how much they move. Clips are
+# grouped into time slices by start frame and only the best K per slice
+# are kept, which caps CNN work per second of video no matter how many
+# players are tracked.
+#
+# Static clips (free throws, timeouts) are also recognised without the
+# CNN: a box that barely moves and crops that barely change.
+
+import math
+
+import cv2
+import numpy as np
+
+
+# Ball positions are interpolated across detection gaps up to this long
+BALL_MAX_GAP_SEC = 1.0
+
+# Proximity falls to 1/e at this many box heights from the ball
+PROXIMITY_SCALE = 1.5
+
+PROXIMITY_WEIGHT = 1.0
+MOTION_WEIGHT = 0.25
+
+# Static clip: box path under this many box heights and mean absolute
+# difference between consecutive crops under this many grey levels
+STATIC_DISPLACEMENT = 0.15
+STATIC_PIXEL_DIFF = 4.0
+
+
+# =====================================================
+# BALL PROXIMITY
+# =====================================================
+
+def _centers_heights(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64)
+    centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+    return centers, np.maximum(boxes[:, 3] - boxes[:, 1], 1.0)
+
+
+def box_path(clip):
+    """Distance the box centre travels over the clip, in mean box heights."""
+
+    centers, heights = _centers_heights(clip.boxes)
+    return float(np.linalg.norm(np.diff(centers, axis=0), axis=1).sum() / heights.mean())
+
+
+class BallTrack:
+    """Ball position at any frame, interpolated between nearby detections."""
+
+    def __init__(self, frame_detections, fps):
+
+        frames, positions = [], []
+
+        for record in frame_detections:
+            if record.get("ball") is not None:
+                frames.append(record["frame"])
+                positions.append(record["ball"])
+
+        self.frames = np.asarray(frames, dtype=np.float64)
+        self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        self.max_gap = BALL_MAX_GAP_SEC * fps
+
+    def at(self, frames):
+        """(len(frames), 2) positions; NaN where the ball is unknown."""
+
+        frames = np.asarray(frames, dtype=np.float64)
+        out = np.full((len(frames), 2), np.nan)
+
+        if len(self.frames) == 0:
+            return out
+
+        right = np.searchsorted(self.frames, frames).clip(1, len(self.frames) - 1)
+        left = right - 1
+
+        f0, f1 = self.frames[left], self.frames[right]
+
+        exact_left = frames == f0
+        exact_right = frames == f1
+        between = (f0 < frames) & (frames < f1) & (f1 - f0 <= self.max_gap)
+
+        t = ((frames - f0) / np.maximum(f1 - f0, 1))[:, None]
+        interpolated = self.positions[left] * (1 - t) + self.positions[right] * t
+
+        out[between] = interpolated[between]
+        out[exact_left] = self.positions[left][exact_left]
+        out[exact_right] = self.positions[right][exact_right]
+
+        return out
+
+
+def clip_score(clip, ball):
+    """Ball proximity (0..1, mean over frames where the ball is known) plus weighted motion."""
+
+    centers, heights = _centers_heights(clip.boxes)
+
+    positions = ball.at(clip.frames)
+    known = ~np.isnan(positions[:, 0])
+
+    proximity = 0.0
+
+    if known.any():
+        distance = np.linalg.norm(centers[known] - positions[known], axis=1) / heights[known]
+        proximity = float(np.exp(-distance / PROXIMITY_SCALE).mean())
+
+    # Path length in box heights, squashed to 0..1
+    motion = 1.0 - math.exp(-box_path(clip))
+
+    return PROXIMITY_WEIGHT * proximity + MOTION_WEIGHT * motion
+
+
+def gate_clips(clips, frame_detections, fps, slice_sec, clips_per_slice):
+    """
+    Keeps the `clips_per_slice` best-scoring clips of every `slice_sec`
+    window (by start frame). Returns (kept clips in plan order, report).
+    `clips_per_slice` <= 0 keeps everything.
+    """
+
+    if clips_per_slice <= 0 or not clips:
+        return clips, {"enabled": False, "planned": len(clips), "kept": len(clips), "skipped": 0}
+
+    ball = BallTrack(frame_detections, fps)
+    slice_frames = max(1, int(round(slice_sec * fps)))
+
+    slices = {}
+
+    for clip in clips:
+        slices.setdefault(clip.frames[0] // slice_frames, []).append((clip_score(clip, ball), clip))
+
+    kept = []
+    full_slices = 0
+
+    for scored in slices.values():
+        if len(scored) > clips_per_slice:
+            full_slices += 1
+        scored.sort(key=lambda s: -s[0])
+        kept.extend(clip for _, clip in scored[:clips_per_slice])
+
+    kept.sort(key=lambda clip: clip.order)
+
+    report = {
+        "enabled": True,
+        "planned": len(clips),
+        "kept": len(kept),
+        "skipped": len(clips) - len(kept),
+        "slices": len(slices),
+        "slices_over_budget": full_slices,
+        "slice_sec": slice_sec,
+        "clips_per_slice": clips_per_slice,
+        "ball_detections": len(ball.frames)
+    }
+
+    return kept, report
+
+
+# =====================================================
+# STATIC CLIPS
+# =====================================================
+
+def crop_difference(crops):
+    """Mean absolute difference between consecutive crops, in grey levels."""
+
+    if len(crops) < 2:
+        return 0.0
+
+    return float(np.mean([cv2.absdiff(a, b).mean() for a, b in zip(crops[:-1], crops[1:])]))
+
+
+def is_static(clip, displacement=STATIC_DISPLACEMENT, pixel_diff=STATIC_PIXEL_DIFF):
+    """
+    True when the player neither moves nor visibly changes over the clip.
+    The box check runs first, so crops are only compared for still boxes.
+    """
+
+    if box_path(clip) >= displacement:
+        return False
+
+    return crop_difference(clip.crops) < pixel_diff
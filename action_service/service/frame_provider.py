@@ -0,0 +1,276 @@
+# Gasby-Ai/action_service/service/frame_provider.py
+#
+# Index-driven frame access for the action CNN.
+#
+# Instead of decoding the whole video into memory, the clips the CNN will
+# score are planned up front from the tracks. One sequential pass (more
+# only if the crop budget requires it) decodes only the frames those clips
+# reference, crops every box that needs each frame, and drops the frame.
+# A clip is handed out as soon as its last crop is filled and released
+# once the consumer is done with it, so only the crops of clips still
+# being filled are held at any time.
+
+import math
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+
+CROP_H, CROP_W = 176, 128
+CROP_BYTES = CROP_H * CROP_W * 3
+
+
+# =====================================================
+# FRAME ACCESS
+# =====================================================
+
+def read_frames(video, indices, stats=None, seek_gap=0):
+    """
+    Yields (index, frame) for the sorted `indices`: lookups in a list of
+    decoded frames, or one forward pass over a video file. In the file,
+    frames in between are skipped with grab() (decodes without the colour
+    conversion / copy); gaps of at least `seek_gap` frames are seeked
+    instead when the backend lands on the exact frame.
+    """
+
+    if stats is None:
+        stats = {}
+
+    for key in ("decoded", "skipped", "seeks"):
+        stats.setdefault(key, 0)
+
+    if not isinstance(video, str):
+        for index in indices:
+            if index < len(video):
+                yield index, video[index]
+        return
+
+    cap = cv2.VideoCapture(video)
+    position = 0
+
+    try:
+        for index in indices:
+
+            if seek_gap and index - position >= seek_gap:
+                if cap.set(cv2.CAP_PROP_POS_FRAMES, index) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+                    position = index
+                    stats["seeks"] += 1
+                else:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+
+            while position < index:
+                if not cap.grab():
+                    return
+                position += 1
+                stats["skipped"] += 1
+
+            ok, frame = cap.read()
+            if not ok:
+                return
+            position += 1
+            stats["decoded"] += 1
+
+            yield index, frame
+    finally:
+        cap.release()
+
+
+# =====================================================
+# CROPPING
+# =====================================================
+
+def crop_into(frame, box, out):
+    """Crops `box` from `frame` resized to the CNN input, written into `out`."""
+
+    h, w, _ = frame.shape
+
+    try:
+        x1, y1, x2, y2 = map(int, box)
+    except (TypeError, ValueError):
+        out[:] = 0
+        return out
+
+    x1 = max(0, min(x1, w - 1))
+    x2 = max(0, min(x2, w - 1))
+    y1 = max(0, min(y1, h - 1))
+    y2 = max(0, min(y2, h - 1))
+
+    if x2 <= x1 or y2 <= y1:
+        out[:] = 0
+    else:
+        cv2.resize(frame[y1:y2, x1:x2], (CROP_W, CROP_H), dst=out)
+
+    return out
+
+
+# =====================================================
+# CLIP PLAN
+# =====================================================
+
+class Clip:
+
+    __slots__ = ("order", "player", "frames", "boxes", "crops", "filled")
+
+    def __init__(self, order, player, frames, boxes):
+        self.order = order
+        self.player = player
+        self.frames = frames
+        self.boxes = boxes
+        self.crops = None
+        self.filled = 0
+
+    @property
+    def nbytes(self):
+        return len(self.frames) * CROP_BYTES
+
+
+def plan_clips(tracked_players, seq_length, vid_stride):
+    """Every clip the CNN scores: `seq_length` consecutive boxes of a track, every `vid_stride`."""
+
+    clips = []
+
+    for player in tracked_players:
+
+        bbox_items = sorted(player.bboxes.items())
+
+        if len(bbox_items) < seq_length:
+            continue
+
+        for start in range(0, len(bbox_items) - seq_length + 1, vid_stride):
+            window = bbox_items[start:start + seq_length]
+            clips.append(Clip(
+                len(clips), player,
+                [frame for frame, _ in window],
+                [box for _, box in window]
+            ))
+
+    return clips
+
+
+def peak_bytes(clips):
+    """Crop memory held at the busiest frame if all clips were filled in one pass."""
+
+    events = []
+
+    for clip in clips:
+        events.append((clip.frames[0], 0, clip.nbytes))
+        events.append((clip.frames[-1], 1, -clip.nbytes))
+
+    held = peak = 0
+
+    # At equal frames, clips start before others are released
+    for _, _, delta in sorted(events):
+        held += delta
+        peak = max(peak, held)
+
+    return peak
+
+
+# =====================================================
+# PROVIDER
+# =====================================================
+
+class ClipCropProvider:
+    """
+    Iterates clips with `clip.crops` filled, a (seq_length, 176, 128, 3)
+    uint8 array. `video` is a file path or an in-memory list of frames.
+    Crop buffers are recycled, so `clip.crops` is only valid until the
+    next clip is requested.
+
+    If the crops in flight would exceed `budget_bytes`, clips are split
+    round-robin (in start order) over as many passes as it takes to fit,
+    each one decoding only the frames its own clips need.
+    """
+
+    def __init__(self, video, clips, budget_bytes):
+        self.video = video
+        self.clips = clips
+        self.budget_bytes = max(1, int(budget_bytes))
+
+        self._held = 0
+        self._free = []
+        self._stats = {
+            "decoded": 0, "skipped": 0, "seeks": 0,
+            "passes": 0, "peak_bytes": 0, "clips": 0, "buffers": 0,
+            "decode_sec": 0.0
+        }
+
+    def _passes(self):
+
+        if not self.clips:
+            return []
+
+        ordered = sorted(self.clips, key=lambda c: c.frames[0])
+        n = max(1, math.ceil(peak_bytes(ordered) / self.budget_bytes))
+
+        # Round-robin is not exact; add passes until each one fits (a single clip always does)
+        while True:
+            passes = [ordered[i::n] for i in range(n)]
+            if n >= len(ordered) or all(peak_bytes(p) <= self.budget_bytes for p in passes):
+                return passes
+            n = min(len(ordered), n + max(1, n // 4))
+
+    def _run_pass(self, clips):
+        """Yields this pass's clips; `decode_sec` counts only time spent here, not in the consumer."""
+
+        t0 = time.perf_counter()
+        needed = defaultdict(list)
+
+        for clip in clips:
+            for position, frame in enumerate(clip.frames):
+                needed[frame].append((clip, position))
+
+        for index, frame in read_frames(self.video, sorted(needed), self._stats):
+
+            for clip, position in needed.pop(index):
+
+                if clip.crops is None:
+                    clip.crops = self._buffer(len(clip.frames))
+                    self._held += clip.nbytes
+                    self._stats["peak_bytes"] = max(self._stats["peak_bytes"], self._held)
+
+                crop_into(frame, clip.boxes[position], clip.crops[position])
+                clip.filled += 1
+
+                if clip.filled == len(clip.frames):
+                    self._stats["clips"] += 1
+                    self._stats["decode_sec"] += time.perf_counter() - t0
+                    yield clip
+                    t0 = time.perf_counter()
+                    self._release(clip)
+
+        # Clips whose frames lie past the end of the video are dropped
+        for refs in needed.values():
+            for clip, _ in refs:
+                self._release(clip)
+
+        self._stats["decode_sec"] += time.perf_counter() - t0
+
+    def _buffer(self, length):
+        """A crop buffer from the free list; allocated only while the in-flight peak grows."""
+
+        for i, buffer in enumerate(self._free):
+            if len(buffer) == length:
+                return self._free.pop(i)
+
+        self._stats["buffers"] += 1
+        return np.empty((length, CROP_H, CROP_W, 3), dtype=np.uint8)
+
+    def _release(self, clip):
+        if clip.crops is not None:
+            self._free.append(clip.crops)
+            clip.crops = None
+            self._held -= clip.nbytes
+
+    def __iter__(self):
+        for clips in self._passes():
+            self._stats["passes"] += 1
+            yield from self._run_pass(clips)
+
+    def stats(self):
+        return dict(
+            self._stats, decode_sec=round(self._stats["decode_sec"], 3),
+            budget_bytes=self.budget_bytes, planned=len(self.clips)
+        )
@@ -0,0 +1,205 @@
+# Gasby-Ai/action_service/service/track_stitching.py
+#
+# Offline re-identification: merges tracklets of the same player that the
+# tracker split (occlusions, players leaving and re-entering the view)
+# before action recognition, since every extra track starts its own
+# series of CNN windows.
+#
+# Each track gets a jersey colour histogram averaged over a few of its
+# boxes. A track that ends is linked to one that starts later when the
+# gap is short, the new track starts where the old one could have moved
+# to, and the histograms agree.
+
+import time
+
+import cv2
+import numpy as np
+
+from service.frame_provider import read_frames
+from common.jersey import JERSEY_Y, JERSEY_X
+
+# Hue, saturation, value bins
+HIST_BINS = (8, 4, 4)
+
+# Detection records are in 640x640 space
+RECORD_SIZE = 640
+
+DESCRIPTOR_SAMPLES = 4
+MAX_GAP_SEC = 4.0
+
+# Reachable distance per second of gap (640 space), plus one box height
+MAX_SPEED = 200.0
+
+# Bhattacharyya distance above which two tracks are different players
+APPEARANCE_GATE = 0.35
+
+# Frames further apart than this are seeked to rather than grabbed
+SEEK_GAP = 120
+
+
+# =====================================================
+# APPEARANCE
+# =====================================================
+
+def jersey_histogram(frame, box):
+    """Normalized HSV histogram of the jersey region of a 640-space box, or None."""
+
+    h, w = frame.shape[:2]
+    sx, sy = w / RECORD_SIZE, h / RECORD_SIZE
+
+    x1, y1, x2, y2 = box
+    bw, bh = x2 - x1, y2 - y1
+
+    jx1 = int(max(0, (x1 + bw * JERSEY_X[0]) * sx))
+    jx2 = int(min(w, (x1 + bw * JERSEY_X[1]) * sx))
+    jy1 = int(max(0, (y1 + bh * JERSEY_Y[0]) * sy))
+    jy2 = int(min(h, (y1 + bh * JERSEY_Y[1]) * sy))
+
+    if jx2 <= jx1 or jy2 <= jy1:
+        return None
+
+    hsv = cv2.cvtColor(frame[jy1:jy2, jx1:jx2], cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, list(HIST_BINS), [0, 180, 0, 256, 0, 256])
+
+    return hist.ravel() / max(hist.sum(), 1.0)
+
+
+def track_descriptors(video, tracks, samples=DESCRIPTOR_SAMPLES, seek_gap=SEEK_GAP, stats=None):
+    """
+    Mean jersey histogram per track (track.id -> vector), from up to
+    `samples` boxes spread over the track, read in one pass.
+    """
+
+    needed = {}
+
+    for track in tracks:
+
+        frames = sorted(track.bboxes)
+        picks = np.unique(np.linspace(0, len(frames) - 1, min(samples, len(frames))).round().astype(int))
+
+        for i in picks:
+            needed.setdefault(frames[i], []).append(track)
+
+    sums = {}
+
+    for index, frame in read_frames(video, sorted(needed), stats, seek_gap):
+        for track in needed[index]:
+
+            hist = jersey_histogram(frame, track.bboxes[index])
+
+            if hist is not None:
+                sums[track.id] = sums.get(track.id, 0) + hist
+
+    return {tid: hist / hist.sum() for tid, hist in sums.items() if hist.sum() > 0}
+
+
+def appearance_distance(a, b):
+    """Bhattacharyya distance of two normalized histograms (0 = identical, 1 = disjoint)."""
+    return float(np.sqrt(max(0.0, 1.0 - np.sqrt(a * b).sum())))
+
+
+# =====================================================
+# STITCHING
+# =====================================================
+
+def _center(box):
+    return np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2])
+
+
+def _expected_center(track, frame):
+    """Where a track would be at `frame`: its motion prediction, else its last box."""
+
+    if getattr(track, "motion", None) is not None:
+        return _center(track.motion.predict(frame))
+
+    return _center(track.last_bbox)
+
+
+def link_candidates(tracks, descriptors, fps, max_gap_sec=MAX_GAP_SEC,
+                    max_speed=MAX_SPEED, appearance_gate=APPEARANCE_GATE):
+    """(cost, earlier, later) for every compatible pair of track end / track start."""
+
+    max_gap = max_gap_sec * fps
+    spans = [(min(t.bboxes), max(t.bboxes), t) for t in tracks if t.id in descriptors]
+    starts = sorted(spans, key=lambda s: s[0])
+    start_frames = [s[0] for s in starts]
+
+    candidates = []
+
+    for _, end, a in spans:
+
+        first = np.searchsorted(start_frames, end, side="right")
+
+        for start, _, b in starts[first:]:
+
+            gap = start - end
+            if gap > max_gap:
+                break
+
+            box = a.last_bbox
+            reach = max_speed * gap / fps + (box[3] - box[1])
+            distance = np.linalg.norm(_center(b.bboxes[start]) - _expected_center(a, start))
+
+            if distance > reach:
+                continue
+
+            appearance = appearance_distance(descriptors[a.id], descriptors[b.id])
+
+            if appearance > appearance_gate:
+                continue
+
+            cost = appearance / appearance_gate + distance / reach + gap / max_gap
+            candidates.append((cost, a, b))
+
+    return candidates
+
+
+def stitch_tracks(tracks, video, fps, seek_gap=SEEK_GAP, **gates):
+    """
+    Merges tracklets into whole tracks. Links are taken greedily by cost;
+    each track end and each track start is used at most once, so chains
+    A -> B -> C become one track. Returns (tracks, report).
+    """
+
+    t0 = time.time()
+    stats = {}
+
+    descriptors = track_descriptors(video, tracks, seek_gap=seek_gap, stats=stats)
+    candidates = link_candidates(tracks, descriptors, fps, **gates)
+
+    next_of, has_prev = {}, set()
+
+    for _, a, b in sorted(candidates, key=lambda c: c[0]):
+        if a.id in next_of or b.id in has_prev:
+            continue
+        next_of[a.id] = b
+        has_prev.add(b.id)
+
+    merged = []
+
+    for track in tracks:
+
+        if track.id in has_prev:
+            continue
+
+        tail = track
+        while tail.id in next_of:
+            tail = next_of[tail.id]
+            track.bboxes.update(tail.bboxes)
+
+        track.last_bbox = tail.last_bbox
+        track.last_frame = tail.last_frame
+        track.motion = getattr(tail, "motion", None)
+        merged.append(track)
+
+    report = {
+        "tracks_before": len(tracks),
+        "tracks_after": len(merged),
+        "links": len(next_of),
+        "candidates": len(candidates),
+        "descriptor_frames": stats.get("decoded", 0),
+        "seconds": round(time.time() - t0, 3)
+    }
+
+    print("🧷 Track Stitching:", report)
+    return merged, report
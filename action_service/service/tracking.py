@@ -1,14 +1,101 @@
 #action_service/service/tracking.py
-import math
+import numpy as np
 
 IOU_THRESHOLD = 0.3
 
+# Video time a track may go unmatched before it is retired. Measured in
+# frames rather than sampled records, so retention is the same at any
+# sampling stride.
+MAX_MISSED_SEC = 2.0
+
+# Constant-velocity Kalman noise, in pixels (640 detection space) per frame
+POSITION_NOISE = 1.0
+VELOCITY_NOISE = 0.05
+SIZE_NOISE = 0.5
+MEASUREMENT_NOISE = 4.0
+INITIAL_VELOCITY_VAR = 16.0
+
+# Second-stage gate on the squared Mahalanobis distance of box centres (chi2, 2 dof, 95%)
+CENTER_GATE = 5.99
+
+# Tracks shorter than this many boxes yield no action clip (args.seq_length)
+MIN_TRACK_LEN = 8
+
+
+class BoxKalman:
+    """
+    Constant-velocity filter over a box: state is centre, size and centre
+    velocity (per frame). State is kept as of the last update, so a
+    prediction over any frame gap is a single step of that length.
+    """
+
+    def __init__(self, bbox, frame):
+        self.x = np.zeros(6)
+        self.x[:4] = _box_to_state(bbox)
+        self.P = np.diag([MEASUREMENT_NOISE] * 4 + [INITIAL_VELOCITY_VAR] * 2)
+        self.frame = frame
+
+    def _step(self, gap):
+
+        F = np.eye(6)
+        F[0, 4] = F[1, 5] = gap
+
+        Q = np.diag(
+            [POSITION_NOISE * gap] * 2 + [SIZE_NOISE * gap] * 2 + [VELOCITY_NOISE * gap] * 2
+        )
+
+        return F, Q
+
+    def predict(self, frame):
+        """Box expected at `frame` (xyxy)."""
+
+        F, _ = self._step(frame - self.frame)
+        return _state_to_box(F @ self.x)
+
+    def center_distance(self, centers, frame):
+        """Squared Mahalanobis distances of (n, 2) centres from the centre predicted at `frame`."""
+
+        F, Q = self._step(frame - self.frame)
+
+        x = F @ self.x
+        S = (F @ self.P @ F.T + Q)[:2, :2] + np.eye(2) * MEASUREMENT_NOISE
+
+        d = np.asarray(centers, dtype=np.float64) - x[:2]
+        return np.einsum("ni,ij,nj->n", d, np.linalg.inv(S), d)
+
+    def update(self, bbox, frame):
+
+        F, Q = self._step(frame - self.frame)
+
+        x = F @ self.x
+        P = F @ self.P @ F.T + Q
+
+        # Measurement is the first four state entries
+        S = P[:4, :4] + np.eye(4) * MEASUREMENT_NOISE
+        K = P[:, :4] @ np.linalg.inv(S)
+
+        self.x = x + K @ (_box_to_state(bbox) - x[:4])
+        self.P = (np.eye(6) - K @ np.eye(4, 6)) @ P
+        self.frame = frame
+
+
+def _box_to_state(bbox):
+    x1, y1, x2, y2 = bbox
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+def _state_to_box(x):
+    cx, cy, w, h = x[:4]
+    return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+
 
 class TrackedPlayer:
     def __init__(self, player_id):
         self.id = player_id
         self.bboxes = {}
         self.last_bbox = None
+        self.last_frame = None
+        self.motion = None
 
 
 def compute_iou(boxA, boxB):
@@ -26,42 +113,222 @@ def compute_iou(boxA, boxB):
     return interArea / float(boxAArea + boxBArea - interArea + 1e-6)
 
 
-def build_tracks(frame_data):
+def iou_matrix(boxes_a, boxes_b):
+    """(n, 4) x (m, 4) xyxy boxes -> (n, m) IoU, same formula as compute_iou."""
+
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    xA = np.maximum(a[:, None, 0], b[None, :, 0])
+    yA = np.maximum(a[:, None, 1], b[None, :, 1])
+    xB = np.minimum(a[:, None, 2], b[None, :, 2])
+    yB = np.minimum(a[:, None, 3], b[None, :, 3])
+
+    inter = np.clip(xB - xA, 0, None) * np.clip(yB - yA, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def linear_assignment(cost):
+    """
+    Minimum-cost one-to-one assignment (Hungarian algorithm, O(n^2 m)).
+    Returns (rows, cols) like scipy.optimize.linear_sum_assignment.
+    """
+
+    cost = np.asarray(cost, dtype=np.float64)
+
+    if cost.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+
+    n, m = cost.shape
+
+    # Potentials and matching over 1-based columns; column 0 is a sentinel
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+
+            used[j0] = True
+            i0 = match[j0]
+
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+
+            if match[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    cols = np.nonzero(match[1:])[0]
+    rows = match[1:][cols] - 1
+
+    if transposed:
+        rows, cols = cols, rows
+
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def _match_centers(bboxes, tracks, frame_number, free_boxes, free_tracks):
+    """Optimal assignment of the still unmatched boxes and tracks on gated centre distance."""
+
+    if not free_boxes or not free_tracks:
+        return []
+
+    boxes = np.asarray([bboxes[d] for d in free_boxes], dtype=np.float64)
+    centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+    distance = np.stack(
+        [tracks[t].motion.center_distance(centers, frame_number) for t in free_tracks], axis=1
+    )
+    cost = np.where(distance < CENTER_GATE, distance, CENTER_GATE * 2)
+
+    return [
+        (free_boxes[i], free_tracks[j])
+        for i, j in zip(*linear_assignment(cost))
+        if distance[i, j] < CENTER_GATE
+    ]
+
+
+def build_tracks(frame_data, iou_threshold=IOU_THRESHOLD, max_missed_sec=MAX_MISSED_SEC,
+                 motion=True, fps=30):
+    """
+    IoU tracker. Each frame's detections are matched one-to-one against
+    the active tracks only (optimal assignment on the IoU matrix); tracks
+    unmatched for more than `max_missed_sec` of video are retired, so the
+    cost per frame stays flat over the whole game. Players who leave the
+    view for longer come back as new tracks; track_stitching rejoins them
+    by appearance.
+
+    With `motion`, each track's box is predicted by a constant-velocity
+    Kalman filter over the actual frame gap and matched on IoU with that
+    prediction; boxes and tracks left over are then matched on gated
+    centre distance. This keeps tracks whole under sparse sampling and
+    fast movement. Without it, boxes are matched against each track's
+    last box.
+    """
 
     players = []
+    active = []
     next_id = 0
 
+    max_missed = max_missed_sec * fps
+
     for frame in frame_data:
 
         frame_number = frame["frame"]
+        bboxes = [p["bbox"] for p in frame.get("players", [])]
 
-        for p in frame.get("players", []):
+        pairs = []
 
-            bbox = p["bbox"]
+        if bboxes and active:
 
-            best_match = None
-            best_iou = 0
+            if motion:
+                track_boxes = [player.motion.predict(frame_number) for player in active]
+            else:
+                track_boxes = [player.last_bbox for player in active]
 
-            for player in players:
+            iou = iou_matrix(bboxes, track_boxes)
 
-                if player.last_bbox is None:
-                    continue
+            # Pairs at or below the threshold may never match
+            cost = np.where(iou > iou_threshold, 1.0 - iou, 2.0)
 
-                iou = compute_iou(bbox, player.last_bbox)
+            pairs = [(d, t) for d, t in zip(*linear_assignment(cost)) if iou[d, t] > iou_threshold]
 
-                if iou > best_iou and iou > IOU_THRESHOLD:
-                    best_iou = iou
-                    best_match = player
+            if motion:
+                matched_boxes = {d for d, _ in pairs}
+                matched_tracks = {t for _, t in pairs}
+                pairs += _match_centers(
+                    bboxes, active, frame_number,
+                    [d for d in range(len(bboxes)) if d not in matched_boxes],
+                    [t for t in range(len(active)) if t not in matched_tracks]
+                )
 
-            if best_match:
-                best_match.bboxes[frame_number] = bbox
-                best_match.last_bbox = bbox
-            else:
-                new_player = TrackedPlayer(next_id)
-                new_player.bboxes[frame_number] = bbox
-                new_player.last_bbox = bbox
-                players.append(new_player)
-                next_id += 1
+        for d, t in pairs:
+
+            player = active[t]
+            player.bboxes[frame_number] = bboxes[d]
+            player.last_bbox = bboxes[d]
+            player.last_frame = frame_number
+
+            if motion:
+                player.motion.update(bboxes[d], frame_number)
+
+        matched_boxes = {d for d, _ in pairs}
+
+        active = [player for player in active if frame_number - player.last_frame <= max_missed]
+
+        for d, bbox in enumerate(bboxes):
+
+            if d in matched_boxes:
+                continue
+
+            new_player = TrackedPlayer(next_id)
+            new_player.bboxes[frame_number] = bbox
+            new_player.last_bbox = bbox
+            new_player.last_frame = frame_number
+
+            if motion:
+                new_player.motion = BoxKalman(bbox, frame_number)
+
+            players.append(new_player)
+            active.append(new_player)
+            next_id += 1
 
     print("✅ IoU Tracking complete. Players:", len(players))
-    return players
\ No newline at end of file
+    return players
+
+
+def fragmentation(players, min_len=MIN_TRACK_LEN):
+    """
+    Per-run track fragmentation. `tracks_per_player` is tracks over the
+    mean number of players detected per sampled frame (1.0 when every
+    player keeps one track all game); `short_tracks` is the share of
+    tracks too short to yield an action clip.
+    """
+
+    detections = sum(len(p.bboxes) for p in players)
+    frames = len(set().union(*(p.bboxes for p in players))) if players else 0
+
+    players_per_frame = detections / frames if frames else 0.0
+
+    return {
+        "tracks": len(players),
+        "detections": detections,
+        "mean_track_len": round(detections / len(players), 2) if players else 0.0,
+        "short_tracks": round(sum(len(p.bboxes) < min_len for p in players) / len(players), 3) if players else 0.0,
+        "tracks_per_player": round(len(players) / players_per_frame, 2) if players_per_frame else 0.0
+    }
@@ -0,0 +1,99 @@
+# Gasby-Ai/benchmarks/action_batching.py
+#
+# Action CNN throughput (clips/sec) against batch size.
+#
+# Clips are deterministic random crops of the CNN input shape, so only the
+# forward pass (transfer, normalization, model) is measured. Runs on CPU
+# unless --device cuda is given.
+#
+#   python -m benchmarks.action_batching [--sizes 1,2,4,8,16,32] [--clips 64]
+#                                         [--repeat 3] [--device cpu] [--out results.json]
+
+import os
+import sys
+import json
+import time
+import platform
+
+import numpy as np
+
+from benchmarks.stubs import in_service
+
+
+def bench(classify_clips, clips, sizes, repeat):
+
+    rows = []
+
+    for size in sizes:
+
+        # Warm-up pass so allocator / kernel selection is not timed
+        classify_clips(clips[:size])
+
+        best = None
+
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for start in range(0, len(clips), size):
+                classify_clips(clips[start:start + size])
+            seconds = time.perf_counter() - t0
+            best = seconds if best is None else min(best, seconds)
+
+        rows.append({
+            "batch_size": size,
+            "seconds": round(best, 3),
+            "clips_per_sec": round(len(clips) / best, 2)
+        })
+
+        print(f"   batch {size:>3}: {rows[-1]['clips_per_sec']} clips/s")
+
+    base = rows[0]["clips_per_sec"]
+    for row in rows:
+        row["speedup"] = round(row["clips_per_sec"] / base, 2)
+
+    return rows
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    sizes = [int(s) for s in opts.get("--sizes", "1,2,4,8,16,32").split(",")]
+    n_clips = int(opts.get("--clips", 64))
+    repeat = int(opts.get("--repeat", 3))
+    device = opts.get("--device", "cpu")
+
+    # The service picks its device at import
+    if device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    with in_service("action_service"):
+        import torch
+        from service.action_recognition import classify_clips, args
+        from service.frame_provider import CROP_H, CROP_W
+
+    rng = np.random.default_rng(0)
+    clips = rng.integers(0, 256, (n_clips, args.seq_length, CROP_H, CROP_W, 3), dtype=np.uint8)
+
+    print(f"⏱ Action CNN: {n_clips} clips on {device}, {torch.get_num_threads()} threads")
+
+    results = {
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads()
+        },
+        "device": device,
+        "clips": n_clips,
+        "rows": bench(classify_clips, clips, sizes, repeat)
+    }
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
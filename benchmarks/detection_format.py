@@ -0,0 +1,90 @@
+# Gasby-Ai/benchmarks/detection_format.py
+#
+# Size and parse time of frame_level_detection.json vs the NPZ format.
+#
+# Records come from a seeded synthetic game (every 5th frame) unless a
+# real frame_level_detection.json is given.
+#
+#   python -m benchmarks.detection_format [--seconds 600] [--seed 0]
+#                                         [--json frame_level_detection.json] [--out results.json]
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+from benchmarks.synthetic import SyntheticGame
+from common.detection_format import write_detections, read_detections
+
+
+DETECTION_STRIDE = 5
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def compare_formats(data, repeat=3):
+    """Bytes on disk and best-of-`repeat` parse seconds per format."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        json_path = os.path.join(tmp, "det.json")
+        npz_path = os.path.join(tmp, "det.npz")
+        raw_path = os.path.join(tmp, "det_raw.npz")
+
+        with open(json_path, "w") as f:
+            json.dump(data, f, indent=4)
+
+        write_detections(npz_path, data)
+        write_detections(raw_path, data, compress=False)
+
+        def parse_json():
+            with open(json_path) as f:
+                return json.load(f)
+
+        rows = {}
+
+        for name, path, fn in (
+            ("json", json_path, parse_json),
+            ("npz", npz_path, lambda: read_detections(npz_path)),
+            ("npz_raw", raw_path, lambda: read_detections(raw_path)),
+            ("npz_records", npz_path, lambda: read_detections(npz_path).to_list())
+        ):
+            _, seconds = timed(fn, repeat)
+            rows[name] = {"bytes": os.path.getsize(path), "parse_sec": round(seconds, 4)}
+
+    return {"records": len(data), "formats": rows}
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    if "--json" in opts:
+        with open(opts["--json"]) as f:
+            data = json.load(f)
+    else:
+        # Small frames: only the detections are generated, nothing is rendered
+        game = SyntheticGame(
+            seconds=int(opts.get("--seconds", 600)), fps=30, width=320, height=180,
+            seed=int(opts.get("--seed", 0))
+        )
+        data = game.detections(DETECTION_STRIDE)
+
+    results = compare_formats(data)
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,461 @@
+# Gasby-Ai/benchmarks/run.py
+#
+# Reproducible throughput benchmark of the whole pipeline on synthetic
+# footage. Each stage runs in isolation on the same seeded video and
+# detections, then both Flask apps run end to end against common.local_s3
+# and local Gemini / TTS / Instagram stubs. Stages whose models, weights or
+# binaries are missing are reported as skipped.
+#
+# Component benchmarks (detection format, S3 transfer, team colors, YOLO
+# batching and backends) live in their own modules and run here on the
+# same workspace when named in --stages, or with --stages all.
+#
+#   python -m benchmarks.run [--preset short|long] [--seconds 30] [--width 854]
+#                            [--height 480] [--fps 30] [--seed 0]
+#                            [--stages tracking,game_intelligence|all] [--out results.json]
+#   python -m benchmarks.run --compare old.json new.json
+#
+# Results go to benchmarks/results/<commit>.json by default.
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import traceback
+import subprocess
+
+import cv2
+
+from benchmarks.synthetic import SyntheticGame, TEAM_COLORS
+from benchmarks.stubs import (
+    REPO, in_service, load_app, stub_commentary, stub_tts, stub_instagram
+)
+from common.detection_format import write_detections
+
+
+SCHEMA_VERSION = 1
+
+PRESETS = {
+    "short": {"seconds": 30, "width": 854, "height": 480, "fps": 30},
+    "long": {"seconds": 600, "width": 1280, "height": 720, "fps": 30}
+}
+
+STAGES = (
+    "yolo_detect", "tracking", "action_recognition",
+    "game_intelligence", "highlights", "end_to_end"
+)
+
+COMPONENTS = (
+    "detection_format", "s3_transfer", "team_colors", "yolo_batching", "yolo_backends"
+)
+
+DETECTION_STRIDE = 5
+UUID = "bench-0000"
+
+
+# -------------------------------------------------
+# WORKSPACE
+# -------------------------------------------------
+
+class Workspace:
+    """The synthetic game, its video and detections, shared by every stage."""
+
+    def __init__(self, config, root):
+        self.config = config
+        self.root = root
+
+        self.game = SyntheticGame(
+            seconds=config["seconds"], fps=config["fps"],
+            width=config["width"], height=config["height"], seed=config["seed"]
+        )
+
+        t0 = time.perf_counter()
+        self.video = self.game.write_video(os.path.join(root, f"{UUID}.mp4"))
+        self.generate_sec = time.perf_counter() - t0
+
+        self.detections = self.game.detections(DETECTION_STRIDE)
+        self.detection_file = write_detections(
+            os.path.join(root, "frame_level_detection.npz"), self.detections
+        )
+
+    @property
+    def video_sec(self):
+        return self.game.total_frames / self.game.fps
+
+    def workdir(self, name):
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+
+def rate(n, seconds):
+    return round(n / seconds, 2) if seconds > 0 else None
+
+
+# -------------------------------------------------
+# STAGES
+# -------------------------------------------------
+
+def bench_yolo_detect(ws):
+
+    with in_service("yolo_service"):
+        t0 = time.perf_counter()
+        from video_handler import VideoHandler
+        import_sec = time.perf_counter() - t0
+
+        handler = VideoHandler(cv2.VideoCapture(ws.video), TEAM_COLORS, batch_size=8)
+
+        t0 = time.perf_counter()
+        records = handler.run_detectors(ws.workdir("yolo_detect"))
+        seconds = time.perf_counter() - t0
+
+    return {
+        "seconds": round(seconds, 3),
+        "import_sec": round(import_sec, 3),
+        "sampled_frames": len(records),
+        "sampled_fps": rate(len(records), seconds),
+        "realtime_factor": rate(ws.video_sec, seconds),
+        "bottleneck": handler.stage_report.get("bottleneck")
+    }
+
+
+def bench_tracking(ws):
+
+    with in_service("action_service"):
+        from service.tracking import build_tracks, fragmentation
+        from service.track_stitching import stitch_tracks
+
+        t0 = time.perf_counter()
+        tracks = build_tracks(ws.detections, fps=ws.game.fps)
+        seconds = time.perf_counter() - t0
+
+        before = fragmentation(tracks)
+        tracks, stitching = stitch_tracks(tracks, ws.video, ws.game.fps)
+
+    return {
+        "seconds": round(seconds, 3),
+        "records": len(ws.detections),
+        "records_per_sec": rate(len(ws.detections), seconds),
+        "fragmentation": before,
+        "stitched": dict(fragmentation(tracks), seconds=stitching["seconds"])
+    }
+
+
+def bench_action_recognition(ws):
+
+    with in_service("action_service"):
+        t0 = time.perf_counter()
+        from service.tracking import build_tracks
+        from service.action_recognition import run_action_recognition, args
+        from service.frame_provider import plan_clips
+        import_sec = time.perf_counter() - t0
+
+        tracks = build_tracks(ws.detections, fps=ws.game.fps)
+        clips = len(plan_clips(tracks, args.seq_length, args.vid_stride))
+
+        # Decoding is part of the stage: frames are read on demand from the file
+        report = {}
+        t0 = time.perf_counter()
+        events = run_action_recognition(
+            ws.video, tracks, frame_detections=ws.detections, fps=ws.game.fps, report=report
+        )
+        seconds = time.perf_counter() - t0
+
+    return {
+        "seconds": round(seconds, 3),
+        "import_sec": round(import_sec, 3),
+        "clips": clips,
+        "clips_skipped": report["gating"]["skipped"],
+        "batch_size": args.batch_size,
+        "clips_per_sec": rate(clips - report["gating"]["skipped"], seconds),
+        "events": len(events or [])
+    }
+
+
+def bench_game_intelligence(ws):
+
+    with in_service("action_service"):
+        from service.tracking import build_tracks
+        from service.game_intelligence import enrich_game_intelligence
+
+        tracks = build_tracks(ws.detections, fps=ws.game.fps)
+
+        t0 = time.perf_counter()
+        events = enrich_game_intelligence(tracks, ws.game.fps, ws.detections, [])
+        seconds = time.perf_counter() - t0
+
+    ws.events = events
+
+    return {
+        "seconds": round(seconds, 3),
+        "records_per_sec": rate(len(ws.detections), seconds),
+        "events": len(events)
+    }
+
+
+def bench_highlights(ws):
+
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("skipped: ffmpeg not on PATH")
+
+    with in_service("action_service"):
+        from service.highlight_engine import generate_highlights
+
+    events = getattr(ws, "events", None) or [
+        {"type": "shot", "frame": int(ws.game.total_frames * f), "points": 2, "intensity": "high"}
+        for f in (0.25, 0.5, 0.75)
+    ]
+
+    workdir = ws.workdir("highlights")
+    output = os.path.join(workdir, "highlights.mp4")
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    try:
+        t0 = time.perf_counter()
+        generate_highlights(ws.video, events, ws.game.fps, output)
+        seconds = time.perf_counter() - t0
+    finally:
+        os.chdir(cwd)
+
+    return {
+        "seconds": round(seconds, 3),
+        "events": len(events),
+        "output_bytes": os.path.getsize(output) if os.path.exists(output) else 0
+    }
+
+
+def bench_end_to_end(ws):
+    """Both Flask apps through their test clients, S3 / Gemini / TTS / Instagram stubbed."""
+
+    from common.local_s3 import LocalS3
+
+    s3 = LocalS3(ws.workdir("s3"))
+    s3.put("gasby-reqs", f"{UUID}/{UUID}.mp4", ws.video)
+
+    meta = os.path.join(ws.root, "meta.json")
+    with open(meta, "w") as f:
+        json.dump({"team_colors": TEAM_COLORS}, f)
+    s3.put("gasby-reqs", f"{UUID}/{UUID}.json", meta)
+
+    yolo = load_app("yolo_service", "bench_yolo_app")
+    yolo.s3 = s3
+
+    action = load_app("action_service", "bench_action_app")
+    action.s3 = s3
+    action.generate_gemini_commentary = stub_commentary
+    action.generate_tts_audio_from_events = stub_tts
+    action.post_broadcast_and_highlights = stub_instagram
+
+    result = {}
+    cwd = os.getcwd()
+    os.chdir(ws.workdir("end_to_end"))
+
+    try:
+        for name, client, route, body in (
+            ("yolo", yolo.app.test_client(), "/yolo-predict/upload",
+             {"payload": UUID, "team_colors": TEAM_COLORS, "cache": False}),
+            ("action", action.app.test_client(), "/action-predict/predict",
+             {"uuid": UUID})
+        ):
+            t0 = time.perf_counter()
+            response = client.post(route, json=body)
+            seconds = time.perf_counter() - t0
+
+            payload = response.get_json() or {}
+
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} returned {response.status_code}: {payload}")
+
+            result[name] = {
+                "seconds": round(seconds, 3),
+                "stages_sec": (payload.get("timings") or {}).get("stages_sec")
+            }
+    finally:
+        os.chdir(cwd)
+
+    result["seconds"] = round(result["yolo"]["seconds"] + result["action"]["seconds"], 3)
+    result["realtime_factor"] = rate(ws.video_sec, result["seconds"])
+    return result
+
+
+# -------------------------------------------------
+# COMPONENTS
+# -------------------------------------------------
+
+def timed_component(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return dict(seconds=round(time.perf_counter() - t0, 3), **result)
+
+
+def bench_detection_format(ws):
+    from benchmarks.detection_format import compare_formats
+    return timed_component(compare_formats, ws.detections)
+
+
+def bench_s3_transfer(ws):
+    from benchmarks.s3_transfer import run as transfer, local_store
+    return timed_component(transfer, *local_store(ws.video, ws.workdir("s3_transfer")))
+
+
+def bench_team_colors(ws):
+    from benchmarks.team_colors import compare_team_colors
+    return timed_component(compare_team_colors, seed=ws.config["seed"])
+
+
+def bench_yolo_batching(ws):
+    from benchmarks.yolo_batching import sweep, SIZES
+    return timed_component(lambda: {"rows": sweep(ws.video, SIZES)})
+
+
+def bench_yolo_backends(ws):
+    from benchmarks.yolo_backends import compare_backends
+    return timed_component(compare_backends, ws.video)
+
+
+BENCHES = {name: globals()[f"bench_{name}"] for name in STAGES + COMPONENTS}
+
+
+# -------------------------------------------------
+# RUN
+# -------------------------------------------------
+
+def git_commit():
+
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip()
+
+    return git("rev-parse", "HEAD") or None, bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def run(config, stages=STAGES):
+
+    commit, dirty = git_commit()
+
+    results = {
+        "schema": SCHEMA_VERSION,
+        "commit": commit,
+        "dirty": dirty,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__
+        },
+        "config": config,
+        "stages": {}
+    }
+
+    with tempfile.TemporaryDirectory() as root:
+
+        ws = Workspace(config, root)
+        results["synthetic"] = {
+            "frames": ws.game.total_frames,
+            "video_bytes": os.path.getsize(ws.video),
+            "detection_records": len(ws.detections),
+            "generate_sec": round(ws.generate_sec, 3)
+        }
+
+        for name in stages:
+
+            print(f"⏱ Benchmark: {name}")
+
+            try:
+                results["stages"][name] = dict(status="ok", **BENCHES[name](ws))
+            except Exception as e:
+                message = str(e)
+                skipped = message.startswith("skipped") or isinstance(e, (ImportError, FileNotFoundError))
+                results["stages"][name] = {
+                    "status": "skipped" if skipped else "error",
+                    "error": message
+                }
+                if not skipped:
+                    traceback.print_exc()
+
+            print(f"   {json.dumps(results['stages'][name])}")
+
+    return results
+
+
+def compare(old_path, new_path):
+    """Seconds per stage, old vs new; ratio > 1 means the new run is slower."""
+
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    if old["config"] != new["config"]:
+        print("⚠ Configs differ:", old["config"], "vs", new["config"])
+
+    rows = {}
+
+    for name in STAGES + COMPONENTS:
+
+        if name not in old["stages"] and name not in new["stages"]:
+            continue
+
+        a = old["stages"].get(name, {}).get("seconds")
+        b = new["stages"].get(name, {}).get("seconds")
+
+        rows[name] = {
+            "old_sec": a,
+            "new_sec": b,
+            "ratio": round(b / a, 3) if a and b else None
+        }
+
+    return {"old": old["commit"], "new": new["commit"], "stages": rows}
+
+
+def parse_config(args):
+
+    opts = dict(zip(args[::2], args[1::2]))
+
+    config = dict(PRESETS[opts.pop("--preset", "short")], seed=0)
+
+    for key in ("seconds", "width", "height", "fps", "seed"):
+        if f"--{key}" in opts:
+            config[key] = int(opts.pop(f"--{key}"))
+
+    stages = opts.pop("--stages", None)
+
+    if stages == "all":
+        stages = list(STAGES + COMPONENTS)
+    else:
+        stages = stages.split(",") if stages else list(STAGES)
+
+    unknown = [s for s in stages if s not in BENCHES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {unknown}")
+
+    return config, stages, opts.pop("--out", None)
+
+
+if __name__ == "__main__":
+
+    args = sys.argv[1:]
+
+    if args and args[0] == "--compare":
+        print(json.dumps(compare(args[1], args[2]), indent=2))
+        sys.exit(0)
+
+    config, stages, out = parse_config(args)
+    results = run(config, stages)
+
+    if out is None:
+        os.makedirs(os.path.join(REPO, "benchmarks", "results"), exist_ok=True)
+        name = (results["commit"] or "nocommit")[:10] + ("-dirty" if results["dirty"] else "")
+        out = os.path.join(REPO, "benchmarks", "results", f"{name}.json")
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print("✅ Results written to", out)
@@ -0,0 +1,129 @@
+# Gasby-Ai/benchmarks/s3_transfer.py
+#
+# Sequential download-then-decode vs ranged download overlapped with decoding.
+#
+# Against a local S3 stand-in (MinIO / moto server / localstack):
+#   python -m benchmarks.s3_transfer --endpoint http://localhost:9000 <bucket> <key>
+#
+# Without any server, serving an mp4 through a throttled common.local_s3
+# (a seeded synthetic game when no video is given):
+#   python -m benchmarks.s3_transfer --local [video.mp4] [--mbps 200] [--latency 0.03]
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+import cv2
+
+from benchmarks.synthetic import SyntheticGame
+from common.s3_transfer import start_video_download
+from common.local_s3 import LocalS3
+
+
+FRAME_SKIP = 5
+
+
+# -------------------------------------------------
+# BENCH
+# -------------------------------------------------
+
+def decode(path, ready=None):
+    """Reads every FRAME_SKIP-th frame like the YOLO service; returns frame count."""
+
+    video = cv2.VideoCapture(path)
+    total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = 0
+
+    for i in range(total):
+        if ready is not None:
+            ready(i)
+        if i % FRAME_SKIP == 0:
+            ok, _ = video.read()
+            frames += 1
+        else:
+            ok = video.grab()
+        if not ok:
+            break
+
+    video.release()
+    return frames
+
+
+def run(s3, bucket, key):
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        path = os.path.join(tmp, "sequential.mp4")
+        t0 = time.perf_counter()
+        s3.download_file(bucket, key, path)
+        t_download = time.perf_counter() - t0
+        frames = decode(path)
+
+        results["sequential"] = {
+            "download_sec": round(t_download, 3),
+            "first_frame_sec": round(t_download, 3),
+            "total_sec": round(time.perf_counter() - t0, 3),
+            "frames": frames
+        }
+
+        path = os.path.join(tmp, "streaming.mp4")
+        t0 = time.perf_counter()
+        download = start_video_download(s3, bucket, key, path)
+        download.wait_until_openable()
+        t_open = time.perf_counter() - t0
+        frames = decode(path, download.frame_ready)
+        download.wait()
+
+        results["ranged_overlapped"] = {
+            "first_frame_sec": round(t_open, 3),
+            "total_sec": round(time.perf_counter() - t0, 3),
+            "frames": frames,
+            "indexed": download._sample_ends is not None
+        }
+
+    return results
+
+
+def local_store(video, root, mbps=200, latency=0.03):
+    """(s3, bucket, key) serving `video` through a throttled LocalS3 stored under `root`."""
+
+    s3 = LocalS3(root, mbps=mbps, latency=latency)
+    bucket, key = "local", os.path.basename(video)
+    s3.put(bucket, key, video)
+
+    return s3, bucket, key
+
+
+if __name__ == "__main__":
+
+    args = sys.argv[1:]
+
+    if args and args[0] == "--endpoint":
+        import boto3
+        s3 = boto3.client("s3", endpoint_url=args[1])
+        bucket, key = args[2], args[3]
+
+    elif args and args[0] == "--local":
+
+        rest = args[1:]
+        video = rest.pop(0) if rest and not rest[0].startswith("--") else None
+        opts = dict(zip(rest[::2], rest[1::2]))
+
+        if video is None:
+            video = SyntheticGame(seconds=60, width=854, height=480).write_video(
+                os.path.join(tempfile.mkdtemp(), "synthetic.mp4")
+            )
+
+        s3, bucket, key = local_store(
+            video, tempfile.mkdtemp(), mbps=float(opts.get("--mbps", 200)), latency=float(opts.get("--latency", 0.03))
+        )
+
+    else:
+        print("Usage: python -m benchmarks.s3_transfer --endpoint <url> <bucket> <key> | --local [video.mp4]")
+        sys.exit(1)
+
+    print(json.dumps(run(s3, bucket, key), indent=2))
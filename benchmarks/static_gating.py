@@ -0,0 +1,143 @@
+# Gasby-Ai/benchmarks/static_gating.py
+#
+# Speedup, event-count change and share of events kept from skipping
+# static clips before the action CNN (args.static_gate, off by default),
+# on one reference video.
+#
+# By default the reference is a seeded synthetic game with stoppages
+# (free throws / timeouts) where every player stands still; a real video
+# with its detection NPZ can be given instead. Ball-proximity gating is
+# off unless --clips-per-slice is set, so only the static gate differs
+# between the two runs.
+#
+#   python -m benchmarks.static_gating [--seconds 120] [--seed 0] [--clips-per-slice 0]
+#                                      [--video game.mp4 --detections frame_level_detection.npz]
+#                                      [--out results.json]
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+from benchmarks.synthetic import SyntheticGame
+from benchmarks.stubs import in_service
+from common.detection_format import load_detections
+
+import cv2
+
+
+DETECTION_STRIDE = 5
+
+# Stoppages as fractions of the game: (start, end)
+STOPPAGES = ((0.2, 0.3), (0.55, 0.6), (0.8, 0.95))
+
+
+def reference(root, seconds, seed):
+
+    game = SyntheticGame(
+        seconds=seconds, fps=30, width=854, height=480, seed=seed,
+        stoppages=[(a * seconds, b * seconds) for a, b in STOPPAGES]
+    )
+
+    video = game.write_video(os.path.join(root, "reference.mp4"))
+    return video, game.detections(DETECTION_STRIDE), game.fps
+
+
+def events_kept(reference, gated):
+    """Share of the ungated run's events (type, frame, team) the gated run also produced."""
+
+    remaining = list(gated)
+    kept = 0
+
+    for key in reference:
+        if key in remaining:
+            remaining.remove(key)
+            kept += 1
+
+    return round(kept / len(reference), 4) if reference else None
+
+
+def count_types(events):
+    counts = {}
+    for event in events:
+        counts[event["type"]] = counts.get(event["type"], 0) + 1
+    return counts
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    seconds = int(opts.get("--seconds", 120))
+    seed = int(opts.get("--seed", 0))
+    clips_per_slice = int(opts.get("--clips-per-slice", 0))
+
+    with in_service("action_service"):
+        from service.tracking import build_tracks
+        from service.action_recognition import run_action_recognition
+
+    with tempfile.TemporaryDirectory() as root:
+
+        if "--video" in opts:
+            video = os.path.abspath(opts["--video"])
+            detections = list(load_detections(opts["--detections"]))
+            cap = cv2.VideoCapture(video)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30
+            cap.release()
+        else:
+            video, detections, fps = reference(root, seconds, seed)
+
+        tracks = build_tracks(detections, fps=fps)
+
+        runs = {}
+        keys = {}
+
+        for name, static_gate in (("off", False), ("on", True)):
+
+            report = {}
+
+            with in_service("action_service"):
+                t0 = time.perf_counter()
+                events = run_action_recognition(
+                    video, tracks, frame_detections=detections, fps=fps,
+                    clips_per_slice=clips_per_slice, static_gate=static_gate, report=report
+                )
+                elapsed = time.perf_counter() - t0
+
+            keys[name] = [(e["type"], e["frame"], e["team"]) for e in events]
+
+            runs[name] = {
+                "seconds": round(elapsed, 3),
+                "clips": report["gating"]["kept"],
+                "static_skipped": report["static"]["skipped"],
+                "labels": report["labels"],
+                "events": len(events),
+                "event_types": count_types(events)
+            }
+
+            print(f"⏱ static gate {name}: {json.dumps(runs[name])}")
+
+    off, on = runs["off"], runs["on"]
+    types = set(off["event_types"]) | set(on["event_types"])
+
+    results = {
+        "reference": opts.get("--video", f"synthetic {seconds}s seed {seed}"),
+        "clips_per_slice": clips_per_slice,
+        "runs": runs,
+        "speedup": round(off["seconds"] / on["seconds"], 2) if on["seconds"] else None,
+        "event_change": on["events"] - off["events"],
+        "events_kept": events_kept(keys["off"], keys["on"]),
+        "event_type_change": {
+            t: on["event_types"].get(t, 0) - off["event_types"].get(t, 0) for t in sorted(types)
+        }
+    }
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,85 @@
+# Gasby-Ai/benchmarks/stubs.py
+#
+# Local stand-ins for the external services (S3 comes from common.local_s3)
+# and helpers to import each service the way it runs in production: from
+# its own directory, so relative weight / checkpoint paths resolve.
+
+import os
+import sys
+import wave
+import importlib.util
+from contextlib import contextmanager
+
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# -------------------------------------------------
+# SERVICE IMPORTS
+# -------------------------------------------------
+
+@contextmanager
+def in_service(name):
+    """cwd + sys.path of a service directory for the duration of the block."""
+
+    path = os.path.join(REPO, name)
+
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+    cwd = os.getcwd()
+    os.chdir(path)
+
+    try:
+        yield path
+    finally:
+        os.chdir(cwd)
+
+
+def load_app(service, module_name):
+    """Imports <service>/app.py under a unique module name."""
+
+    with in_service(service) as path:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(path, "app.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+    return module
+
+
+# -------------------------------------------------
+# GEMINI / TTS / INSTAGRAM
+# -------------------------------------------------
+
+def stub_commentary(timeline):
+    """Two lines per event, shaped like generate_gemini_commentary's output."""
+
+    return [{
+        "timestamp": event["timestamp"],
+        "commentary": [
+            {"speaker": "Mike", "text": f"{event['type']} by {event['team']}!"},
+            {"speaker": "Sarah", "text": "What a play."}
+        ]
+    } for event in timeline] or None
+
+
+def stub_tts(commentary, output_path, seconds=None, rate=16000):
+    """Writes silence as long as the commentary timeline (plus 3s)."""
+
+    if seconds is None:
+        seconds = max([c["timestamp"] for c in commentary] or [0]) + 3.0
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    with wave.open(output_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\0\0" * int(seconds * rate))
+
+    return True
+
+
+def stub_instagram(broadcast_url, highlight_url, access_token, ig_user_id):
+    return {"stubbed": True, "broadcast": broadcast_url, "highlight": highlight_url}
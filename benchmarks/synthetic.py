@@ -0,0 +1,277 @@
+# Gasby-Ai/benchmarks/synthetic.py
+#
+# Deterministic synthetic basketball footage and the matching detections.
+#
+# One scene model drives both, so the boxes in the generated
+# frame_level_detection records line up with what is drawn in the video:
+# two teams on a panning court, a ball passed between handlers, and a shot
+# at the rim every few seconds. Optional stoppages (free throws, timeouts)
+# freeze players and camera for a while.
+
+import cv2
+import numpy as np
+
+
+TEAM_COLORS = {"Green Team": [0, 255, 0], "White Team": [255, 255, 255]}
+
+WOOD = (96, 150, 205)
+LINE = (245, 245, 245)
+PAINT = (60, 60, 170)
+RIM = (0, 90, 255)
+BALL = (0, 120, 230)
+
+HANDLER_SEC = 4.0
+SHOT_EVERY_SEC = 8.0
+SHOT_SEC = 1.0
+PAN_PERIOD_SEC = 20.0
+
+RECORD_SIZE = 640
+
+
+class SyntheticGame:
+
+    def __init__(self, seconds=60, fps=30, width=1280, height=720, players=10, seed=0,
+                 stoppages=()):
+
+        self.fps = fps
+        self.stoppages = [(float(a), float(b)) for a, b in stoppages]
+        self.width = width
+        self.height = height
+        self.players = players
+        self.total_frames = int(round(seconds * fps))
+
+        self.court_width = int(width * 1.6)
+        self.box_w = max(8, int(width * 0.035))
+        self.box_h = max(16, int(height * 0.16))
+
+        rng = np.random.default_rng(seed)
+
+        # Smooth trajectories: per player, a centre plus two random sinusoids
+        self._center = np.stack([
+            rng.uniform(0.15, 0.85, players) * self.court_width,
+            rng.uniform(0.35, 0.85, players) * height
+        ], axis=1)
+        self._amp = rng.uniform(0.02, 0.08, (players, 2, 2)) * np.array([self.court_width, height])[None, None]
+        self._freq = rng.uniform(0.03, 0.15, (players, 2, 2)) * 2 * np.pi
+        self._phase = rng.uniform(0, 2 * np.pi, (players, 2, 2))
+
+        n_handlers = -(-self.total_frames // int(fps * HANDLER_SEC)) + 1
+        self._handlers = rng.integers(0, players, n_handlers)
+
+        self.teams = np.array([list(TEAM_COLORS)[i % 2] for i in range(players)])
+        self.rims = np.array([
+            [0.05 * self.court_width, 0.42 * height],
+            [0.95 * self.court_width, 0.42 * height]
+        ])
+
+        self._court = self._draw_court()
+
+    # ----------------------------
+    # SCENE STATE
+    # ----------------------------
+
+    def game_time(self, frames):
+        """Seconds of play at each frame: the clock does not run during stoppages."""
+
+        t = np.asarray(frames, dtype=np.float64) / self.fps
+        played = t.copy()
+
+        for start, end in self.stoppages:
+            played -= np.clip(t - start, 0, end - start)
+
+        return played
+
+    def camera_x(self, frames):
+        t = self.game_time(frames)
+        phase = (1 - np.cos(2 * np.pi * t / PAN_PERIOD_SEC)) / 2
+        return phase * (self.court_width - self.width)
+
+    def player_feet(self, frames):
+        """(len(frames), players, 2) foot positions in court pixels."""
+
+        t = self.game_time(frames)[:, None, None, None]
+        offset = (self._amp * np.sin(self._freq * t + self._phase)).sum(axis=3)
+
+        feet = self._center[None] + offset
+        feet[..., 0] = feet[..., 0].clip(self.box_w, self.court_width - self.box_w)
+        feet[..., 1] = feet[..., 1].clip(self.box_h + 0.3 * self.height, self.height - 2)
+        return feet
+
+    def ball(self, frames):
+        """(len(frames), 2) ball positions in court pixels."""
+
+        frames = np.asarray(frames)
+        feet = self.player_feet(frames)
+
+        handler = self._handlers[frames // int(self.fps * HANDLER_SEC)]
+        hands = feet[np.arange(len(frames)), handler] - [0, 0.55 * self.box_h]
+
+        # The last SHOT_SEC of every SHOT_EVERY_SEC window: ball flies to the nearer rim
+        t = frames / self.fps
+        into_window = t % SHOT_EVERY_SEC
+        progress = ((into_window - (SHOT_EVERY_SEC - SHOT_SEC)) / SHOT_SEC).clip(0, 1)[:, None]
+
+        rim = self.rims[(hands[:, 0] > self.court_width / 2).astype(int)]
+        return hands * (1 - progress) + rim * progress
+
+    # ----------------------------
+    # RENDERING
+    # ----------------------------
+
+    def _draw_court(self):
+
+        h, w = self.height, self.court_width
+        court = np.empty((h, w, 3), dtype=np.uint8)
+        court[:] = WOOD
+
+        top = int(0.25 * h)
+        cv2.rectangle(court, (0, top), (w - 1, h - 1), LINE, 3)
+        cv2.line(court, (w // 2, top), (w // 2, h - 1), LINE, 3)
+        cv2.circle(court, (w // 2, int(0.62 * h)), int(0.12 * h), LINE, 3)
+
+        for side in (0, 1):
+            x0 = 0 if side == 0 else int(0.84 * w)
+            cv2.rectangle(court, (x0, int(0.45 * h)), (x0 + int(0.16 * w), int(0.8 * h)), PAINT, -1)
+            cx = int(0.03 * w) if side == 0 else int(0.97 * w)
+            cv2.ellipse(court, (cx, int(0.62 * h)), (int(0.3 * w), int(0.34 * h)),
+                        0, -90 if side == 0 else 90, 90 if side == 0 else 270, LINE, 3)
+
+        for x, y in self.rims.astype(int):
+            cv2.circle(court, (x, y), max(4, self.box_w // 2), RIM, 3)
+
+        return court
+
+    def render(self, frame):
+
+        cam = int(self.camera_x([frame])[0])
+        image = self._court[:, cam:cam + self.width].copy()
+
+        for (x, y), team in zip(self.player_feet([frame])[0], self.teams):
+            x1, y1 = int(x - cam - self.box_w / 2), int(y - self.box_h)
+            x2, y2 = x1 + self.box_w, int(y)
+            color = tuple(int(c) for c in TEAM_COLORS[team])
+            cv2.rectangle(image, (x1, y1), (x2, y1 + int(0.6 * self.box_h)), color, -1)
+            cv2.rectangle(image, (x1, y1 + int(0.6 * self.box_h)), (x2, y2), (40, 40, 40), -1)
+
+        bx, by = self.ball([frame])[0]
+        cv2.circle(image, (int(bx - cam), int(by)), max(3, self.box_w // 3), BALL, -1)
+
+        return image
+
+    def write_video(self, path, codec="mp4v"):
+
+        writer = cv2.VideoWriter(
+            path, cv2.VideoWriter_fourcc(*codec), self.fps, (self.width, self.height)
+        )
+
+        for frame in range(self.total_frames):
+            writer.write(self.render(frame))
+
+        writer.release()
+        return path
+
+    # ----------------------------
+    # DETECTIONS
+    # ----------------------------
+
+    def _court_polygons(self, cam, sx, sy):
+
+        h, w = self.height, self.court_width
+        polygons = []
+
+        for side in (0, 1):
+            x0 = 0 if side == 0 else 0.84 * w
+            paint = np.array([
+                [x0, 0.45 * h], [x0 + 0.16 * w, 0.45 * h],
+                [x0 + 0.16 * w, 0.8 * h], [x0, 0.8 * h]
+            ])
+            polygons.append(("paint", paint))
+
+            cx = 0.03 * w if side == 0 else 0.97 * w
+            angles = np.linspace(-np.pi / 2, np.pi / 2, 40) + (0 if side == 0 else np.pi)
+            arc = np.stack([cx + 0.3 * w * np.cos(angles), 0.62 * h + 0.34 * h * np.sin(angles)], axis=1)
+            polygons.append(("three point line", arc))
+
+        records = []
+
+        for name, poly in polygons:
+
+            view = (poly - [cam, 0]) * [sx, sy]
+            view[:, 0] = view[:, 0].clip(0, RECORD_SIZE)
+            view[:, 1] = view[:, 1].clip(0, RECORD_SIZE)
+
+            if np.ptp(view[:, 0]) < 1:
+                continue
+
+            records.append({
+                "class": name,
+                "bbox": [float(view[:, 0].min()), float(view[:, 1].min()),
+                         float(view[:, 0].max()), float(view[:, 1].max())],
+                "polygon": view.round(1).tolist()
+            })
+
+        return records
+
+    def detections(self, stride=5, ids=False):
+        """
+        frame_level_detection records for every `stride`-th frame (640x640
+        space). With `ids`, each player also carries its ground-truth "id".
+        """
+
+        frames = np.arange(0, self.total_frames, stride)
+        feet = self.player_feet(frames)
+        balls = self.ball(frames)
+        cams = self.camera_x(frames)
+
+        sx = RECORD_SIZE / self.width
+        sy = RECORD_SIZE / self.height
+
+        records = []
+        segmentation = None
+        last_cam = None
+
+        for i, frame in enumerate(frames):
+
+            cam = cams[i]
+
+            # Polygons only change noticeably once the camera has moved
+            if last_cam is None or abs(cam - last_cam) > 0.02 * self.width:
+                segmentation = self._court_polygons(cam, sx, sy)
+                last_cam = cam
+
+            players = []
+
+            for player_id, ((x, y), team) in enumerate(zip(feet[i], self.teams)):
+
+                x1, x2 = (x - cam - self.box_w / 2) * sx, (x - cam + self.box_w / 2) * sx
+                y1, y2 = (y - self.box_h) * sy, y * sy
+
+                if x2 < 0 or x1 > RECORD_SIZE:
+                    continue
+
+                players.append({
+                    "center": [float((x1 + x2) / 2), float((y1 + y2) / 2)],
+                    "bbox": [float(x1), float(y1), float(x2), float(y2)],
+                    "team": str(team),
+                    "zone": "unknown"
+                })
+
+                if ids:
+                    players[-1]["id"] = player_id
+
+            bx, by = (balls[i][0] - cam) * sx, balls[i][1] * sy
+            ball = [float(bx), float(by)] if 0 <= bx <= RECORD_SIZE else None
+
+            rims = [(rx - cam) * sx for rx, _ in self.rims]
+            visible = [j for j, rx in enumerate(rims) if 0 <= rx <= RECORD_SIZE]
+            rim = [float(rims[visible[0]]), float(self.rims[visible[0]][1] * sy)] if visible else None
+
+            records.append({
+                "frame": int(frame),
+                "players": players,
+                "ball": ball,
+                "rim": rim,
+                "segmentation": segmentation
+            })
+
+        return records
@@ -0,0 +1,155 @@
+# Gasby-Ai/benchmarks/team_colors.py
+#
+# Team classification: the fixed BGR lookup vs the per-video palette, on
+# synthetic players in dim, warm gym lighting.
+#
+#   python -m benchmarks.team_colors [--frames 300] [--players 10] [--seed 0] [--out results.json]
+
+import sys
+import json
+import time
+
+import numpy as np
+
+from benchmarks.stubs import in_service
+
+
+TEAM_COLORS = {
+    "Red Team": [0, 0, 255],
+    "White Team": [255, 255, 255]
+}
+
+FLOOR_BGR = (70, 130, 190)
+SKIN_BGR = (90, 120, 170)
+SHORTS_BGR = (40, 40, 40)
+
+
+# -------------------------------------------------
+# BASELINE (previous closest_color on the whole crop)
+# -------------------------------------------------
+
+def closest_color(avg_bgr, team_colors):
+    min_dist = float("inf")
+    best_team = "unknown"
+
+    for team_name, color_bgr in team_colors.items():
+        dist = np.linalg.norm(np.array(avg_bgr) - np.array(color_bgr))
+        if dist < min_dist:
+            min_dist = dist
+            best_team = team_name
+
+    return best_team
+
+
+# -------------------------------------------------
+# SYNTHETIC FOOTAGE
+# -------------------------------------------------
+
+def synth_frame(rng, players_per_frame):
+    """Court-colored 640x640 frame with players in dim, warm gym lighting."""
+
+    frame = np.empty((640, 640, 3), dtype=np.uint8)
+    frame[:] = FLOOR_BGR
+
+    gain = rng.uniform(0.45, 0.8)
+    tint = np.array([0.8, 0.95, 1.1])
+
+    boxes, truth = [], []
+    names = list(TEAM_COLORS)
+
+    for _ in range(players_per_frame):
+
+        w = int(rng.integers(30, 60))
+        h = int(w * rng.uniform(2.0, 2.6))
+        x1 = int(rng.integers(0, 640 - w))
+        y1 = int(rng.integers(0, 640 - h))
+
+        team = names[int(rng.integers(0, len(names)))]
+        jersey = np.clip(np.array(TEAM_COLORS[team]) * gain * tint + rng.normal(0, 8, 3), 0, 255)
+
+        head = int(h * 0.15)
+        torso = int(h * 0.5)
+        legs = int(h * 0.75)
+
+        frame[y1:y1 + head, x1 + w // 3:x1 + 2 * w // 3] = SKIN_BGR
+        frame[y1 + head:y1 + torso, x1:x1 + w] = jersey
+        frame[y1 + torso:y1 + legs, x1 + w // 5:x1 + 4 * w // 5] = SHORTS_BGR
+        frame[y1 + legs:y1 + h, x1 + w // 4:x1 + 3 * w // 4] = SKIN_BGR
+
+        boxes.append([float(x1), float(y1), float(x1 + w), float(y1 + h)])
+        truth.append(team)
+
+    return frame, boxes, truth
+
+
+def compare_team_colors(n_frames=300, per_frame=10, seed=0):
+    """Accuracy and players/sec of both classifiers on the same frames."""
+
+    with in_service("yolo_service"):
+        from team_palette import TeamPalette, jersey_colors
+
+    rng = np.random.default_rng(seed)
+    data = [synth_frame(rng, per_frame) for _ in range(n_frames)]
+    total = n_frames * per_frame
+
+    # Baseline
+    correct = 0
+    start = time.perf_counter()
+    for frame, boxes, truth in data:
+        for (x1, y1, x2, y2), team in zip(boxes, truth):
+            crop = frame[int(y1):int(y2), int(x1):int(x2)]
+            correct += closest_color(crop.mean(axis=(0, 1)), TEAM_COLORS) == team
+    baseline_time = time.perf_counter() - start
+    baseline_acc = correct / total
+
+    # Palette
+    palette = TeamPalette(TEAM_COLORS)
+    correct = 0
+    start = time.perf_counter()
+    pending = []
+    for frame, boxes, truth in data:
+        jersey, valid = jersey_colors(frame, boxes)
+        palette.observe(jersey[valid])
+        pending.append((jersey, truth))
+        if palette.ready:
+            for jersey, truth in pending:
+                correct += sum(p == t for p, t in zip(palette.classify(jersey), truth))
+            pending = []
+    if pending:
+        palette.fit()
+        for jersey, truth in pending:
+            correct += sum(p == t for p, t in zip(palette.classify(jersey), truth))
+    palette_time = time.perf_counter() - start
+    palette_acc = correct / total
+
+    return {
+        "players": int(total),
+        "fixed_lookup": {
+            "accuracy": round(float(baseline_acc), 4),
+            "players_per_sec": round(total / baseline_time, 1)
+        },
+        "palette": {
+            "accuracy": round(float(palette_acc), 4),
+            "players_per_sec": round(total / palette_time, 1)
+        }
+    }
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    results = compare_team_colors(
+        n_frames=int(opts.get("--frames", 300)),
+        per_frame=int(opts.get("--players", 10)),
+        seed=int(opts.get("--seed", 0))
+    )
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,143 @@
+# Gasby-Ai/benchmarks/tracking_scaling.py
+#
+# build_tracks cost and track quality against game length and sampling
+# stride on synthetic games up to 2 hours. Records per second should stay
+# flat as the game gets longer; with motion prediction, fragmentation
+# should stay flat as the stride grows.
+#
+# Every run is reported with and without motion prediction, with the
+# tracker's own fragmentation metric plus purity against the synthetic
+# ground truth (share of each track's boxes that belong to one player).
+# With --baseline, the original matcher (greedy, against every track ever
+# created) runs too, for games up to --baseline-max minutes, with the same
+# track count and purity. Compare counts only at similar purity: a tracker
+# that never retires tracks keeps the count low by absorbing other players
+# into stale tracks.
+#
+#   python -m benchmarks.tracking_scaling [--minutes 15,30,60,120] [--strides 5,10,15]
+#                                         [--fps 30] [--seed 0] [--baseline 1]
+#                                         [--baseline-max 30] [--out results.json]
+
+import sys
+import json
+import time
+from collections import Counter
+
+from benchmarks.synthetic import SyntheticGame
+from benchmarks.stubs import in_service
+
+
+def greedy_all_tracks(frame_data, compute_iou, TrackedPlayer, iou_threshold=0.3):
+    """The matcher build_tracks used before track expiry."""
+
+    tracks = []
+
+    for frame in frame_data:
+        for p in frame.get("players", []):
+
+            best, best_iou = None, 0
+
+            for track in tracks:
+                iou = compute_iou(p["bbox"], track.last_bbox)
+                if iou > best_iou and iou > iou_threshold:
+                    best, best_iou = track, iou
+
+            if best is None:
+                best = TrackedPlayer(len(tracks))
+                tracks.append(best)
+
+            best.bboxes[frame["frame"]] = p["bbox"]
+            best.last_bbox = p["bbox"]
+
+    return tracks
+
+
+def purity(tracks, detections):
+    """Share of tracked boxes that belong to their track's majority ground-truth player."""
+
+    truth = {
+        (record["frame"], tuple(p["bbox"])): p["id"]
+        for record in detections for p in record["players"]
+    }
+
+    majority = total = 0
+
+    for track in tracks:
+        ids = Counter(truth[(frame, tuple(bbox))] for frame, bbox in track.bboxes.items())
+        majority += ids.most_common(1)[0][1]
+        total += len(track.bboxes)
+
+    return round(majority / total, 4) if total else None
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    minutes = [float(m) for m in opts.get("--minutes", "15,30,60,120").split(",")]
+    strides = [int(s) for s in opts.get("--strides", "5,10,15").split(",")]
+    fps = int(opts.get("--fps", 30))
+    seed = int(opts.get("--seed", 0))
+    baseline = opts.get("--baseline", "0") not in ("0", "false")
+    baseline_max = float(opts.get("--baseline-max", 30))
+
+    with in_service("action_service"):
+        from service.tracking import build_tracks, compute_iou, fragmentation, TrackedPlayer
+
+    rows = []
+
+    for m in minutes:
+
+        # Small frames: only the detections are generated, nothing is rendered
+        game = SyntheticGame(seconds=m * 60, fps=fps, width=320, height=180, seed=seed)
+
+        for stride in strides:
+
+            detections, generate_sec = timed(game.detections, stride, ids=True)
+
+            row = {
+                "minutes": m,
+                "stride": stride,
+                "records": len(detections),
+                "generate_sec": round(generate_sec, 3)
+            }
+
+            for name, motion in (("motion", True), ("last_box", False)):
+
+                tracks, seconds = timed(build_tracks, detections, motion=motion, fps=fps)
+
+                row[name] = dict(
+                    seconds=round(seconds, 3),
+                    records_per_sec=round(len(detections) / seconds, 1),
+                    purity=purity(tracks, detections),
+                    **fragmentation(tracks)
+                )
+
+            if baseline and m <= baseline_max:
+                tracks, base_sec = timed(greedy_all_tracks, detections, compute_iou, TrackedPlayer)
+                row["baseline"] = {
+                    "seconds": round(base_sec, 3),
+                    "records_per_sec": round(len(detections) / base_sec, 1),
+                    "tracks": len(tracks),
+                    "purity": purity(tracks, detections)
+                }
+
+            rows.append(row)
+            print(f"⏱ {m:g} min, stride {stride}: {json.dumps(row)}")
+
+    results = {"fps": fps, "seed": seed, "rows": rows}
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,194 @@
+# Gasby-Ai/benchmarks/yolo_backends.py
+#
+# Accuracy vs speed of the YOLO inference backends.
+#
+# Accuracy is agreement with the torch backend on the same frames: a box
+# counts as matched when a torch box of the same class overlaps it with
+# IoU >= 0.5. Segmentation agreement uses the same rule on mask boxes.
+# Backends whose weights have not been exported are skipped; backends that
+# fail to load or predict are reported under "errors".
+#
+#   python -m benchmarks.yolo_backends [--frames 200] [--backends torch,onnx,onnx-int8]
+#                                      [--video game.mp4] [--seconds 30] [--out results.json]
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticGame
+from benchmarks.stubs import in_service
+
+
+def sample_frames(video_path, n_frames):
+
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+
+    for idx in np.linspace(0, max(total - 1, 0), n_frames).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.resize(frame, (640, 640)))
+
+    cap.release()
+    return frames
+
+
+def boxes_of(results):
+    out = []
+    for r in results:
+        if r.boxes is None or len(r.boxes) == 0:
+            out.append((np.zeros((0, 4)), np.zeros(0, dtype=int)))
+        else:
+            out.append((r.boxes.xyxy.cpu().numpy(), r.boxes.cls.cpu().numpy().astype(int)))
+    return out
+
+
+def iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def agreement(reference, candidate):
+    """(precision, recall) of candidate boxes against reference boxes."""
+
+    matched_c = matched_r = total_c = total_r = 0
+
+    for (rb, rc), (cb, cc) in zip(reference, candidate):
+
+        total_r += len(rb)
+        total_c += len(cb)
+
+        if len(rb) == 0 or len(cb) == 0:
+            continue
+
+        ious = iou_matrix(cb, rb) * (cc[:, None] == rc[None, :])
+        matched_c += int((ious.max(axis=1) >= 0.5).sum())
+        matched_r += int((ious.max(axis=0) >= 0.5).sum())
+
+    precision = matched_c / total_c if total_c else 1.0
+    recall = matched_r / total_r if total_r else 1.0
+    return precision, recall
+
+
+def run_backend(backend, frames, batch_size=8):
+
+    from inference_backend import load_models, predict_device
+    from video_handler import DEVICE
+
+    det_model, seg_model = load_models(backend, DEVICE)
+    device = predict_device(backend, DEVICE)
+
+    # Warm-up (session creation, graph compilation)
+    det_model.predict(frames[:1], conf=0.25, device=device, verbose=False)
+    seg_model.predict(frames[:1], conf=0.25, device=device, verbose=False)
+
+    det, seg = [], []
+    start = time.perf_counter()
+
+    for i in range(0, len(frames), batch_size):
+        batch = frames[i:i + batch_size]
+        det.extend(det_model.predict(batch, conf=0.25, device=device, verbose=False))
+        seg.extend(seg_model.predict(batch, conf=0.25, device=device, verbose=False))
+
+    elapsed = time.perf_counter() - start
+
+    return boxes_of(det), boxes_of(seg), elapsed
+
+
+def compare_backends(video_path, n_frames=200, backends=None):
+    """ms/frame and agreement with torch per backend; torch always runs as the reference."""
+
+    with in_service("yolo_service"):
+        from inference_backend import BACKENDS, MODEL_KINDS, weights_path
+
+    frames = sample_frames(video_path, n_frames)
+    backends = list(backends or BACKENDS)
+
+    if "torch" not in backends:
+        backends.insert(0, "torch")
+
+    results = {}
+    skipped = {}
+    errors = {}
+
+    for backend in backends:
+
+        # Weights never exported are skipped; anything failing after that is an error
+        with in_service("yolo_service"):
+            missing = [weights_path(kind, backend) for kind in MODEL_KINDS
+                       if not os.path.exists(weights_path(kind, backend))]
+
+        if missing:
+            print(f"⚠ Skipping {backend}: not exported ({', '.join(missing)})")
+            skipped[backend] = f"not exported: {', '.join(missing)}"
+            continue
+
+        try:
+            with in_service("yolo_service"):
+                results[backend] = run_backend(backend, frames)
+        except Exception as e:
+            print(f"❌ {backend} failed: {e}")
+            errors[backend] = str(e)
+
+    if "torch" in errors:
+        raise RuntimeError(f"torch reference failed: {errors['torch']}")
+
+    if "torch" not in results:
+        raise RuntimeError(f"skipped: torch reference unavailable ({skipped.get('torch')})")
+
+    ref_det, ref_seg, _ = results["torch"]
+    rows = {}
+
+    for backend, (det, seg, elapsed) in results.items():
+
+        dp, dr = agreement(ref_det, det)
+        sp, sr = agreement(ref_seg, seg)
+
+        rows[backend] = {
+            "ms_per_frame": round(1000 * elapsed / len(frames), 2),
+            "det_precision": round(dp, 4),
+            "det_recall": round(dr, 4),
+            "seg_precision": round(sp, 4),
+            "seg_recall": round(sr, 4)
+        }
+
+    return {"frames": len(frames), "backends": rows, "skipped": skipped, "errors": errors}
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    backends = opts["--backends"].split(",") if "--backends" in opts else None
+
+    with tempfile.TemporaryDirectory() as root:
+
+        if "--video" in opts:
+            video = os.path.abspath(opts["--video"])
+        else:
+            game = SyntheticGame(seconds=int(opts.get("--seconds", 30)), fps=30, width=854, height=480)
+            video = game.write_video(os.path.join(root, "synthetic.mp4"))
+
+        results = compare_backends(video, int(opts.get("--frames", 200)), backends)
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
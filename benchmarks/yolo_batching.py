@@ -0,0 +1,108 @@
+# Gasby-Ai/benchmarks/yolo_batching.py
+#
+# Sampled frames/sec of VideoHandler.run_detectors against batch size, and
+# whether every batch size produces the same records as batch size 1.
+#
+# Runs on a seeded synthetic game unless a real video is given.
+#
+#   python -m benchmarks.yolo_batching [--sizes 1,2,4,8,16] [--seconds 30] [--seed 0]
+#                                      [--video game.mp4] [--out results.json]
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+import cv2
+
+from benchmarks.synthetic import SyntheticGame, TEAM_COLORS
+from benchmarks.stubs import in_service
+
+
+SIZES = (1, 2, 4, 8, 16)
+
+
+def run_once(VideoHandler, video_path, batch_size, out_dir):
+
+    video = cv2.VideoCapture(video_path)
+
+    if not video.isOpened():
+        raise Exception(f"❌ Failed to open video file: {video_path}")
+
+    handler = VideoHandler(video, TEAM_COLORS, batch_size=batch_size)
+
+    start = time.perf_counter()
+    frame_data = handler.run_detectors(out_dir)
+    elapsed = time.perf_counter() - start
+
+    return frame_data, elapsed, handler.stage_report
+
+
+def sweep(video_path, sizes):
+    """One row per batch size; batch size 1 always runs first as the reference."""
+
+    with in_service("yolo_service"):
+        from video_handler import VideoHandler
+
+    sizes = sorted(set(sizes) | {1})
+
+    baseline = None
+    rows = []
+
+    with tempfile.TemporaryDirectory() as out_dir:
+
+        for batch_size in sizes:
+
+            with in_service("yolo_service"):
+                frame_data, elapsed, report = run_once(VideoHandler, video_path, batch_size, out_dir)
+
+            records = json.dumps(frame_data, sort_keys=True)
+
+            if baseline is None:
+                baseline = records
+
+            rows.append({
+                "batch_size": batch_size,
+                "frames": len(frame_data),
+                "seconds": round(elapsed, 3),
+                "frames_per_sec": round(len(frame_data) / elapsed, 2) if elapsed > 0 else None,
+                "matches_batch_1": records == baseline,
+                "bottleneck": report.get("bottleneck")
+            })
+
+            print(f"   batch {batch_size:>3}: {rows[-1]['frames_per_sec']} frames/s")
+
+    return rows
+
+
+if __name__ == "__main__":
+
+    opts = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+
+    sizes = [int(s) for s in opts["--sizes"].split(",")] if "--sizes" in opts else SIZES
+
+    with tempfile.TemporaryDirectory() as root:
+
+        if "--video" in opts:
+            video = os.path.abspath(opts["--video"])
+        else:
+            game = SyntheticGame(
+                seconds=int(opts.get("--seconds", 30)), fps=30, width=854, height=480,
+                seed=int(opts.get("--seed", 0))
+            )
+            video = game.write_video(os.path.join(root, "synthetic.mp4"))
+
+        results = {
+            "video": opts.get("--video", "synthetic"),
+            "rows": sweep(video, sizes)
+        }
+
+    out = opts.get("--out")
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("✅ Results written to", out)
+    else:
+        print(json.dumps(results, indent=2))
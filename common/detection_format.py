@@ -0,0 +1,349 @@
+# Gasby-Ai/common/detection_format.py
+#
+# Columnar binary (NPZ) container for frame-level detections.
+#
+# python -m common.detection_format <in.npz> <out.json>   -> debug JSON export
+
+import os
+import sys
+import json
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+DETECTION_NPZ = "frame_level_detection.npz"
+DETECTION_JSON = "frame_level_detection.json"
+
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+
+def _point_or_nan(value):
+    return value if value is not None else [np.nan, np.nan]
+
+
+def _nan_to_none(row):
+    return None if np.isnan(row[0]) else [float(row[0]), float(row[1])]
+
+
+def _codes(values, names):
+    """Maps strings to uint8 codes, growing `names` as new values appear."""
+
+    index = {name: i for i, name in enumerate(names)}
+    codes = np.empty(len(values), dtype=np.uint8)
+
+    for i, value in enumerate(values):
+        if value not in index:
+            index[value] = len(names)
+            names.append(value)
+        codes[i] = index[value]
+
+    return codes
+
+
+# -------------------------------------------------
+# WRITER
+# -------------------------------------------------
+
+def write_detections(path, frame_level_data, compress=True):
+    """
+    Writes detection records as flat arrays.
+
+    Players and polygon points are stored CSR-style (values + offsets).
+    Segmentation lists are de-duplicated: consecutive frames that share the
+    same court polygons (see SegmentationCache) point at one stored set.
+    Coordinates are float32.
+    """
+
+    n = len(frame_level_data)
+
+    frames = np.empty(n, dtype=np.int64)
+    ball = np.empty((n, 2), dtype=np.float32)
+    rim = np.empty((n, 2), dtype=np.float32)
+
+    player_offsets = np.zeros(n + 1, dtype=np.int64)
+    player_center, player_bbox, player_team, player_zone = [], [], [], []
+
+    seg_set_index = np.empty(n, dtype=np.int64)
+    seg_set_offsets = [0]
+    seg_class, seg_bbox, seg_point_offsets, seg_points = [], [], [0], []
+
+    prev_seg = None
+
+    for i, record in enumerate(frame_level_data):
+
+        frames[i] = record["frame"]
+        ball[i] = _point_or_nan(record.get("ball"))
+        rim[i] = _point_or_nan(record.get("rim"))
+
+        players = record.get("players", [])
+        player_offsets[i + 1] = player_offsets[i] + len(players)
+
+        for p in players:
+            player_center.append(p["center"])
+            player_bbox.append(p["bbox"])
+            player_team.append(p.get("team", "unknown"))
+            player_zone.append(p.get("zone", "unknown"))
+
+        seg = record.get("segmentation", [])
+
+        if prev_seg is not None and (seg is prev_seg or seg == prev_seg):
+            seg_set_index[i] = seg_set_index[i - 1]
+            continue
+
+        for s in seg:
+            seg_class.append(s["class"])
+            seg_bbox.append(s["bbox"])
+            seg_points.extend(s["polygon"])
+            seg_point_offsets.append(len(seg_points))
+
+        seg_set_offsets.append(len(seg_class))
+        seg_set_index[i] = len(seg_set_offsets) - 2
+        prev_seg = seg
+
+    team_names, zone_names, class_names = [], [], []
+
+    arrays = {
+        "version": np.array(FORMAT_VERSION),
+        "frames": frames,
+        "ball": ball,
+        "rim": rim,
+        "player_offsets": player_offsets,
+        "player_center": np.asarray(player_center, dtype=np.float32).reshape(-1, 2),
+        "player_bbox": np.asarray(player_bbox, dtype=np.float32).reshape(-1, 4),
+        "player_team": _codes(player_team, team_names),
+        "player_zone": _codes(player_zone, zone_names),
+        "seg_set_index": seg_set_index,
+        "seg_set_offsets": np.asarray(seg_set_offsets, dtype=np.int64),
+        "seg_class": _codes(seg_class, class_names),
+        "seg_bbox": np.asarray(seg_bbox, dtype=np.float32).reshape(-1, 4),
+        "seg_point_offsets": np.asarray(seg_point_offsets, dtype=np.int64),
+        "seg_points": np.asarray(seg_points, dtype=np.float32).reshape(-1, 2)
+    }
+
+    arrays["team_names"] = np.array(team_names, dtype=np.str_)
+    arrays["zone_names"] = np.array(zone_names, dtype=np.str_)
+    arrays["class_names"] = np.array(class_names, dtype=np.str_)
+
+    return _save(path, arrays, compress)
+
+
+def _save(path, arrays, compress):
+
+    with open(path, "wb") as f:
+        if compress:
+            np.savez_compressed(f, **arrays)
+        else:
+            np.savez(f, **arrays)
+
+    return path
+
+
+def merge_detections(paths, out_path, compress=True):
+    """
+    Concatenates detection NPZ files (in frame order) into one, array by
+    array: offsets are rebased and name codes remapped, without building
+    per-frame records. Segmentation sets are not de-duplicated across
+    file boundaries.
+    """
+
+    paths = list(paths)
+
+    if not paths:
+        return write_detections(out_path, [], compress)
+
+    columns = {key: [] for key in (
+        "frames", "ball", "rim", "player_center", "player_bbox", "player_team", "player_zone",
+        "seg_set_index", "seg_class", "seg_bbox", "seg_points"
+    )}
+
+    player_offsets = [np.zeros(1, dtype=np.int64)]
+    seg_set_offsets = [np.zeros(1, dtype=np.int64)]
+    seg_point_offsets = [np.zeros(1, dtype=np.int64)]
+
+    names = {"team": [], "zone": [], "class": []}
+
+    def remap(codes, file_names, kind):
+        """Codes into `file_names` -> codes into the merged name list."""
+        return _codes(file_names, names[kind])[codes]
+
+    players = sets = segs = points = 0
+
+    for path in paths:
+
+        d = read_detections(path)
+
+        columns["frames"].append(d.frames)
+        columns["ball"].append(d.ball)
+        columns["rim"].append(d.rim)
+
+        columns["player_center"].append(d.player_center)
+        columns["player_bbox"].append(d.player_bbox)
+        columns["player_team"].append(remap(d.player_team, d.team_names, "team"))
+        columns["player_zone"].append(remap(d.player_zone, d.zone_names, "zone"))
+        player_offsets.append(d.player_offsets[1:] + players)
+
+        columns["seg_set_index"].append(d.seg_set_index + sets)
+        seg_set_offsets.append(d.seg_set_offsets[1:] + segs)
+
+        columns["seg_class"].append(remap(d.seg_class, d.class_names, "class"))
+        columns["seg_bbox"].append(d.seg_bbox)
+        seg_point_offsets.append(d.seg_point_offsets[1:] + points)
+        columns["seg_points"].append(d.seg_points)
+
+        players += len(d.player_bbox)
+        sets += len(d.seg_set_offsets) - 1
+        segs += len(d.seg_class)
+        points += len(d.seg_points)
+
+    arrays = {key: np.concatenate(parts) for key, parts in columns.items()}
+
+    arrays.update(
+        version=np.array(FORMAT_VERSION),
+        player_offsets=np.concatenate(player_offsets),
+        seg_set_offsets=np.concatenate(seg_set_offsets),
+        seg_point_offsets=np.concatenate(seg_point_offsets),
+        team_names=np.array(names["team"], dtype=np.str_),
+        zone_names=np.array(names["zone"], dtype=np.str_),
+        class_names=np.array(names["class"], dtype=np.str_)
+    )
+
+    return _save(out_path, arrays, compress)
+
+
+# -------------------------------------------------
+# READER
+# -------------------------------------------------
+
+class DetectionFile:
+    """
+    Read-only view over an NPZ detection file.
+
+    Iterating yields one dict per frame with the same shape as the records
+    in frame_level_detection.json, so existing consumers (build_tracks,
+    enrich_game_intelligence) work unchanged. Columnar arrays are available
+    as attributes for vectorized consumers.
+    """
+
+    def __init__(self, arrays):
+
+        version = int(arrays["version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported detection format version: {version}")
+
+        self.frames = arrays["frames"]
+        self.ball = arrays["ball"]
+        self.rim = arrays["rim"]
+
+        self.player_offsets = arrays["player_offsets"]
+        self.player_center = arrays["player_center"]
+        self.player_bbox = arrays["player_bbox"]
+        self.player_team = arrays["player_team"]
+        self.player_zone = arrays["player_zone"]
+
+        self.seg_set_index = arrays["seg_set_index"]
+        self.seg_set_offsets = arrays["seg_set_offsets"]
+        self.seg_class = arrays["seg_class"]
+        self.seg_bbox = arrays["seg_bbox"]
+        self.seg_point_offsets = arrays["seg_point_offsets"]
+        self.seg_points = arrays["seg_points"]
+
+        self.team_names = [str(t) for t in arrays["team_names"]]
+        self.zone_names = [str(z) for z in arrays["zone_names"]]
+        self.class_names = [str(c) for c in arrays["class_names"]]
+
+        self._seg_sets = {}
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        for i in range(len(self.frames)):
+            yield self.record(i)
+
+    def __getitem__(self, i):
+        return self.record(i)
+
+    def _segmentation(self, set_id):
+
+        if set_id in self._seg_sets:
+            return self._seg_sets[set_id]
+
+        seg = []
+
+        for j in range(self.seg_set_offsets[set_id], self.seg_set_offsets[set_id + 1]):
+            start, end = self.seg_point_offsets[j], self.seg_point_offsets[j + 1]
+            seg.append({
+                "class": self.class_names[self.seg_class[j]],
+                "bbox": self.seg_bbox[j].tolist(),
+                "polygon": self.seg_points[start:end].tolist()
+            })
+
+        self._seg_sets[set_id] = seg
+        return seg
+
+    def record(self, i):
+
+        start, end = self.player_offsets[i], self.player_offsets[i + 1]
+
+        players = [
+            {
+                "center": self.player_center[j].tolist(),
+                "bbox": self.player_bbox[j].tolist(),
+                "team": self.team_names[self.player_team[j]],
+                "zone": self.zone_names[self.player_zone[j]]
+            }
+            for j in range(start, end)
+        ]
+
+        return {
+            "frame": int(self.frames[i]),
+            "players": players,
+            "ball": _nan_to_none(self.ball[i]),
+            "rim": _nan_to_none(self.rim[i]),
+            "segmentation": self._segmentation(int(self.seg_set_index[i]))
+        }
+
+    def to_list(self):
+        return list(self)
+
+
+def read_detections(path):
+    with np.load(path, allow_pickle=False) as npz:
+        return DetectionFile({key: npz[key] for key in npz.files})
+
+
+def load_detections(path):
+    """
+    Loads any format: a stream directory through DetectionStream, NPZ
+    through DetectionFile, anything else as JSON.
+    """
+
+    if os.path.isdir(path):
+        from common.detection_stream import DetectionStream
+        return DetectionStream(path)
+
+    if str(path).endswith(".npz"):
+        return read_detections(path)
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_json(detections, path, indent=4):
+    with open(path, "w") as f:
+        json.dump(list(detections), f, indent=indent)
+    return path
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m common.detection_format <in.npz> <out.json>")
+        sys.exit(1)
+
+    export_json(read_detections(sys.argv[1]), sys.argv[2])
+    print("✅ Exported", sys.argv[2])
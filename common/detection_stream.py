@@ -0,0 +1,318 @@
+# Gasby-Ai/common/detection_stream.py
+#
+# Streaming detection output: records are flushed in fixed-size chunks
+# (each chunk is a regular detection NPZ) next to a manifest.json that
+# lists the chunks written so far and marks completion. The producer's
+# memory stays flat and consumers can tail the stream while it grows.
+#
+#   frame_level_detection_stream/
+#       manifest.json
+#       part-00000.npz
+#       part-00001.npz
+#       ...
+
+import os
+import json
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from common.detection_format import FORMAT_VERSION, write_detections, read_detections, merge_detections
+
+
+DETECTION_STREAM = "frame_level_detection_stream"
+STREAM_MANIFEST = "manifest.json"
+STREAM_JSONL = "frame_level_detection.jsonl"
+CHUNK_FRAMES = 256
+
+
+def _chunk_name(index):
+    return f"part-{index:05d}.npz"
+
+
+def write_manifest(directory, manifest):
+    """Atomically replaces the manifest, so tailing readers never see a partial one."""
+
+    path = os.path.join(directory, STREAM_MANIFEST)
+    tmp = path + ".tmp"
+
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+
+    os.replace(tmp, path)
+    return path
+
+
+# -------------------------------------------------
+# WRITER
+# -------------------------------------------------
+
+class DetectionStreamWriter:
+    """
+    Buffers records and writes them out a chunk at a time.
+
+    `flush(full_only=True)` writes only whole chunks, so the caller decides
+    when buffered records are final (e.g. once their team labels are known).
+    `sink(local_path, name)`, if given, publishes every chunk and manifest
+    (e.g. to S3) on a background thread, in write order. A failed upload
+    is raised by the next write (or close), not only at the end.
+    """
+
+    def __init__(self, directory, chunk_frames=CHUNK_FRAMES, sink=None, jsonl=False):
+        self.directory = directory
+        self.chunk_frames = max(1, int(chunk_frames))
+        self.sink = sink
+        self.jsonl = jsonl
+
+        self.chunks = []
+        self.records = 0
+        self.complete = False
+        self._buffer = []
+
+        self._publisher = ThreadPoolExecutor(max_workers=1) if sink else None
+        self._pending = []
+        self._published = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._write_manifest()
+
+    def append(self, record):
+        self._buffer.append(record)
+
+    def flush(self, full_only=False):
+
+        while len(self._buffer) >= self.chunk_frames:
+            self._write_chunk(self._buffer[:self.chunk_frames])
+            self._buffer = self._buffer[self.chunk_frames:]
+
+        if not full_only and self._buffer:
+            self._write_chunk(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        """Writes the remaining records and marks the stream complete."""
+
+        self.flush()
+        self.complete = True
+        self._write_manifest()
+
+        if self._publisher is not None:
+            for future in self._pending:
+                future.result()
+            self._pending = []
+            self._publisher.shutdown()
+
+        return os.path.join(self.directory, STREAM_MANIFEST)
+
+    def _write_chunk(self, records):
+
+        name = _chunk_name(len(self.chunks))
+        path = write_detections(os.path.join(self.directory, name), records)
+
+        if self.jsonl:
+            with open(os.path.join(self.directory, STREAM_JSONL), "a") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+
+        self.chunks.append({
+            "name": name,
+            "records": len(records),
+            "first_frame": records[0]["frame"],
+            "last_frame": records[-1]["frame"]
+        })
+        self.records += len(records)
+
+        self._publish(path, name)
+        self._write_manifest()
+
+    def _write_manifest(self):
+        path = write_manifest(self.directory, self.manifest())
+        self._publish(path, STREAM_MANIFEST)
+
+    def _publish(self, path, name):
+
+        if self._publisher is None:
+            return
+
+        # Finished uploads are dropped; result() re-raises a failed one here
+        for future in [f for f in self._pending if f.done()]:
+            self._pending.remove(future)
+            future.result()
+
+        # The manifest is rewritten in place, so publish a snapshot of it
+        if name == STREAM_MANIFEST:
+            with open(path, "rb") as f:
+                data = f.read()
+            snapshot = f"{path}.{self._published}"
+            with open(snapshot, "wb") as f:
+                f.write(data)
+            path = snapshot
+
+        self._published += 1
+        self._pending.append(self._publisher.submit(self._send, path, name))
+
+    def _send(self, path, name):
+        self.sink(path, name)
+        if name == STREAM_MANIFEST:
+            os.remove(path)
+
+    def manifest(self):
+        return {
+            "format_version": FORMAT_VERSION,
+            "chunk_frames": self.chunk_frames,
+            "chunks": self.chunks,
+            "records": self.records,
+            "complete": self.complete
+        }
+
+    def stats(self):
+        return {
+            "chunks": len(self.chunks),
+            "records": self.records,
+            "chunk_frames": self.chunk_frames,
+            "complete": self.complete
+        }
+
+
+def stream_from_file(npz_path, directory):
+    """Publishes an existing detection NPZ as a complete one-chunk stream."""
+
+    detections = read_detections(npz_path)
+    os.makedirs(directory, exist_ok=True)
+
+    chunks = []
+
+    if len(detections):
+        name = _chunk_name(0)
+        shutil.copyfile(npz_path, os.path.join(directory, name))
+        chunks.append({
+            "name": name,
+            "records": len(detections),
+            "first_frame": int(detections.frames[0]),
+            "last_frame": int(detections.frames[-1])
+        })
+
+    return write_manifest(directory, {
+        "format_version": FORMAT_VERSION,
+        "chunk_frames": max(1, len(detections)),
+        "chunks": chunks,
+        "records": len(detections),
+        "complete": True
+    })
+
+
+def merge_stream(directory, npz_path):
+    """Writes the chunks of a complete stream as one detection NPZ, without decoding records."""
+
+    with open(os.path.join(directory, STREAM_MANIFEST)) as f:
+        manifest = json.load(f)
+
+    if not manifest["complete"]:
+        raise ValueError(f"Detection stream is not complete: {directory}")
+
+    return merge_detections(
+        [os.path.join(directory, chunk["name"]) for chunk in manifest["chunks"]], npz_path
+    )
+
+
+# -------------------------------------------------
+# READER
+# -------------------------------------------------
+
+class DetectionStream:
+    """
+    Iterates the records of a stream in frame order, tailing it until the
+    manifest says it is complete.
+
+    Chunks are read from `directory`; when `fetch(name, local_path)` is
+    given, the manifest and chunks are first fetched into it (e.g. from
+    S3). `fetch` returns False while an object does not exist yet.
+
+    Records are kept as they are read, so the stream can be iterated
+    again like the list returned for the other formats.
+    """
+
+    def __init__(self, directory, fetch=None, poll_sec=1.0, timeout=None):
+        self.directory = directory
+        self.fetch = fetch
+        self.poll_sec = poll_sec
+        self.timeout = timeout
+
+        self._records = []
+        self._chunks_read = 0
+        self._complete = False
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _manifest(self):
+
+        path = os.path.join(self.directory, STREAM_MANIFEST)
+
+        if self.fetch is not None and not self.fetch(STREAM_MANIFEST, path):
+            return None
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            manifest = json.load(f)
+
+        if manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported detection format version: {manifest['format_version']}")
+
+        return manifest
+
+    def _read_chunk(self, chunk):
+
+        path = os.path.join(self.directory, chunk["name"])
+
+        if self.fetch is not None and not self.fetch(chunk["name"], path):
+            raise IOError(f"Chunk listed in manifest but missing: {chunk['name']}")
+
+        return read_detections(path).to_list()
+
+    def _advance(self):
+        """Reads newly listed chunks; returns True if records were added."""
+
+        manifest = self._manifest()
+
+        if manifest is None:
+            return False
+
+        chunks = manifest["chunks"]
+        before = len(self._records)
+
+        for chunk in chunks[self._chunks_read:]:
+            self._records.extend(self._read_chunk(chunk))
+            self._chunks_read += 1
+
+        self._complete = manifest["complete"]
+
+        return len(self._records) > before
+
+    def __iter__(self):
+
+        i = 0
+        started = time.time()
+
+        while True:
+
+            while i < len(self._records):
+                yield self._records[i]
+                i += 1
+
+            if self._complete:
+                return
+
+            if self._advance() or self._complete:
+                continue
+
+            if self.timeout is not None and time.time() - started > self.timeout:
+                raise TimeoutError(f"Detection stream not complete after {self.timeout}s")
+
+            time.sleep(self.poll_sec)
+
+    def __len__(self):
+        for _ in self:
+            pass
+        return len(self._records)
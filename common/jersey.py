@@ -0,0 +1,10 @@
+# Gasby-Ai/common/jersey.py
+#
+# Jersey region of a player box, shared by team assignment
+# (yolo_service/team_palette.py) and track stitching
+# (action_service/service/track_stitching.py).
+
+# Torso band of the player box (fractions of height / width). Skips the
+# head, shorts, legs and most of the floor around the player.
+JERSEY_Y = (0.15, 0.50)
+JERSEY_X = (0.25, 0.75)
@@ -0,0 +1,83 @@
+# Gasby-Ai/common/local_s3.py
+#
+# In-process stand-in for the boto3 S3 client, backed by a local directory
+# (<root>/<bucket>/<key>). Covers the calls the services make, with an
+# optional per-request latency and per-connection bandwidth cap so transfer
+# behaviour can be measured without a network.
+
+import io
+import os
+import time
+import shutil
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3:
+
+    def __init__(self, root, mbps=None, latency=0.0):
+        self.root = root
+        self.bytes_per_sec = mbps * 1e6 / 8 if mbps else None
+        self.latency = latency
+        self.requests = 0
+
+    def path(self, Bucket, Key):
+        return os.path.join(self.root, Bucket, Key)
+
+    def put(self, bucket, key, local_path):
+        """Seeds an object from a local file."""
+        target = self.path(bucket, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target)
+
+    def _existing(self, Bucket, Key, operation):
+
+        path = self.path(Bucket, Key)
+
+        if not os.path.exists(path):
+            raise ClientError(
+                {"Error": {"Code": "404", "Message": f"{Bucket}/{Key} not found"}}, operation
+            )
+
+        return path
+
+    def _throttle(self, n_bytes):
+        self.requests += 1
+        delay = self.latency
+        if self.bytes_per_sec:
+            delay += n_bytes / self.bytes_per_sec
+        if delay:
+            time.sleep(delay)
+
+    # ----------------------------
+    # boto3 API
+    # ----------------------------
+
+    def head_object(self, Bucket, Key):
+        path = self._existing(Bucket, Key, "HeadObject")
+        self._throttle(0)
+        return {"ContentLength": os.path.getsize(path)}
+
+    def get_object(self, Bucket, Key, Range=None):
+
+        path = self._existing(Bucket, Key, "GetObject")
+
+        with open(path, "rb") as f:
+            if Range:
+                start, end = Range.split("=")[1].split("-")
+                f.seek(int(start))
+                data = f.read(int(end) - int(start) + 1)
+            else:
+                data = f.read()
+
+        self._throttle(len(data))
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def download_file(self, Bucket, Key, Filename):
+        data = self.get_object(Bucket, Key)["Body"].read()
+        with open(Filename, "wb") as f:
+            f.write(data)
+
+    def upload_file(self, Filename, Bucket, Key):
+        self._throttle(os.path.getsize(Filename))
+        self.put(Bucket, Key, Filename)
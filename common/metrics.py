@@ -0,0 +1,192 @@
+# Gasby-Ai/common/metrics.py
+#
+# Per-stage latency histograms and per-request breakdowns for the Flask
+# services. Kept dependency-free; `prometheus()` renders the standard text
+# exposition format so the endpoint can be scraped as-is.
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+# Seconds. Stages range from sub-second lookups to multi-minute inference.
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+RECENT_REQUESTS = 100
+
+
+# -------------------------------------------------
+# HISTOGRAM
+# -------------------------------------------------
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+
+        return self.max
+
+    def as_dict(self):
+
+        cumulative, seen = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative[str(bound)] = seen
+        cumulative["+Inf"] = self.count
+
+        return {
+            "count": self.count,
+            "sum_sec": round(self.sum, 3),
+            "mean_sec": round(self.sum / self.count, 3) if self.count else None,
+            "max_sec": round(self.max, 3),
+            "p50_le": self.quantile(0.5),
+            "p95_le": self.quantile(0.95),
+            "buckets": cumulative
+        }
+
+
+# -------------------------------------------------
+# REQUEST TIMER
+# -------------------------------------------------
+
+class RequestTimer:
+    """Stage durations of one request; feeds the shared histograms."""
+
+    def __init__(self, metrics, request_id):
+        self.metrics = metrics
+        self.request_id = request_id
+        self.started = time.time()
+        self.stages = {}
+        self.finished = None
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name, seconds):
+        """Records a duration measured elsewhere (e.g. pipeline threads)."""
+
+        if seconds is None:
+            return
+
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.metrics.observe(name, seconds)
+
+    def finish(self, status="success"):
+        """Closes the request once; returns its breakdown."""
+
+        if self.finished is None:
+            self.finished = self.metrics.record(self, status)
+
+        return self.finished
+
+
+# -------------------------------------------------
+# REGISTRY
+# -------------------------------------------------
+
+class Metrics:
+
+    def __init__(self, service):
+        self.service = service
+        self.histograms = {}
+        self.requests_total = {}
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self._lock = threading.Lock()
+
+    def request(self, request_id):
+        return RequestTimer(self, request_id)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self.histograms.setdefault(stage, Histogram()).observe(seconds)
+
+    def record(self, timer, status):
+
+        total = time.time() - timer.started
+
+        breakdown = {
+            "request_id": timer.request_id,
+            "status": status,
+            "started_at": round(timer.started, 3),
+            "total_sec": round(total, 3),
+            "stages_sec": {name: round(sec, 3) for name, sec in timer.stages.items()}
+        }
+
+        self.observe("total", total)
+
+        with self._lock:
+            self.requests_total[status] = self.requests_total.get(status, 0) + 1
+            self.recent.append(breakdown)
+
+        return breakdown
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "service": self.service,
+                "requests": dict(self.requests_total),
+                "stages": {name: h.as_dict() for name, h in self.histograms.items()},
+                "recent": list(self.recent)
+            }
+
+    def prometheus(self):
+
+        name = f"{self.service}_stage_seconds"
+        lines = [f"# TYPE {name} histogram"]
+
+        with self._lock:
+
+            for stage, h in sorted(self.histograms.items()):
+
+                seen = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    seen += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {seen}')
+
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+
+            lines.append(f"# TYPE {self.service}_requests_total counter")
+
+            for status, n in sorted(self.requests_total.items()):
+                lines.append(f'{self.service}_requests_total{{status="{status}"}} {n}')
+
+        return "\n".join(lines) + "\n"
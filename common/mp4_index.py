@@ -0,0 +1,209 @@
+# Gasby-Ai/common/mp4_index.py
+#
+# Minimal MP4 box reader: finds the moov atom and the byte range of every
+# video sample, so a partially downloaded file can be decoded safely up to
+# the last fully present frame.
+
+import os
+import struct
+
+import numpy as np
+
+
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+# -------------------------------------------------
+# TOP-LEVEL BOXES
+# -------------------------------------------------
+
+def box_header(data):
+    """(box_size, box_type, header_size) from the first 8-16 bytes of a box."""
+
+    size, box_type = struct.unpack(">I4s", data[:8])
+    header = 8
+
+    if size == 1:
+        size = struct.unpack(">Q", data[8:16])[0]
+        header = 16
+
+    return size, box_type, header
+
+
+def find_moov(read_at, file_size):
+    """
+    Walks the top-level boxes with `read_at(offset, n)` and returns the
+    (offset, size) of moov, or None (e.g. fragmented MP4 without one).
+    Only box headers are read, so a trailing moov costs one small read
+    past mdat.
+    """
+
+    offset = 0
+
+    while offset + 8 <= file_size:
+
+        size, box_type, _ = box_header(read_at(offset, min(16, file_size - offset)))
+
+        if size == 0:
+            size = file_size - offset
+
+        if box_type == b"moov":
+            return offset, size
+
+        if size < 8:
+            return None
+
+        offset += size
+
+    return None
+
+
+# -------------------------------------------------
+# SAMPLE TABLES
+# -------------------------------------------------
+
+def _children(data, start, end):
+
+    offset = start
+
+    while offset + 8 <= end:
+
+        size, box_type, header = box_header(data[offset:offset + 16])
+
+        if size == 0:
+            size = end - offset
+        if size < header:
+            return
+
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _tracks(moov):
+    """Yields a dict of the sample-table boxes of every trak."""
+
+    def walk(start, end, found):
+        for box_type, body, box_end in _children(moov, start, end):
+            if box_type in CONTAINERS:
+                walk(body, box_end, found)
+            else:
+                found.setdefault(box_type, moov[body:box_end])
+
+    _, _, header = box_header(moov[:16])
+
+    for box_type, body, box_end in _children(moov, header, len(moov)):
+        if box_type == b"trak":
+            found = {}
+            walk(body, box_end, found)
+            yield found
+
+
+def _sample_sizes(stsz):
+    sample_size, count = struct.unpack(">II", stsz[4:12])
+    if sample_size:
+        return np.full(count, sample_size, dtype=np.int64)
+    return np.frombuffer(stsz[12:12 + 4 * count], dtype=">u4").astype(np.int64)
+
+
+def _chunk_offsets(stbl):
+    if b"stco" in stbl:
+        count = struct.unpack(">I", stbl[b"stco"][4:8])[0]
+        return np.frombuffer(stbl[b"stco"][8:8 + 4 * count], dtype=">u4").astype(np.int64)
+    count = struct.unpack(">I", stbl[b"co64"][4:8])[0]
+    return np.frombuffer(stbl[b"co64"][8:8 + 8 * count], dtype=">u8").astype(np.int64)
+
+
+def _samples_per_chunk(stsc, n_chunks):
+    count = struct.unpack(">I", stsc[4:8])[0]
+    entries = np.frombuffer(stsc[8:8 + 12 * count], dtype=">u4").reshape(-1, 3).astype(np.int64)
+
+    per_chunk = np.zeros(n_chunks, dtype=np.int64)
+    for i, (first, samples, _) in enumerate(entries):
+        last = entries[i + 1][0] - 1 if i + 1 < len(entries) else n_chunks
+        per_chunk[first - 1:last] = samples
+
+    return per_chunk
+
+
+def _video_track(moov):
+    for track in _tracks(moov):
+        hdlr = track.get(b"hdlr")
+        if hdlr is not None and hdlr[8:12] == b"vide":
+            return track
+    return None
+
+
+def video_sample_ends(moov):
+    """
+    End byte offset (exclusive) of every video sample in decode order, or
+    None when the file has no usable sample table.
+    """
+
+    track = _video_track(moov)
+
+    if track is None or b"stsz" not in track or b"stsc" not in track:
+        return None
+    if b"stco" not in track and b"co64" not in track:
+        return None
+
+    sizes = _sample_sizes(track[b"stsz"])
+    if len(sizes) == 0:
+        return None
+
+    chunk_offsets = _chunk_offsets(track)
+    per_chunk = _samples_per_chunk(track[b"stsc"], len(chunk_offsets))
+
+    n = len(sizes)
+    chunk_of_sample = np.repeat(np.arange(len(chunk_offsets)), per_chunk)[:n]
+
+    if len(chunk_of_sample) < n:
+        return None
+
+    prefix = np.concatenate(([0], np.cumsum(sizes)))
+    chunk_first_sample = np.concatenate(([0], np.cumsum(per_chunk)))[:-1]
+
+    starts = (
+        chunk_offsets[chunk_of_sample]
+        + prefix[:n]
+        - prefix[chunk_first_sample[chunk_of_sample]]
+    )
+
+    return starts + sizes
+
+
+def video_keyframes(moov):
+    """
+    0-based indices of the video sync samples (keyframes), or None when
+    the track has no stss box, i.e. every sample is a keyframe.
+    """
+
+    track = _video_track(moov)
+
+    if track is None or b"stss" not in track:
+        return None
+
+    stss = track[b"stss"]
+    count = struct.unpack(">I", stss[4:8])[0]
+    return np.frombuffer(stss[8:8 + 4 * count], dtype=">u4").astype(np.int64) - 1
+
+
+# -------------------------------------------------
+# LOCAL FILES
+# -------------------------------------------------
+
+def read_moov(path):
+    """The moov box of a local MP4 as bytes, or None."""
+
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+
+        def read_at(offset, n):
+            f.seek(offset)
+            return f.read(n)
+
+        moov = find_moov(read_at, size)
+        if moov is None:
+            return None
+
+        return read_at(*moov)
@@ -0,0 +1,234 @@
+# Gasby-Ai/common/s3_transfer.py
+#
+# Parallel ranged S3 downloads shared by both services.
+#
+# Works with any boto3-compatible client, so it can be pointed at a local
+# S3 stand-in (MinIO, moto server, localstack) by creating the client with
+# endpoint_url=S3_ENDPOINT_URL.
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from common.mp4_index import find_moov, video_sample_ends
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+WORKERS = 8
+RETRIES = 3
+
+# Frames decoded ahead of the one being read (B-frame reordering) and bytes
+# the demuxer may buffer past the last sample it needs.
+DECODE_LOOKAHEAD = 32
+READ_MARGIN = 1024 * 1024
+
+
+# -------------------------------------------------
+# RANGED DOWNLOAD
+# -------------------------------------------------
+
+class RangedDownload:
+    """
+    Fetches one object with concurrent ranged GETs into a preallocated file.
+
+    Chunks are requested in priority order (first, last, then ascending),
+    and callers can block on any byte range with `wait_range` while the
+    rest is still in flight.
+    """
+
+    def __init__(self, s3, bucket, key, path, chunk_size=CHUNK_SIZE, workers=WORKERS):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.path = path
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+        self.size = None
+        self._done = None
+        self._error = None
+        self._settled = 0
+        self.started_at = None
+        self.finished_at = None
+        self._cond = threading.Condition()
+        self._fd = None
+        self._pool = None
+
+    # ----------------------------
+    # START
+    # ----------------------------
+
+    def start(self):
+
+        self.started_at = time.time()
+        self.size = self.s3.head_object(Bucket=self.bucket, Key=self.key)["ContentLength"]
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, self.size)
+
+        n_chunks = max(1, -(-self.size // self.chunk_size))
+        self._done = np.zeros(n_chunks, dtype=bool)
+
+        if self.size == 0:
+            self._done[:] = True
+            self._close()
+            self.finished_at = time.time()
+            return self
+
+        order = [0] + ([n_chunks - 1] if n_chunks > 1 else []) + list(range(1, n_chunks - 1))
+
+        self._pool = ThreadPoolExecutor(max_workers=min(self.workers, n_chunks))
+
+        for chunk in order:
+            self._pool.submit(self._fetch, chunk)
+
+        self._pool.shutdown(wait=False)
+        return self
+
+    def _fetch(self, chunk):
+
+        try:
+            self._fetch_chunk(chunk)
+        except Exception as e:
+            with self._cond:
+                self._error = self._error or e
+                self._cond.notify_all()
+        finally:
+            # The file descriptor is closed only once no request can still write to it
+            with self._cond:
+                self._settled += 1
+                if self._settled == len(self._done):
+                    self._close()
+
+    def _fetch_chunk(self, chunk):
+
+        if self._error is not None:
+            return
+
+        start = chunk * self.chunk_size
+        end = min(self.size, start + self.chunk_size) - 1
+
+        for attempt in range(RETRIES):
+            try:
+                response = self.s3.get_object(
+                    Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{end}"
+                )
+                data = response["Body"].read()
+
+                if len(data) != end - start + 1:
+                    raise IOError(f"Short read for bytes {start}-{end}: {len(data)}")
+
+                os.pwrite(self._fd, data, start)
+                break
+
+            except Exception:
+                if attempt == RETRIES - 1:
+                    raise
+
+        with self._cond:
+            self._done[chunk] = True
+            if self._done.all():
+                self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # ----------------------------
+    # WAIT
+    # ----------------------------
+
+    def wait_range(self, start, end):
+        """Blocks until bytes [start, end) are on disk."""
+
+        end = min(end, self.size)
+        if end <= start:
+            return
+
+        first = start // self.chunk_size
+        last = (end - 1) // self.chunk_size
+
+        with self._cond:
+            while not self._done[first:last + 1].all():
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def wait(self):
+        """Blocks until the whole object is on disk."""
+        self.wait_range(0, self.size)
+        return self.path
+
+    def elapsed(self):
+        """Transfer time in seconds, or None while still running."""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def read_at(self, offset, n):
+        self.wait_range(offset, offset + n)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(n)
+
+
+# -------------------------------------------------
+# STREAMING VIDEO
+# -------------------------------------------------
+
+class StreamingVideoDownload(RangedDownload):
+    """
+    Ranged download of an MP4 that can be decoded while it arrives.
+
+    Once the moov atom is present its sample table gives the exact byte
+    range of every video frame, and `frame_ready(i)` blocks only until
+    frame i (plus decoder look-ahead) is on disk. Files without a usable
+    sample table fall back to waiting for the full download.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sample_ends = None
+
+    def wait_until_openable(self):
+        """Waits for moov and the first frames; returns the local path."""
+
+        moov = find_moov(self.read_at, self.size)
+
+        if moov is not None:
+            offset, size = moov
+            ends = video_sample_ends(self.read_at(offset, size))
+            if ends is not None:
+                self._sample_ends = np.maximum.accumulate(ends)
+
+        self.frame_ready(0)
+        return self.path
+
+    def frame_ready(self, frame_index):
+
+        if self._sample_ends is None:
+            self.wait()
+            return
+
+        last = min(frame_index + DECODE_LOOKAHEAD, len(self._sample_ends) - 1)
+        self.wait_range(0, int(self._sample_ends[last]) + READ_MARGIN)
+
+
+# -------------------------------------------------
+# HELPERS
+# -------------------------------------------------
+
+def parallel_download(s3, bucket, key, path, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    """Drop-in for s3.download_file using concurrent ranged GETs."""
+    return RangedDownload(s3, bucket, key, path, chunk_size, workers).start().wait()
+
+
+def start_video_download(s3, bucket, key, path, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    """Starts a streaming download; call wait_until_openable() before opening."""
+    return StreamingVideoDownload(s3, bucket, key, path, chunk_size, workers).start()
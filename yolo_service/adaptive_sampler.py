@@ -0,0 +1,161 @@
+# Gasby-Ai/Yolo_service/adaptive_sampler.py
+
+import cv2
+import numpy as np
+
+
+# Window used when reporting the effective sample rate
+SEGMENT_SEC = 5.0
+
+
+# -------------------------------------------------
+# PER-SEGMENT SAMPLE RATE
+# -------------------------------------------------
+
+def segment_rates(sampled, fps, total_frames, segment_sec=SEGMENT_SEC, motion=None):
+    """Effective samples/sec for every `segment_sec` window of the video."""
+
+    segment_frames = max(1, int(round(fps * segment_sec)))
+    n_segments = max(1, -(-total_frames // segment_frames))
+
+    counts = np.zeros(n_segments, dtype=np.int64)
+    for frame_index in sampled:
+        counts[min(frame_index // segment_frames, n_segments - 1)] += 1
+
+    segments = []
+
+    for i, count in enumerate(counts):
+
+        start = i * segment_frames
+        end = min(total_frames, start + segment_frames) if total_frames else start + segment_frames
+        seconds = max(end - start, 1) / fps
+
+        segment = {
+            "start_sec": round(start / fps, 2),
+            "end_sec": round(end / fps, 2),
+            "samples": int(count),
+            "sample_fps": round(int(count) / seconds, 2)
+        }
+
+        if motion is not None:
+            segment["motion"] = round(motion.get(i, 0.0), 2)
+
+        segments.append(segment)
+
+    return segments
+
+
+# -------------------------------------------------
+# ADAPTIVE SAMPLER
+# -------------------------------------------------
+
+class AdaptiveSampler:
+    """
+    Spends a fixed inference budget where the action is.
+
+    Frames are probed every `min_stride` frames. Each probe is reduced to a
+    tiny grayscale thumbnail and compared with the previous probe; the mean
+    absolute difference, relative to its slow running average, is the motion
+    score. The target stride is the budget's average stride divided by the
+    motion score, clamped to [min_stride, max_stride]: twice the usual motion
+    samples twice as often, dead time stretches out to `max_stride`.
+
+    The budget is enforced with a credit bucket that fills at
+    budget / total_frames per frame, so the total number of inferences
+    stays close to `budget` whatever the motion profile. A sample is always
+    taken after `max_stride` frames so dead time is never skipped entirely.
+    """
+
+    def __init__(self, budget, total_frames, min_stride, max_stride,
+                 thumb_size=(64, 36), burst_sec=2.0, fps=30.0):
+
+        self.min_stride = max(1, int(min_stride))
+        self.max_stride = max(self.min_stride, int(max_stride))
+        self.thumb_size = thumb_size
+
+        self.rate = budget / max(total_frames, 1)
+        self.base_stride = 1.0 / max(self.rate, 1e-6)
+        self.burst = max(1.0, self.rate * fps * burst_sec)
+
+        self.credit = 1.0
+        self._prev_thumb = None
+        self._baseline = None
+
+        self.fps = fps
+        self.sampled = []
+        self._segment_frames = max(1, int(round(fps * SEGMENT_SEC)))
+        self._motion_sum = {}
+        self._motion_n = {}
+
+    def _motion(self, frame):
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+        prev, self._prev_thumb = self._prev_thumb, thumb
+
+        if prev is None:
+            return 1.0
+
+        score = float(np.mean(np.abs(thumb - prev)))
+
+        if self._baseline is None:
+            self._baseline = score
+        else:
+            self._baseline = 0.99 * self._baseline + 0.01 * score
+
+        return score / (self._baseline + 1e-3)
+
+    def _stride(self, motion):
+        return float(np.clip(self.base_stride / max(motion, 1e-3), self.min_stride, self.max_stride))
+
+    def frames(self, reader, start=0, end=None):
+        """Yields (frame_index, frame) for the frames chosen for inference."""
+
+        last = None
+        prev_probe = None
+
+        for frame_index, frame in reader.every(self.min_stride, start, end):
+
+            step = self.min_stride if prev_probe is None else frame_index - prev_probe
+            prev_probe = frame_index
+            self.credit = min(self.burst, self.credit + self.rate * step)
+
+            motion = self._motion(frame)
+
+            segment = frame_index // self._segment_frames
+            self._motion_sum[segment] = self._motion_sum.get(segment, 0.0) + motion
+            self._motion_n[segment] = self._motion_n.get(segment, 0) + 1
+
+            since = None if last is None else frame_index - last
+
+            if since is None:
+                take = True
+            elif since >= self.max_stride:
+                take = True
+            else:
+                take = since >= self._stride(motion) and self.credit >= 1.0
+
+            if not take:
+                continue
+
+            self.credit -= 1.0
+            last = frame_index
+            self.sampled.append(frame_index)
+
+            yield frame_index, frame
+
+    def report(self, total_frames):
+
+        motion = {
+            seg: self._motion_sum[seg] / self._motion_n[seg]
+            for seg in self._motion_sum
+        }
+
+        return {
+            "mode": "adaptive",
+            "min_stride": self.min_stride,
+            "max_stride": self.max_stride,
+            "samples": len(self.sampled),
+            "segments": segment_rates(self.sampled, self.fps, total_frames, motion=motion)
+        }
@@ -6,11 +6,24 @@ import cv2
 import boto3
 import shutil
 import os
+import sys
 import json
 import time
+import uuid
 import traceback
 from flask_cors import CORS
-from video_handler import VideoHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_handler import VideoHandler, DEFAULT_BACKEND
+from inference_backend import BACKENDS
+from job_queue import JobQueue
+from detection_cache import DetectionCache, hash_file, video_fingerprint
+from sharded_detection import shard_count
+from common.detection_format import DETECTION_NPZ, DETECTION_JSON, read_detections, export_json
+from common.detection_stream import DETECTION_STREAM, STREAM_MANIFEST, STREAM_JSONL, CHUNK_FRAMES, stream_from_file, merge_stream
+from common.s3_transfer import parallel_download, start_video_download
+from common.metrics import Metrics
 from dotenv import dotenv_values
 
 
@@ -22,14 +35,23 @@ env = dotenv_values('.env')
 
 s3 = boto3.client(
     's3',
-    aws_access_key_id=env['AWS_ACCESS_KEY_ID'],
-    aws_secret_access_key=env['AWS_SECRET_ACCESS_KEY'],
-    region_name="us-east-1"
+    aws_access_key_id=env.get('AWS_ACCESS_KEY_ID'),
+    aws_secret_access_key=env.get('AWS_SECRET_ACCESS_KEY'),
+    region_name="us-east-1",
+    endpoint_url=env.get('S3_ENDPOINT_URL') or None
 )
 
 SOURCE_BUCKET = 'gasby-reqs'
 RESULT_BUCKET = 'gasby-mot-resultss'
 
+detection_cache = DetectionCache(
+    root=env.get('DETECTION_CACHE_DIR') or "detection_cache",
+    max_bytes=int(float(env.get('DETECTION_CACHE_MAX_MB') or 2048) * 1024 * 1024)
+)
+
+
+metrics = Metrics("yolo")
+
 
 # -------------------------------------------------
 # COLOR MAP (For color names support)
@@ -85,86 +107,321 @@ app = Flask(__name__)
 CORS(app)
 
 
-@app.route("/yolo-predict/upload", methods=["POST"])
-def get_video():
+# -------------------------------------------------
+# REQUEST OPTIONS
+# -------------------------------------------------
 
-    start_time = time.time()
+def parse_options(data):
+    """Validates a request body; raises ValueError with a client-facing message."""
+
+    if not data or "payload" not in data:
+        raise ValueError("Missing payload")
+
+    sampling = data.get("sampling", "fixed")
+
+    if sampling not in ("fixed", "adaptive"):
+        raise ValueError(f"Unknown sampling mode: {sampling}")
+
+    backend = data.get("backend", DEFAULT_BACKEND)
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    return {
+        "payload": data["payload"],
+        "team_colors": normalize_team_colors(data.get("team_colors", {})),
+
+        "batch_size": int(data.get("batch_size", 8)),
+        "queue_size": int(data.get("queue_size", 32)),
+        "seek_gap": int(data.get("seek_gap", 0)),
+        "segmentation_cache": bool(data.get("segmentation_cache", True)),
+        "debug_json": bool(data.get("debug_json", False)),
+        "sampling": sampling,
+        "backend": backend,
+        "roi_crop": bool(data.get("roi_crop", False)),
+        "det_size": int(data.get("det_size", 640)),
+        "cache": bool(data.get("cache", True)),
+        "shards": int(data.get("shards", env.get("YOLO_SHARDS") or 1)),
+        "stream": bool(data.get("stream", False)),
+        "chunk_frames": int(data.get("chunk_frames", CHUNK_FRAMES))
+    }
+
+
+# -------------------------------------------------
+# YOLO JOB
+# -------------------------------------------------
+
+def pipeline_timings(stage_report):
+    """Decode / segmentation / detection / post-process busy seconds, summed over shards."""
+
+    reports = [s["stages"] for s in stage_report["shards"]] if "shards" in stage_report else [stage_report]
+
+    timings = {"decode": 0.0, "segmentation": 0.0, "detection": 0.0, "postprocess": 0.0}
+
+    for report in reports:
+        timings["decode"] += report["stages"]["decode"]["busy_sec"]
+        timings["postprocess"] += report["stages"]["postprocess"]["busy_sec"]
+        timings["segmentation"] += report["inference_split"]["segmentation_sec"]
+        timings["detection"] += report["inference_split"]["detection_sec"]
+
+    return timings
+
+
+def run_yolo_job(options, model_slot=0, job_id=None):
+
+    timer = metrics.request(options["payload"])
+
+    # Concurrent jobs may share a payload, so each one gets its own working directory
+    job_id = job_id or uuid.uuid4().hex
 
     try:
-        print("🚀 YOLO REQUEST RECEIVED")
+        result = _run_yolo_job(options, model_slot, timer, job_id)
+    except Exception:
+        timer.finish("error")
+        raise
+    finally:
+        # Failed jobs too: the working directory holds the whole downloaded video
+        shutil.rmtree(f'./video/{job_id}', ignore_errors=True)
+
+    result["timings"] = timer.finish("cached" if "cached" in result["message"] else "success")
+    return result
+
 
-        data = request.get_json()
+def _run_yolo_job(options, model_slot, timer, job_id):
 
-        if not data or "payload" not in data:
-            return jsonify({"error": "Missing payload"}), 400
+    start_time = time.time()
+
+    payload = options["payload"]
+    team_colors = options["team_colors"]
+
+    print("📦 UUID:", payload)
+    print("🎨 Team Colors:", team_colors)
+    print("🧺 Batch Size:", options["batch_size"])
 
-        payload = data["payload"]
+    local_dir = f'./video/{job_id}'
+    os.makedirs(local_dir, exist_ok=True)
 
-        # ----------------------------
-        # 🔥 NEW: TEAM COLORS SUPPORT
-        # ----------------------------
+    video_key = f"{payload}/{payload}.mp4"
+    json_key = f"{payload}/{payload}.json"
 
-        raw_team_colors = data.get("team_colors", {})
-        team_colors = normalize_team_colors(raw_team_colors)
+    local_video = f"{local_dir}/{payload}.mp4"
+    local_json = f"{local_dir}/{payload}.json"
 
-        print("📦 UUID:", payload)
-        print("🎨 Team Colors:", team_colors)
+    print("⬇ Downloading video + meta from S3...")
 
-        local_dir = f'./video/{payload}'
-        os.makedirs(local_dir, exist_ok=True)
+    # Ranged parallel download; decoding starts as soon as moov and the
+    # first frames are on disk and each read waits for its own bytes.
+    with timer.stage("time_to_first_frame"):
+        download = start_video_download(s3, SOURCE_BUCKET, video_key, local_video)
+        parallel_download(s3, SOURCE_BUCKET, json_key, local_json)
 
-        video_key = f"{payload}/{payload}.mp4"
-        json_key = f"{payload}/{payload}.json"
+        download.wait_until_openable()
+    first_frame_sec = round(time.time() - start_time, 2)
 
-        local_video = f"{local_dir}/{payload}.mp4"
-        local_json = f"{local_dir}/{payload}.json"
+    print("✅ Video openable after", first_frame_sec, "s")
 
-        print("⬇ Downloading video + meta from S3...")
+    # ----------------------------
+    # Detection cache
+    # ----------------------------
 
-        s3.download_file(SOURCE_BUCKET, video_key, local_video)
-        s3.download_file(SOURCE_BUCKET, json_key, local_json)
+    cache_key = None
 
-        print("✅ Download complete")
+    if options["cache"]:
+        with timer.stage("cache_lookup"):
+            cache_key = detection_cache.key(video_fingerprint(download), cache_options(options, local_video))
+            cached = detection_cache.lookup(cache_key, lambda: hash_file(download.wait())) if cache_key else None
+
+        if cached is not None:
+            print("♻️ Serving cached detections:", cache_key)
+
+            if options["stream"]:
+                stream_from_file(cached, f"{local_dir}/{DETECTION_STREAM}")
+            else:
+                shutil.copyfile(cached, f"{local_dir}/{DETECTION_NPZ}")
+
+            if options["debug_json"]:
+                export_json(read_detections(cached), f"{local_dir}/{DETECTION_JSON}")
+
+            timer.add("download", download.elapsed())
+
+            with timer.stage("upload"):
+                if options["stream"]:
+                    upload_stream(payload, f"{local_dir}/{DETECTION_STREAM}")
+                upload_results(payload, local_dir)
+
+            return {
+                "message": "YOLO complete (cached)",
+                "time": round(time.time() - start_time, 2),
+                "cache": detection_cache.stats()
+            }
+
+    # Shard workers seek anywhere in the file, so they need all of it
+    if options["shards"] > 1:
+        download.wait()
+
+    # ----------------------------
+    # Validate video
+    # ----------------------------
+
+    video = cv2.VideoCapture(local_video)
+
+    if not video.isOpened():
+        raise Exception("❌ Failed to open video file")
+
+    # ----------------------------
+    # 🔥 FIXED: PASS team_colors
+    # ----------------------------
+
+    handler = VideoHandler(
+        video,
+        team_colors,
+        batch_size=options["batch_size"],
+        queue_size=options["queue_size"],
+        seek_gap=options["seek_gap"],
+        segmentation_cache=options["segmentation_cache"],
+        debug_json=options["debug_json"],
+        sampling=options["sampling"],
+        backend=options["backend"],
+        roi_crop=options["roi_crop"],
+        det_size=options["det_size"],
+        model_slot=model_slot,
+        frame_ready=download.frame_ready,
+        video_path=local_video,
+        shards=options["shards"],
+        stream=options["stream"],
+        stream_sink=stream_sink(payload) if options["stream"] else None,
+        chunk_frames=options["chunk_frames"]
+    )
+
+    print("🧠 Running YOLO detection...")
+
+    with timer.stage("pipeline"):
+        handler.run_detectors(local_dir)
+
+    download.wait()
+
+    # Transfer overlaps decoding; these are each stage's own busy seconds
+    timer.add("download", download.elapsed())
+
+    for stage, seconds in pipeline_timings(handler.stage_report).items():
+        timer.add(stage, seconds)
+
+    detection_file = f"{local_dir}/{DETECTION_NPZ}"
+    output_file = f"{local_dir}/{DETECTION_STREAM}/{STREAM_MANIFEST}" if options["stream"] else detection_file
+
+    if not os.path.exists(output_file):
+        raise Exception(f"❌ {os.path.basename(output_file)} not created")
+
+    # Stream chunks were published as they were written
+    with timer.stage("upload"):
+        upload_results(payload, local_dir)
+
+    if cache_key is not None:
+        with timer.stage("cache_store"):
+            # The cache holds one NPZ per video, so the chunks are merged off the critical path
+            if options["stream"]:
+                merge_stream(f"{local_dir}/{DETECTION_STREAM}", detection_file)
+            detection_cache.store(cache_key, hash_file(local_video), detection_file, options)
+
+    return {
+        "message": "YOLO complete",
+        "time": round(time.time() - start_time, 2),
+        "stages": handler.stage_report,
+        "download": {
+            "bytes": download.size,
+            "first_frame_sec": first_frame_sec
+        },
+        "cache": detection_cache.stats() if cache_key is not None else None
+    }
 
-        # ----------------------------
-        # Validate video
-        # ----------------------------
 
-        video = cv2.VideoCapture(local_video)
+def cache_options(options, local_video):
+    """Options as they affect the output: the shard count the video will actually be split into."""
 
-        if not video.isOpened():
-            raise Exception("❌ Failed to open video file")
+    if options["shards"] <= 1:
+        return dict(options, shards=1)
 
-        # ----------------------------
-        # 🔥 FIXED: PASS team_colors
-        # ----------------------------
+    # moov is on disk once the download is openable, so this needs no frame data
+    video = cv2.VideoCapture(local_video)
+    fps = video.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    video.release()
 
-        handler = VideoHandler(video, team_colors)
+    return dict(options, shards=shard_count(total_frames, fps, options["shards"]))
 
-        print("🧠 Running YOLO detection...")
-        frame_data = handler.run_detectors(local_dir)
 
-        detection_file = f"{local_dir}/frame_level_detection.json"
+def upload_results(payload, local_dir):
 
-        if not os.path.exists(detection_file):
-            raise Exception("❌ frame_level_detection.json not created")
+    print("⬆ Uploading detection result to S3...")
 
-        print("⬆ Uploading detection result to S3...")
+    detection_file = f"{local_dir}/{DETECTION_NPZ}"
 
+    if os.path.exists(detection_file):
         s3.upload_file(
             detection_file,
             RESULT_BUCKET,
-            f"{payload}/frame_level_detection.json"
+            f"{payload}/{DETECTION_NPZ}"
         )
 
-        print("✅ Upload complete")
+    for debug_file, key in (
+        (f"{local_dir}/{DETECTION_JSON}", f"{payload}/{DETECTION_JSON}"),
+        (f"{local_dir}/{DETECTION_STREAM}/{STREAM_JSONL}", f"{payload}/{DETECTION_STREAM}/{STREAM_JSONL}")
+    ):
+        if os.path.exists(debug_file):
+            s3.upload_file(debug_file, RESULT_BUCKET, key)
+
+    print("✅ Upload complete")
+
+
+def stream_sink(payload):
+    """Publishes stream chunks and manifest snapshots under <payload>/frame_level_detection_stream/."""
+
+    def sink(local_path, name):
+        s3.upload_file(local_path, RESULT_BUCKET, f"{payload}/{DETECTION_STREAM}/{name}")
+
+    return sink
+
+
+def upload_stream(payload, directory):
+    """Uploads an already complete stream: chunks first, manifest last."""
+
+    sink = stream_sink(payload)
 
-        shutil.rmtree(local_dir)
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".npz"):
+            sink(os.path.join(directory, name), name)
 
-        return jsonify({
-            "message": "YOLO complete",
-            "time": round(time.time() - start_time, 2)
-        })
+    sink(os.path.join(directory, STREAM_MANIFEST), STREAM_MANIFEST)
+
+
+# -------------------------------------------------
+# JOB QUEUE
+# -------------------------------------------------
+
+# Slot 0 models serve the synchronous endpoint; worker i uses slot i + 1
+jobs = JobQueue(
+    handler=lambda options, worker, job_id: run_yolo_job(options, model_slot=worker + 1, job_id=job_id),
+    workers=int(env.get("YOLO_WORKERS") or 2),
+    max_queued=int(env.get("YOLO_MAX_QUEUED") or 16)
+)
+
+
+# -------------------------------------------------
+# ROUTES
+# -------------------------------------------------
+
+@app.route("/yolo-predict/upload", methods=["POST"])
+def get_video():
+
+    try:
+        print("🚀 YOLO REQUEST RECEIVED")
+
+        try:
+            options = parse_options(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify(run_yolo_job(options))
 
     except Exception as e:
         print("\n🔥 YOLO SERVICE ERROR:")
@@ -174,6 +431,66 @@ def get_video():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/yolo-predict/jobs", methods=["POST"])
+def submit_job():
+
+    try:
+        options = parse_options(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = jobs.submit(options)
+
+    if job is None:
+        return jsonify({"error": "Job queue full", **jobs.stats()}), 503
+
+    print("📥 YOLO JOB QUEUED:", job.id, "payload:", options["payload"])
+
+    return jsonify(job.as_dict()), 202
+
+
+@app.route("/yolo-predict/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+
+    job = jobs.get(job_id)
+
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    return jsonify(dict(job.as_dict(), queue=jobs.stats()))
+
+
+@app.route("/yolo-predict/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+
+    job = jobs.get(job_id)
+
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job.status == "failed":
+        return jsonify(job.as_dict()), 500
+
+    if job.status != "done":
+        return jsonify(job.as_dict()), 202
+
+    return jsonify(dict(job.as_dict(), result=job.result))
+
+
+@app.route("/yolo-predict/metrics", methods=["GET"])
+def metrics_endpoint():
+
+    if request.args.get("format") == "prometheus":
+        return metrics.prometheus(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+    return jsonify(metrics.snapshot())
+
+
+@app.route("/yolo-predict/cache", methods=["GET"])
+def cache_stats():
+    return jsonify(detection_cache.stats())
+
+
 # -------------------------------------------------
 
 if __name__ == "__main__":
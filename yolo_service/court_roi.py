@@ -0,0 +1,116 @@
+# Gasby-Ai/Yolo_service/court_roi.py
+
+import cv2
+import numpy as np
+
+
+# Expansion of the court polygon box (fractions of its width / height).
+# The floor polygons stop at the players' feet and well below the rim, so
+# the top margin is the largest.
+ROI_MARGINS = {"left": 0.15, "right": 0.15, "top": 0.45, "bottom": 0.10}
+
+# Below this share of the frame the crop is not worth it
+MAX_ROI_AREA = 0.90
+
+LETTERBOX_FILL = (114, 114, 114)
+
+
+# -------------------------------------------------
+# ROI FROM SEGMENTATION
+# -------------------------------------------------
+
+def court_roi(segmentation_data, frame_shape, seg_shape=(640, 640)):
+    """
+    Bounding region of the court in original-frame pixels, or None when
+    the court is not found or already fills most of the frame.
+    """
+
+    boxes = [seg["bbox"] for seg in segmentation_data]
+    if not boxes:
+        return None
+
+    h, w = frame_shape[:2]
+    sx = w / seg_shape[1]
+    sy = h / seg_shape[0]
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    x1, y1 = boxes[:, 0].min() * sx, boxes[:, 1].min() * sy
+    x2, y2 = boxes[:, 2].max() * sx, boxes[:, 3].max() * sy
+
+    bw, bh = x2 - x1, y2 - y1
+
+    x1 = int(max(0, x1 - bw * ROI_MARGINS["left"]))
+    x2 = int(min(w, x2 + bw * ROI_MARGINS["right"]))
+    y1 = int(max(0, y1 - bh * ROI_MARGINS["top"]))
+    y2 = int(min(h, y2 + bh * ROI_MARGINS["bottom"]))
+
+    if x2 <= x1 or y2 <= y1:
+        return None
+
+    if (x2 - x1) * (y2 - y1) >= MAX_ROI_AREA * w * h:
+        return None
+
+    return x1, y1, x2, y2
+
+
+# -------------------------------------------------
+# CROP + LETTERBOX
+# -------------------------------------------------
+
+class RoiTransform:
+    """Maps boxes from the letterboxed crop back to the record coordinate space."""
+
+    def __init__(self, roi, scale, pad_x, pad_y, out_sx, out_sy):
+        self.roi = roi
+        self.scale = scale
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.out_sx = out_sx
+        self.out_sy = out_sy
+
+    def map_boxes(self, xyxy):
+
+        if len(xyxy) == 0:
+            return xyxy
+
+        boxes = np.asarray(xyxy, dtype=np.float64).copy()
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - self.pad_x) / self.scale + self.roi[0]) * self.out_sx
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - self.pad_y) / self.scale + self.roi[1]) * self.out_sy
+
+        return boxes.astype(np.float32)
+
+
+def crop_letterbox(frame, roi, size, out_shape=(640, 640)):
+    """
+    Crops `frame` to `roi` (whole frame if None) and letterboxes it into a
+    size x size canvas without changing the aspect ratio.
+    """
+
+    h, w = frame.shape[:2]
+
+    if roi is None:
+        roi = (0, 0, w, h)
+
+    x1, y1, x2, y2 = roi
+    crop = frame[y1:y2, x1:x2]
+    ch, cw = crop.shape[:2]
+
+    scale = min(size / cw, size / ch)
+    nw, nh = max(1, int(round(cw * scale))), max(1, int(round(ch * scale)))
+
+    pad_x = (size - nw) // 2
+    pad_y = (size - nh) // 2
+
+    canvas = np.empty((size, size, 3), dtype=frame.dtype)
+    canvas[:] = LETTERBOX_FILL
+    canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(
+        crop, (nw, nh), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    )
+
+    transform = RoiTransform(
+        roi, scale, pad_x, pad_y,
+        out_sx=out_shape[1] / w,
+        out_sy=out_shape[0] / h
+    )
+
+    return canvas, transform
@@ -0,0 +1,93 @@
+# Gasby-Ai/Yolo_service/court_zones.py
+
+import cv2
+import numpy as np
+
+
+# -------------------------------------------------
+# ZONE LABELS
+# -------------------------------------------------
+
+# Segmentation class -> zone name written into the player record
+SEGMENT_ZONES = {
+    "paint": "paint",
+    "three point line": "three_point",
+    "center-circle": "center_circle"
+}
+
+ZONE_NAMES = ["unknown", "paint", "three_point", "center_circle"]
+ZONE_IDS = {name: i for i, name in enumerate(ZONE_NAMES)}
+
+# Sub-pixel precision for cv2.fillPoly (coordinates scaled by 2**SHIFT)
+SHIFT = 4
+
+
+# -------------------------------------------------
+# RASTERIZED LOOKUP
+# -------------------------------------------------
+
+class ZoneMask:
+    """
+    All court polygons of a frame painted into one uint8 label mask.
+
+    Polygons are drawn in the order they appear, so a later polygon wins
+    where two overlap, matching the previous per-polygon contains() loop.
+    Points that fall in the one-pixel band around a label edge, where the
+    rasterized answer can differ from the exact one, are re-checked with
+    cv2.pointPolygonTest against the original float polygons.
+    """
+
+    def __init__(self, segmentation_data, shape=(640, 640)):
+
+        self.mask = np.zeros(shape, dtype=np.uint8)
+        self.polygons = []
+
+        for seg in segmentation_data:
+
+            zone = SEGMENT_ZONES.get(seg["class"])
+            if zone is None or len(seg["polygon"]) < 3:
+                continue
+
+            polygon = np.asarray(seg["polygon"], dtype=np.float64)
+            points = np.round(polygon * (1 << SHIFT)).astype(np.int32)
+
+            cv2.fillPoly(self.mask, [points], ZONE_IDS[zone], shift=SHIFT)
+            self.polygons.append((ZONE_IDS[zone], polygon.astype(np.float32).reshape(-1, 1, 2)))
+
+        kernel = np.ones((3, 3), dtype=np.uint8)
+        self.edges = cv2.dilate(self.mask, kernel) != cv2.erode(self.mask, kernel)
+
+    def _exact(self, x, y):
+
+        zone_id = 0
+
+        for polygon_zone, polygon in self.polygons:
+            if cv2.pointPolygonTest(polygon, (float(x), float(y)), False) > 0:
+                zone_id = polygon_zone
+
+        return zone_id
+
+    def lookup(self, points):
+        """Returns the zone name at each (x, y) point with one vectorized index."""
+
+        if len(points) == 0:
+            return []
+
+        points = np.asarray(points, dtype=np.float64)
+        xs = np.rint(points[:, 0]).astype(np.int64)
+        ys = np.rint(points[:, 1]).astype(np.int64)
+
+        h, w = self.mask.shape
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+
+        ids = np.zeros(len(points), dtype=np.uint8)
+        ids[inside] = self.mask[ys[inside], xs[inside]]
+
+        # Near an edge (or just outside the mask) fall back to the exact test
+        near_edge = ~inside
+        near_edge[inside] = self.edges[ys[inside], xs[inside]]
+
+        for i in np.flatnonzero(near_edge):
+            ids[i] = self._exact(points[i, 0], points[i, 1])
+
+        return [ZONE_NAMES[i] for i in ids]
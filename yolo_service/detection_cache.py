@@ -0,0 +1,264 @@
+# Gasby-Ai/Yolo_service/detection_cache.py
+#
+# Content-addressed cache of detection results. Resubmitting the same clip
+# under a new UUID, with the same weights and sampling options, reuses the
+# stored frame_level_detection.npz instead of running inference again.
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from inference_backend import weights_path, MODEL_KINDS
+from common.detection_format import FORMAT_VERSION, DETECTION_NPZ
+
+
+CACHE_DIR = "detection_cache"
+MAX_BYTES = 2 * 1024 ** 3
+
+HASH_BLOCK = 8 * 1024 * 1024
+FINGERPRINT_BYTES = 1024 * 1024
+
+# Request options that change the detections; batch_size, queue_size and
+# seek_gap only change how fast they are produced. Shard boundaries reset
+# the segmentation cache and team palette, so the shard count is included;
+# callers pass the count actually used for the video, not the requested one.
+OUTPUT_OPTIONS = (
+    "team_colors", "sampling", "backend", "segmentation_cache", "roi_crop", "det_size",
+    "shards"
+)
+
+
+# -------------------------------------------------
+# HASHING
+# -------------------------------------------------
+
+def hash_file(path):
+
+    h = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def hash_path(path):
+    """sha256 of a file, or of every file under a directory (exported models)."""
+
+    if os.path.isfile(path):
+        return hash_file(path)
+
+    h = hashlib.sha256()
+
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            h.update(os.path.relpath(full, path).encode())
+            h.update(hash_file(full).encode())
+
+    return h.hexdigest()
+
+
+_weight_hashes = {}
+
+
+def weights_hash(backend):
+    """
+    Hash of the detection + segmentation weights, recomputed when they
+    change. None when a backend's weights are missing (not exported yet).
+    """
+
+    parts = []
+
+    for kind in MODEL_KINDS:
+
+        path = weights_path(kind, backend)
+
+        try:
+            stamp = (path, os.path.getmtime(path))
+        except FileNotFoundError:
+            return None
+
+        if stamp not in _weight_hashes:
+            _weight_hashes[stamp] = hash_path(path)
+
+        parts.append(f"{kind}:{_weight_hashes[stamp]}")
+
+    return ",".join(parts)
+
+
+def video_fingerprint(download):
+    """
+    Cheap lookup key for a video that is still downloading: size plus the
+    first and last MB, which are the first chunks a RangedDownload fetches.
+    Hits are confirmed against the full content hash before being served.
+    """
+
+    n = min(FINGERPRINT_BYTES, download.size)
+
+    h = hashlib.sha256()
+    h.update(str(download.size).encode())
+    h.update(download.read_at(0, n))
+    h.update(download.read_at(download.size - n, n))
+
+    return h.hexdigest()
+
+
+# -------------------------------------------------
+# CACHE
+# -------------------------------------------------
+
+class DetectionCache:
+    """
+    One directory per key holding the NPZ and a meta.json. The least
+    recently used entries are evicted once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, fingerprint, options):
+        """Cache key, or None when the weights cannot be hashed (caching is skipped)."""
+
+        weights = weights_hash(options["backend"])
+
+        if weights is None:
+            print(f"⚠️ {options['backend']} weights missing, detection cache skipped")
+            return None
+
+        params = {name: options[name] for name in OUTPUT_OPTIONS}
+        params["weights"] = weights
+        params["format"] = FORMAT_VERSION
+
+        h = hashlib.sha256(fingerprint.encode())
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def _meta(self, key):
+        meta_path = os.path.join(self._entry(key), "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    # ----------------------------
+    # LOOKUP / STORE
+    # ----------------------------
+
+    def lookup(self, key, content_hash):
+        """
+        Path of the cached NPZ, or None. `content_hash()` is only called for
+        a candidate entry, to confirm it was built from the same bytes.
+        """
+
+        with self._lock:
+            meta = self._meta(key)
+
+        if meta is not None and meta["content_sha256"] != content_hash():
+            meta = None
+            with self._lock:
+                self.collisions += 1
+
+        with self._lock:
+
+            if meta is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            os.utime(os.path.join(self._entry(key), "meta.json"))
+            return os.path.join(self._entry(key), DETECTION_NPZ)
+
+    def store(self, key, content_sha256, npz_path, options):
+
+        tmp = self._entry(f".{key}.{threading.get_ident()}")
+        os.makedirs(tmp, exist_ok=True)
+
+        shutil.copyfile(npz_path, os.path.join(tmp, DETECTION_NPZ))
+
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({
+                "content_sha256": content_sha256,
+                "created": time.time(),
+                "options": {name: options[name] for name in OUTPUT_OPTIONS}
+            }, f)
+
+        with self._lock:
+            target = self._entry(key)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(tmp, target)
+            self._evict()
+
+    # ----------------------------
+    # EVICTION
+    # ----------------------------
+
+    def _entries(self):
+        """(last_used, bytes, key) for every complete entry."""
+
+        entries = []
+
+        for key in os.listdir(self.root):
+
+            if key.startswith("."):
+                continue
+
+            entry = self._entry(key)
+            meta_path = os.path.join(entry, "meta.json")
+            if not os.path.exists(meta_path):
+                continue
+
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((os.path.getmtime(meta_path), size, key))
+
+        return entries
+
+    def _evict(self):
+
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+
+            if total <= self.max_bytes:
+                break
+
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+            print("🧹 Evicted cached detections:", key)
+
+    def stats(self):
+
+        with self._lock:
+            entries = self._entries()
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "collisions": self.collisions,
+                "evictions": self.evictions
+            }
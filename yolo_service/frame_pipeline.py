@@ -0,0 +1,244 @@
+# Gasby-Ai/Yolo_service/frame_pipeline.py
+
+import time
+import queue
+import threading
+
+
+# -------------------------------------------------
+# STAGE + QUEUE STATS
+# -------------------------------------------------
+
+class StageStats:
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.wait = 0.0
+        self.items = 0
+
+    def as_dict(self):
+        return {
+            "busy_sec": round(self.busy, 3),
+            "wait_sec": round(self.wait, 3),
+            "items": self.items
+        }
+
+
+_DONE = object()
+
+
+class MonitoredQueue:
+    """Bounded queue that samples its depth on every put."""
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._depth_sum = 0
+        self._depth_max = 0
+        self._samples = 0
+
+    def put(self, item, stop_event):
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if stop_event.is_set():
+                    return False
+
+        depth = self._queue.qsize()
+        self._depth_sum += depth
+        self._depth_max = max(self._depth_max, depth)
+        self._samples += 1
+        return True
+
+    def get(self, stop_event):
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if stop_event.is_set():
+                    return _DONE
+
+    def as_dict(self):
+        return {
+            "maxsize": self.maxsize,
+            "max_depth": self._depth_max,
+            "avg_depth": round(self._depth_sum / self._samples, 2) if self._samples else 0.0
+        }
+
+
+# -------------------------------------------------
+# DECODE -> INFERENCE -> POST-PROCESS
+# -------------------------------------------------
+
+class FramePipeline:
+    """
+    Three-stage producer/consumer pipeline.
+
+    decode thread      : iterates `produce`, pushes items to the frame queue
+    inference thread   : groups up to `batch_size` items, calls `infer(items)`
+    post-process (main): calls `postprocess(result)` for each inference result
+
+    A full frame queue means inference is the bottleneck, an empty one means
+    decoding is. Per-stage busy/wait time is kept in `report()`.
+    """
+
+    def __init__(self, queue_size=32):
+        self.frame_queue = MonitoredQueue("frames", queue_size)
+        self.result_queue = MonitoredQueue("results", max(2, queue_size // 4))
+
+        self.stats = {
+            "decode": StageStats("decode"),
+            "inference": StageStats("inference"),
+            "postprocess": StageStats("postprocess")
+        }
+
+        self._stop = threading.Event()
+        self._error = None
+        self._wall = 0.0
+
+    def _fail(self, exc):
+        if self._error is None:
+            self._error = exc
+        self._stop.set()
+
+    # ----------------------------
+    # STAGE 1: DECODE
+    # ----------------------------
+
+    def _decode_loop(self, produce):
+
+        stats = self.stats["decode"]
+
+        try:
+            iterator = iter(produce)
+
+            while not self._stop.is_set():
+
+                t0 = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                t1 = time.perf_counter()
+
+                if not self.frame_queue.put(item, self._stop):
+                    break
+
+                stats.busy += t1 - t0
+                stats.wait += time.perf_counter() - t1
+                stats.items += 1
+
+        except Exception as e:
+            self._fail(e)
+
+        finally:
+            self.frame_queue.put(_DONE, self._stop)
+
+    # ----------------------------
+    # STAGE 2: INFERENCE
+    # ----------------------------
+
+    def _inference_loop(self, infer, batch_size):
+
+        stats = self.stats["inference"]
+        finished = False
+
+        try:
+            while not finished and not self._stop.is_set():
+
+                items = []
+                t0 = time.perf_counter()
+
+                while len(items) < batch_size:
+                    item = self.frame_queue.get(self._stop)
+                    if item is _DONE:
+                        finished = True
+                        break
+                    items.append(item)
+
+                t1 = time.perf_counter()
+                stats.wait += t1 - t0
+
+                if not items:
+                    break
+
+                result = infer(items)
+
+                stats.busy += time.perf_counter() - t1
+                stats.items += len(items)
+
+                t2 = time.perf_counter()
+                if not self.result_queue.put(result, self._stop):
+                    break
+                stats.wait += time.perf_counter() - t2
+
+        except Exception as e:
+            self._fail(e)
+
+        finally:
+            self.result_queue.put(_DONE, self._stop)
+
+    # ----------------------------
+    # RUN
+    # ----------------------------
+
+    def run(self, produce, infer, postprocess, batch_size=1):
+
+        start = time.perf_counter()
+
+        decoder = threading.Thread(
+            target=self._decode_loop, args=(produce,), daemon=True
+        )
+        inferencer = threading.Thread(
+            target=self._inference_loop, args=(infer, max(1, batch_size)), daemon=True
+        )
+
+        decoder.start()
+        inferencer.start()
+
+        stats = self.stats["postprocess"]
+
+        try:
+            while True:
+
+                t0 = time.perf_counter()
+                result = self.result_queue.get(self._stop)
+                t1 = time.perf_counter()
+                stats.wait += t1 - t0
+
+                if result is _DONE:
+                    break
+
+                stats.items += postprocess(result) or 0
+                stats.busy += time.perf_counter() - t1
+
+        except Exception as e:
+            # Upstream put/get calls observe the stop flag and unwind.
+            self._fail(e)
+
+        decoder.join()
+        inferencer.join()
+
+        self._wall = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+
+    def report(self):
+
+        stages = {name: s.as_dict() for name, s in self.stats.items()}
+        bottleneck = max(self.stats.values(), key=lambda s: s.busy).name
+
+        return {
+            "wall_sec": round(self._wall, 3),
+            "bottleneck": bottleneck,
+            "stages": stages,
+            "queues": {
+                "frames": self.frame_queue.as_dict(),
+                "results": self.result_queue.as_dict()
+            }
+        }
@@ -0,0 +1,110 @@
+# Gasby-Ai/Yolo_service/frame_reader.py
+
+import cv2
+
+
+# -------------------------------------------------
+# SAMPLED FRAME READER
+# -------------------------------------------------
+
+class SampledFrameReader:
+    """
+    Reads only the frames that will be processed.
+
+    Frames between two sampled indices are skipped with `grab()`, which
+    demuxes/decodes the packet but skips the BGR conversion and copy done by
+    `retrieve()`. For long gaps (`seek_gap` > 0) the reader seeks with
+    CAP_PROP_POS_FRAMES instead, and falls back to grabbing if the backend
+    does not land on the exact frame.
+
+    `ready(index)`, if given, is called before frame `index` is touched and
+    blocks until the bytes it needs are available (streaming downloads).
+    """
+
+    def __init__(self, video, seek_gap=0, ready=None):
+        self.video = video
+        self.seek_gap = seek_gap
+        self.ready = ready
+        self.position = int(video.get(cv2.CAP_PROP_POS_FRAMES) or 0)
+
+        self.decoded = 0
+        self.grabbed = 0
+        self.seeks = 0
+
+    def _seek(self, target):
+
+        if not self.video.set(cv2.CAP_PROP_POS_FRAMES, target):
+            return False
+
+        landed = int(self.video.get(cv2.CAP_PROP_POS_FRAMES))
+
+        if landed == target:
+            self.position = target
+            self.seeks += 1
+            return True
+
+        # Inexact seek: go back to where we were and grab forward instead.
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, self.position)
+        return False
+
+    def _skip_to(self, target):
+
+        if self.seek_gap and target - self.position >= self.seek_gap:
+            if self._seek(target):
+                return True
+
+        while self.position < target:
+            if not self.video.grab():
+                return False
+            self.position += 1
+            self.grabbed += 1
+
+        return True
+
+    def read(self, target):
+        """Returns the decoded BGR frame at `target`, or None at end of stream."""
+
+        if target < self.position:
+            raise ValueError(f"Frame {target} already passed (at {self.position})")
+
+        if self.ready is not None:
+            self.ready(target)
+
+        if not self._skip_to(target):
+            return None
+
+        ret, frame = self.video.read()
+        if not ret:
+            return None
+
+        self.position += 1
+        self.decoded += 1
+        return frame
+
+    def frames(self, indices):
+        """Yields (index, frame) for ascending `indices` until the video ends."""
+
+        for target in indices:
+            frame = self.read(target)
+            if frame is None:
+                return
+            yield target, frame
+
+    def every(self, step, start=0, end=None):
+        """Yields (index, frame) for every `step`-th frame in [start, end)."""
+
+        target = start
+
+        while self.video.isOpened() and (end is None or target < end):
+            frame = self.read(target)
+            if frame is None:
+                return
+            yield target, frame
+            target += step
+
+    def stats(self):
+        return {
+            "decoded": self.decoded,
+            "grabbed": self.grabbed,
+            "seeks": self.seeks
+        }
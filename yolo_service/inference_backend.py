@@ -0,0 +1,220 @@
+# Gasby-Ai/Yolo_service/inference_backend.py
+#
+# Selectable YOLO inference backends. Every backend is loaded through
+# ultralytics.YOLO, so predict() returns the same Results objects and the
+# post-processing in video_handler.py does not change.
+#
+#   torch      : resources/weights/<kind>/best.pt            (default)
+#   onnx       : best.onnx, run by ONNX Runtime on CPU
+#   onnx-int8  : best_int8.onnx, static INT8 quantized with frames from our footage
+#   openvino   : best_openvino_model/, run by OpenVINO on CPU (openvino-dev, for export too)
+#
+# python inference_backend.py export <backend> [calibration videos...]
+
+import os
+import sys
+import glob
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino")
+
+WEIGHTS_DIR = "resources/weights"
+MODEL_KINDS = ("detection", "segmentation")
+
+IMG_SIZE = 640
+CALIBRATION_FRAMES = 200
+
+
+# -------------------------------------------------
+# PATHS
+# -------------------------------------------------
+
+def weights_path(kind, backend="torch"):
+
+    base = f"{WEIGHTS_DIR}/{kind}"
+
+    if backend == "torch":
+        return f"{base}/best.pt"
+    if backend == "onnx":
+        return f"{base}/best.onnx"
+    if backend == "onnx-int8":
+        return f"{base}/best_int8.onnx"
+    if backend == "openvino":
+        return f"{base}/best_openvino_model"
+
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+# -------------------------------------------------
+# CALIBRATION DATA
+# -------------------------------------------------
+
+def calibration_frames(videos, n_frames=CALIBRATION_FRAMES):
+    """Evenly spaced frames from our own footage, preprocessed like predict()."""
+
+    per_video = max(1, n_frames // max(1, len(videos)))
+    batches = []
+
+    for path in videos:
+
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        for idx in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+            ret, frame = cap.read()
+            if not ret:
+                continue
+
+            resized = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+            batches.append(rgb.transpose(2, 0, 1)[None].astype(np.float32) / 255.0)
+
+        cap.release()
+
+    if not batches:
+        raise Exception("❌ No calibration frames could be read")
+
+    return batches
+
+
+# -------------------------------------------------
+# EXPORT
+# -------------------------------------------------
+
+def _quantize_int8(fp32_path, int8_path, frames):
+
+    try:
+        import onnx
+        from onnxruntime.quantization import (
+            CalibrationDataReader, QuantFormat, QuantType, quantize_static
+        )
+    except ImportError:
+        raise Exception("❌ onnx / onnxruntime not installed (needed for onnx-int8)")
+
+    class FrameReader(CalibrationDataReader):
+
+        def __init__(self, input_name):
+            self._iter = iter([{input_name: f} for f in frames])
+
+        def get_next(self):
+            return next(self._iter, None)
+
+    model = onnx.load(fp32_path)
+    input_name = model.graph.input[0].name
+
+    quantize_static(
+        fp32_path,
+        int8_path,
+        FrameReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    # Keep the ultralytics metadata (class names, task, stride) on the INT8 model
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(model.metadata_props)
+    onnx.save(quantized, int8_path)
+
+
+def export_backend(backend, calibration_videos=None):
+
+    if backend == "torch":
+        return
+
+    for kind in MODEL_KINDS:
+
+        target = weights_path(kind, backend)
+
+        if os.path.exists(target):
+            print(f"✅ {kind} {backend} weights already exported:", target)
+            continue
+
+        source = YOLO(weights_path(kind))
+
+        # Dynamic input: VideoHandler predicts whole batches, at det_size when roi_crop is on
+        if backend == "openvino":
+            source.export(format="openvino", imgsz=IMG_SIZE, dynamic=True)
+
+        else:
+            fp32_path = weights_path(kind, "onnx")
+
+            if not os.path.exists(fp32_path):
+                source.export(format="onnx", imgsz=IMG_SIZE, dynamic=True, simplify=True)
+
+            if backend == "onnx-int8":
+                if not calibration_videos:
+                    raise Exception("❌ onnx-int8 export needs calibration videos")
+
+                frames = calibration_frames(calibration_videos)
+                _quantize_int8(fp32_path, target, frames)
+
+        print(f"📦 Exported {kind} model for {backend}:", target)
+
+
+# -------------------------------------------------
+# LOAD
+# -------------------------------------------------
+
+_loaded = {}
+
+
+def load_models(backend="torch", device="cpu", slot=0):
+    """
+    Returns (detection_model, segmentation_model) for a backend, loaded once
+    per slot. ultralytics predictors are not safe to share between threads
+    running inference at the same time, so each concurrent worker uses its
+    own slot.
+    """
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    key = (backend, slot)
+
+    if key in _loaded:
+        return _loaded[key]
+
+    models = []
+
+    for kind in MODEL_KINDS:
+
+        path = weights_path(kind, backend)
+
+        if not os.path.exists(path):
+            raise Exception(
+                f"❌ {path} missing - run: python inference_backend.py export {backend}"
+            )
+
+        model = YOLO(path, task="detect" if kind == "detection" else "segment")
+
+        if backend == "torch":
+            model.to(device)
+
+        models.append(model)
+
+    _loaded[key] = tuple(models)
+    return _loaded[key]
+
+
+def predict_device(backend, device):
+    """Exported backends run on CPU; torch keeps the selected device."""
+    return device if backend == "torch" else "cpu"
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < 3 or sys.argv[1] != "export" or sys.argv[2] not in BACKENDS:
+        print("Usage: python inference_backend.py export <torch|onnx|onnx-int8|openvino> [videos...]")
+        sys.exit(1)
+
+    videos = sys.argv[3:] or sorted(glob.glob("video/*/*.mp4"))
+    export_backend(sys.argv[2], videos)
@@ -0,0 +1,165 @@
+# Gasby-Ai/Yolo_service/job_queue.py
+
+import time
+import uuid
+import queue
+import threading
+import traceback
+from collections import OrderedDict
+
+
+# -------------------------------------------------
+# JOB
+# -------------------------------------------------
+
+class Job:
+
+    def __init__(self, params, queue_depth):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self.queue_depth_at_submit = queue_depth
+        self.worker = None
+
+        self.result = None
+        self.error = None
+
+    def wait_sec(self):
+        end = self.started_at or time.time()
+        return round(end - self.submitted_at, 3)
+
+    def run_sec(self):
+        if self.started_at is None:
+            return None
+        end = self.finished_at or time.time()
+        return round(end - self.started_at, 3)
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "payload": self.params.get("payload"),
+            "queue_depth_at_submit": self.queue_depth_at_submit,
+            "worker": self.worker,
+            "submitted_at": round(self.submitted_at, 3),
+            "started_at": round(self.started_at, 3) if self.started_at else None,
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+            "wait_sec": self.wait_sec(),
+            "run_sec": self.run_sec(),
+            "error": self.error
+        }
+
+
+# -------------------------------------------------
+# WORKER POOL
+# -------------------------------------------------
+
+class JobQueue:
+    """
+    Bounded job queue served by a fixed pool of worker threads.
+
+    `handler(params, worker_index, job_id)` does the work and returns a
+    JSON-serialisable result. Submissions beyond `max_queued` are rejected
+    instead of piling up. Only the most recent `keep_finished` finished jobs
+    are retained for status/result lookups.
+    """
+
+    def __init__(self, handler, workers=2, max_queued=16, keep_finished=200):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+
+        with self._lock:
+            if self._threads:
+                return
+
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, args=(i,), daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def running(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == "running")
+
+    def submit(self, params):
+        """Returns the queued Job, or None when the queue is full."""
+
+        self.start()
+
+        job = Job(params, queue_depth=self.depth())
+
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                return None
+            self._jobs[job.id] = job
+
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in ("done", "failed")
+        ]
+
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def _worker(self, index):
+
+        while True:
+
+            job = self._queue.get()
+
+            job.status = "running"
+            job.worker = index
+            job.started_at = time.time()
+
+            print(f"🛠 Worker {index} started job {job.id} (waited {job.wait_sec()}s)")
+
+            try:
+                job.result = self.handler(job.params, index, job.id)
+                job.status = "done"
+            except Exception as e:
+                traceback.print_exc()
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+            print(f"🏁 Job {job.id} {job.status} in {job.run_sec()}s")
+
+            with self._lock:
+                self._prune()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queue_depth": self.depth(),
+            "running": self.running()
+        }
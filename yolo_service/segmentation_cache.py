@@ -0,0 +1,80 @@
+# Gasby-Ai/Yolo_service/segmentation_cache.py
+
+import cv2
+import numpy as np
+
+
+# -------------------------------------------------
+# SEGMENTATION CACHE
+# -------------------------------------------------
+
+class SegmentationCache:
+    """
+    Reuses the last court polygons until the camera view changes.
+
+    The view is compared through a small blurred grayscale thumbnail: the
+    mean absolute difference against the thumbnail of the last segmented
+    frame stays low while players move on a fixed shot, and jumps on a cut
+    or a camera pan. `max_age` (in source frames) forces a periodic refresh
+    so slow zooms cannot drift forever.
+    """
+
+    def __init__(self, enabled=True, threshold=10.0, max_age=300, thumb_size=(64, 36)):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_age = max_age
+        self.thumb_size = thumb_size
+
+        self.polygons = None
+
+        self._anchor_thumb = None
+        self._anchor_frame = None
+
+        self.refreshes = 0
+        self.reuses = 0
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumb, (3, 3), 0).astype(np.float32)
+
+    def _changed(self, frame_index, thumb):
+
+        if not self.enabled or self._anchor_thumb is None:
+            return True
+
+        if frame_index - self._anchor_frame >= self.max_age:
+            return True
+
+        diff = float(np.mean(np.abs(thumb - self._anchor_thumb)))
+        return diff > self.threshold
+
+    def plan(self, indices, frames):
+        """Returns one flag per frame: True if segmentation must run on it."""
+
+        refresh = []
+
+        for frame_index, frame in zip(indices, frames):
+
+            thumb = self._thumbnail(frame) if self.enabled else None
+            changed = self._changed(frame_index, thumb)
+
+            if changed:
+                self._anchor_thumb = thumb
+                self._anchor_frame = frame_index
+                self.refreshes += 1
+            else:
+                self.reuses += 1
+
+            refresh.append(changed)
+
+        return refresh
+
+    def stats(self):
+        total = self.refreshes + self.reuses
+        return {
+            "enabled": self.enabled,
+            "segmentation_runs": self.refreshes,
+            "segmentation_reused": self.reuses,
+            "reuse_ratio": round(self.reuses / total, 3) if total else 0.0
+        }
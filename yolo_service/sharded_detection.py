@@ -0,0 +1,160 @@
+# Gasby-Ai/Yolo_service/sharded_detection.py
+#
+# Time-sharded detection for long videos. The video is split into frame
+# ranges that start on keyframes, every range runs through its own
+# VideoHandler in a worker process (own model instance), and the records
+# are merged back in global frame order.
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from adaptive_sampler import segment_rates
+from common.mp4_index import read_moov, video_keyframes
+
+
+# Shorter shards spend more time loading models than detecting
+MIN_SHARD_SEC = 60
+
+
+# -------------------------------------------------
+# PLANNING
+# -------------------------------------------------
+
+def shard_count(total_frames, fps, shards):
+    """Shards actually used for a video: at most one per MIN_SHARD_SEC, at least one."""
+    return max(1, min(int(shards), total_frames // max(1, int(fps * MIN_SHARD_SEC))))
+
+
+def plan_shards(video_path, total_frames, fps, shards):
+    """
+    [(start, end)] frame ranges covering the video. Boundaries are snapped
+    to the nearest keyframe from the MP4 sync-sample table, so every worker
+    starts with a cheap, exact seek. The last range is open-ended (end
+    None) and reads to end of stream, since CAP_PROP_FRAME_COUNT is only
+    an estimate.
+    """
+
+    n = shard_count(total_frames, fps, shards)
+
+    if n <= 1:
+        return [(0, None)]
+
+    moov = read_moov(video_path)
+    keyframes = video_keyframes(moov) if moov is not None else None
+
+    bounds = [0]
+
+    for k in range(1, n):
+
+        target = k * total_frames // n
+
+        if keyframes is not None and len(keyframes):
+            target = int(keyframes[np.abs(keyframes - target).argmin()])
+
+        if bounds[-1] < target < total_frames:
+            bounds.append(target)
+
+    bounds.append(None)
+
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# -------------------------------------------------
+# WORKERS
+# -------------------------------------------------
+
+def _init_worker(threads):
+    """Splits the CPU between workers instead of every one using all cores."""
+
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _detect_shard(video_path, options, start, end, FRAME_SKIP, fps, total_frames):
+
+    import cv2
+    from video_handler import VideoHandler
+
+    t0 = time.time()
+
+    video = cv2.VideoCapture(video_path)
+
+    if not video.isOpened():
+        raise Exception(f"❌ Shard {start}-{end} failed to open video")
+
+    if start:
+        video.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    handler = VideoHandler(video, **options)
+    records = handler.detect_range(start, end, FRAME_SKIP, fps, total_frames)
+
+    return records, {
+        "start": start,
+        "end": end,
+        "frames": len(records),
+        "wall_sec": round(time.time() - t0, 3),
+        "stages": handler.stage_report
+    }
+
+
+# -------------------------------------------------
+# RUN + MERGE
+# -------------------------------------------------
+
+def run_sharded(video_path, options, shards, FRAME_SKIP, fps, total_frames, workers=None):
+    """Returns (frame_level_data, stage_report) for the whole video."""
+
+    workers = min(len(shards), workers or int(os.environ.get("YOLO_SHARD_WORKERS") or len(shards)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    print(f"🧩 Sharded detection: {len(shards)} shards on {workers} processes")
+
+    t0 = time.time()
+
+    # spawn: CUDA and the pipeline threads do not survive fork
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,)
+    ) as pool:
+
+        futures = [
+            pool.submit(_detect_shard, video_path, options, start, end, FRAME_SKIP, fps, total_frames)
+            for start, end in shards
+        ]
+
+        results = [future.result() for future in futures]
+
+    frame_level_data = []
+    shard_reports = []
+
+    # Shards are disjoint and in time order, so concatenation is global order
+    for records, report in results:
+        frame_level_data.extend(records)
+        shard_reports.append(report)
+
+    frames = [record["frame"] for record in frame_level_data]
+
+    if any(b <= a for a, b in zip(frames, frames[1:])):
+        raise Exception("❌ Sharded detection produced out-of-order frames")
+
+    stage_report = {
+        "wall_sec": round(time.time() - t0, 3),
+        "workers": workers,
+        "shards": shard_reports,
+        "sampling": {
+            "mode": options["sampling"],
+            "stride": FRAME_SKIP,
+            "samples": len(frame_level_data),
+            "segments": segment_rates(frames, fps, total_frames)
+        }
+    }
+
+    return frame_level_data, stage_report
@@ -0,0 +1,159 @@
+# Gasby-Ai/Yolo_service/team_palette.py
+
+import cv2
+import numpy as np
+
+from common.jersey import JERSEY_Y, JERSEY_X
+
+
+# -------------------------------------------------
+# JERSEY REGION STATS
+# -------------------------------------------------
+
+
+def to_lab(bgr):
+    """(N, 3) BGR values in 0-255 -> (N, 3) float32 CIELAB."""
+
+    bgr = np.asarray(bgr, dtype=np.float32).reshape(-1, 1, 3) / 255.0
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB).reshape(-1, 3)
+
+
+def jersey_colors(frame, boxes):
+    """
+    Mean jersey color of every box in one pass.
+
+    Uses a single integral image of the frame, so each box costs four
+    lookups regardless of its size. Returns (lab_means, valid) where
+    `valid` is False for boxes with no pixels inside the frame.
+    """
+
+    if len(boxes) == 0:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=bool)
+
+    h, w = frame.shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float64)
+
+    bx1 = np.clip(boxes[:, 0].astype(np.int64), 0, w)
+    by1 = np.clip(boxes[:, 1].astype(np.int64), 0, h)
+    bx2 = np.clip(boxes[:, 2].astype(np.int64), 0, w)
+    by2 = np.clip(boxes[:, 3].astype(np.int64), 0, h)
+
+    valid = (bx2 > bx1) & (by2 > by1)
+
+    bw = bx2 - bx1
+    bh = by2 - by1
+
+    x1 = bx1 + (bw * JERSEY_X[0]).astype(np.int64)
+    x2 = np.maximum(bx1 + (bw * JERSEY_X[1]).astype(np.int64), x1 + 1)
+    y1 = by1 + (bh * JERSEY_Y[0]).astype(np.int64)
+    y2 = np.maximum(by1 + (bh * JERSEY_Y[1]).astype(np.int64), y1 + 1)
+
+    x2 = np.minimum(x2, w)
+    y2 = np.minimum(y2, h)
+    x1 = np.minimum(x1, x2 - 1).clip(0)
+    y1 = np.minimum(y1, y2 - 1).clip(0)
+
+    integral = cv2.integral(frame, sdepth=cv2.CV_64F)
+
+    sums = (
+        integral[y2, x2] - integral[y1, x2]
+        - integral[y2, x1] + integral[y1, x1]
+    )
+    area = ((y2 - y1) * (x2 - x1)).clip(1).astype(np.float64)
+
+    means = sums / area[:, None]
+
+    return to_lab(means), valid
+
+
+# -------------------------------------------------
+# PER-VIDEO PALETTE
+# -------------------------------------------------
+
+class TeamPalette:
+    """
+    Team colors learned from the video itself.
+
+    The palette starts from the requested team colors (names from
+    `normalize_team_colors`) and is refined once with seeded k-means on the
+    first `fit_samples` jersey colors, so each cluster keeps its team name
+    while its center moves to how that jersey actually looks under the
+    venue's lighting and camera.
+    """
+
+    def __init__(self, team_colors, fit_samples=300, iterations=10):
+        self.names = list(team_colors.keys())
+        self.seeds = to_lab(list(team_colors.values())) if self.names else None
+
+        self.fit_samples = fit_samples
+        self.iterations = iterations
+
+        self.centers = None
+        self._samples = []
+        self._sample_count = 0
+
+    @property
+    def enabled(self):
+        return bool(self.names)
+
+    @property
+    def ready(self):
+        return self.centers is not None
+
+    def observe(self, lab_values):
+
+        if self.ready or len(lab_values) == 0:
+            return
+
+        self._samples.append(np.asarray(lab_values, dtype=np.float32))
+        self._sample_count += len(lab_values)
+
+        if self._sample_count >= self.fit_samples:
+            self.fit()
+
+    def fit(self):
+
+        centers = self.seeds.copy()
+
+        if self._samples:
+
+            samples = np.concatenate(self._samples)
+
+            for _ in range(self.iterations):
+
+                labels = self._nearest(samples, centers)
+                updated = centers.copy()
+
+                for k in range(len(centers)):
+                    members = samples[labels == k]
+                    if len(members):
+                        updated[k] = members.mean(axis=0)
+
+                if np.allclose(updated, centers, atol=0.5):
+                    centers = updated
+                    break
+
+                centers = updated
+
+        self.centers = centers
+        self._samples = []
+
+    @staticmethod
+    def _nearest(values, centers):
+        dists = ((values[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        return dists.argmin(axis=1)
+
+    def classify(self, lab_values):
+
+        if len(lab_values) == 0:
+            return []
+
+        labels = self._nearest(np.asarray(lab_values, dtype=np.float32), self.centers)
+        return [self.names[k] for k in labels]
+
+    def stats(self):
+        return {
+            "teams": self.names,
+            "fitted": self.ready,
+            "centers_lab": self.centers.round(1).tolist() if self.ready else None
+        }
@@ -1,11 +1,26 @@
 # Gasby-Ai/Yolo_service/video_handler.py
 import os
+import sys
 import cv2
 import json
+import time
 import torch
+import multiprocessing
 import numpy as np
-from ultralytics import YOLO
-from shapely.geometry import Point, Polygon
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_pipeline import FramePipeline
+from frame_reader import SampledFrameReader
+from segmentation_cache import SegmentationCache
+from court_zones import ZoneMask
+from team_palette import TeamPalette, jersey_colors
+from adaptive_sampler import AdaptiveSampler, segment_rates
+from inference_backend import load_models, predict_device
+from court_roi import court_roi, crop_letterbox
+from sharded_detection import plan_shards, run_sharded
+from common.detection_format import write_detections, DETECTION_NPZ, DETECTION_JSON
+from common.detection_stream import DetectionStreamWriter, DetectionStream, DETECTION_STREAM, CHUNK_FRAMES
 
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
 
@@ -26,31 +41,34 @@ print("🔥 YOLO Running On:", DEVICE)
 # LOAD MODELS
 # -------------------------------------------------
 
-detection_model = YOLO("resources/weights/detection/best.pt")
-segmentation_model = YOLO("resources/weights/segmentation/best.pt")
+DEFAULT_BACKEND = os.environ.get("YOLO_BACKEND", "torch")
+
+# Only the serving process warms the default backend. Shard workers import
+# this module too; each loads just the backend its job asked for, when its
+# VideoHandler is built.
+if multiprocessing.parent_process() is None:
 
-detection_model.to(DEVICE)
-segmentation_model.to(DEVICE)
+    detection_model, segmentation_model = load_models(DEFAULT_BACKEND, DEVICE)
 
-print("📦 Detection Classes:", detection_model.names)
-print("📦 Segmentation Classes:", segmentation_model.names)
+    print("🧩 Inference Backend:", DEFAULT_BACKEND)
+    print("📦 Detection Classes:", detection_model.names)
+    print("📦 Segmentation Classes:", segmentation_model.names)
 
 
 # -------------------------------------------------
-# COLOR MATCHING
+# SAMPLING GRID
 # -------------------------------------------------
 
-def closest_color(avg_bgr, team_colors):
-    min_dist = float("inf")
-    best_team = "unknown"
+def frame_skip(total_frames, fps):
+    """Fixed sampling stride: denser for short clips."""
 
-    for team_name, color_bgr in team_colors.items():
-        dist = np.linalg.norm(np.array(avg_bgr) - np.array(color_bgr))
-        if dist < min_dist:
-            min_dist = dist
-            best_team = team_name
+    duration = total_frames / fps
+    return 5 if duration < 60 else 10 if duration < 180 else 15
 
-    return best_team
+
+def _grid_start(start, step):
+    """First multiple of `step` at or after `start`."""
+    return -(-start // step) * step
 
 
 # -------------------------------------------------
@@ -59,165 +77,486 @@ def closest_color(avg_bgr, team_colors):
 
 class VideoHandler:
 
-    def __init__(self, video, team_colors):
+    def __init__(self, video, team_colors, batch_size=1, queue_size=32, seek_gap=0,
+                 segmentation_cache=True, debug_json=False, sampling="fixed",
+                 backend=DEFAULT_BACKEND, roi_crop=False, det_size=640, model_slot=0,
+                 frame_ready=None, video_path=None, shards=1, stream=False, stream_sink=None,
+                 chunk_frames=CHUNK_FRAMES):
         self.video = video
+        self.stream = stream
+        self.stream_sink = stream_sink
+        self.chunk_frames = int(chunk_frames)
+        self._stream = None
+        self.video_path = video_path
+        self.shards = int(shards) if video_path else 1
+        self.roi_crop = roi_crop
+        self.det_size = int(det_size)
+        self.roi_stats = {"cropped": 0, "full_frame": 0}
+        self.inference_split = {"segmentation_sec": 0.0, "detection_sec": 0.0}
+        self.backend = backend
+        self.device = predict_device(backend, DEVICE)
+        self.detection_model, self.segmentation_model = load_models(backend, DEVICE, model_slot)
+        self.sampling = sampling
+        self.debug_json = debug_json
+        self.reader = SampledFrameReader(video, seek_gap=seek_gap, ready=frame_ready)
+        self.seg_cache = SegmentationCache(enabled=segmentation_cache)
         self.team_colors = team_colors
+        self.palette = TeamPalette(team_colors)
+        self._pending_teams = []
+        self.batch_size = max(1, int(batch_size))
+        self.queue_size = max(1, int(queue_size))
+        self.stage_report = {}
+
+        self._zone_mask_source = None
+        self._zone_mask_cached = None
+
+    # ----------------------------
+    # BATCHED INFERENCE
+    # ----------------------------
+
+    def _detect_batch(self, frames):
+        """Run object detection on a list of frames in one call."""
+
+        return self.detection_model.predict(
+            frames,
+            conf=0.25,
+            imgsz=self.det_size,
+            device=self.device,
+            verbose=False
+        )
+
+    @staticmethod
+    def _detection_arrays(det_results):
+        """(xyxy float32 Nx4, class ids) from an ultralytics Results object."""
+
+        if det_results.boxes is None or len(det_results.boxes) == 0:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        return (
+            det_results.boxes.xyxy.cpu().numpy(),
+            det_results.boxes.cls.cpu().numpy().astype(np.int64)
+        )
+
+    def _segment_batch(self, frames):
+        """Run court segmentation on a list of 640x640 frames in one call."""
+
+        if not frames:
+            return []
+
+        return self.segmentation_model.predict(
+            frames,
+            conf=0.25,
+            device=self.device,
+            verbose=False
+        )
+
+    def _segmentation_records(self, seg_results):
+
+        segmentation_data = []
+
+        if seg_results.masks is not None:
+
+            for mask_xy, box in zip(seg_results.masks.xy, seg_results.boxes):
+
+                cls = int(box.cls[0])
+                class_name = self.segmentation_model.names[cls]
+
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+
+                segmentation_data.append({
+                    "class": class_name,
+                    "bbox": [float(x1), float(y1), float(x2), float(y2)],
+                    "polygon": mask_xy.tolist()
+                })
+
+        return segmentation_data
+
+    # ----------------------------
+    # PIPELINE STAGES
+    # ----------------------------
+
+    def _sampled_frames(self, frames):
+        """
+        Decode stage: yields (frame_index, 640x640 frame, original) for
+        sampled frames. The full-resolution original is only kept when the
+        court ROI crop needs it.
+        """
+
+        for frame_index, frame in frames:
+            yield (
+                frame_index,
+                cv2.resize(frame, (640, 640)),
+                frame if self.roi_crop else None
+            )
+
+    def _infer_items(self, items):
+        """
+        Inference stage: one batched detection call for a group of frames.
+        Segmentation only runs on the frames where the court view changed;
+        the others reuse the cached polygons.
+        """
+
+        indices = [item[0] for item in items]
+        frames = [item[1] for item in items]
+        originals = [item[2] for item in items]
+
+        t0 = time.perf_counter()
+
+        refresh = self.seg_cache.plan(indices, frames)
+        seg_batch = iter(self._segment_batch(
+            [resized for resized, needed in zip(frames, refresh) if needed]
+        ))
+
+        t1 = time.perf_counter()
+
+        segmentation = []
+
+        for needed in refresh:
+            if needed:
+                self.seg_cache.polygons = self._segmentation_records(next(seg_batch))
+            segmentation.append(self.seg_cache.polygons)
+
+        if self.roi_crop:
+            detections = self._detect_court_roi(originals, segmentation)
+        else:
+            detections = [
+                self._detection_arrays(r) for r in self._detect_batch(frames)
+            ]
+
+        self.inference_split["segmentation_sec"] += t1 - t0
+        self.inference_split["detection_sec"] += time.perf_counter() - t1
+
+        return indices, frames, detections, segmentation
+
+    def _detect_court_roi(self, originals, segmentation):
+        """
+        Detection on the court region only: each original frame is cropped
+        to the court found by segmentation, letterboxed to det_size, and the
+        boxes are mapped back to the 640x640 record coordinates.
+        """
+
+        inputs, transforms = [], []
+
+        for original, segmentation_data in zip(originals, segmentation):
+
+            roi = court_roi(segmentation_data, original.shape)
+            canvas, transform = crop_letterbox(original, roi, self.det_size)
+
+            self.roi_stats["cropped" if roi is not None else "full_frame"] += 1
+
+            inputs.append(canvas)
+            transforms.append(transform)
+
+        detections = []
+
+        for det_results, transform in zip(self._detect_batch(inputs), transforms):
+            xyxy, classes = self._detection_arrays(det_results)
+            detections.append((transform.map_boxes(xyxy), classes))
+
+        return detections
+
+    def _postprocess_items(self, result, frame_level_data, sampled):
+        """
+        Post-process stage: builds player/ball/rim/segmentation records.
+        When streaming, records go to the stream writer instead of the list.
+        """
+
+        indices, frames, detections, segmentation = result
+
+        for frame_index, resized, frame_detections, segmentation_data in zip(
+            indices, frames, detections, segmentation
+        ):
+            record = self._build_frame_record(frame_index, resized, frame_detections, segmentation_data)
+            sampled.append(frame_index)
+
+            if self._stream is None:
+                frame_level_data.append(record)
+            else:
+                self._stream.append(record)
+
+        # Chunks are held back while team labels are still pending
+        if self._stream is not None and not self._pending_teams:
+            self._stream.flush(full_only=True)
+
+        return len(indices)
+
+    # ----------------------------
+    # FRAME LOOP
+    # ----------------------------
 
     def run_detectors(self, source):
 
         fps = self.video.get(cv2.CAP_PROP_FPS) or 30
         total_frames = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
 
-        FRAME_SKIP = 5 if duration < 60 else 10 if duration < 180 else 15
+        FRAME_SKIP = frame_skip(total_frames, fps)
 
-        frame_count = 0
-        frame_level_data = []
+        shards = plan_shards(self.video_path, total_frames, fps, self.shards) if self.shards > 1 else []
 
-        while self.video.isOpened():
+        if self.stream:
+            self._stream = DetectionStreamWriter(
+                f"{source}/{DETECTION_STREAM}", self.chunk_frames,
+                sink=self.stream_sink, jsonl=self.debug_json
+            )
 
-            ret, frame = self.video.read()
-            if not ret:
-                break
+        if len(shards) > 1:
 
-            if frame_count % FRAME_SKIP != 0:
-                frame_count += 1
-                continue
+            # Each shard re-opens the file in its own process
+            self.video.release()
 
-            resized = cv2.resize(frame, (640, 640))
+            frame_level_data, self.stage_report = run_sharded(
+                self.video_path, self.shard_options(), shards, FRAME_SKIP, fps, total_frames
+            )
 
-            # ----------------------------
-            # 1️⃣ OBJECT DETECTION
-            # ----------------------------
+            # Shards return whole ranges, so the stream is written once they merge
+            if self._stream is not None:
+                for record in frame_level_data:
+                    self._stream.append(record)
 
-            det_results = detection_model.predict(
-                resized,
-                conf=0.25,
-                verbose=False
-            )[0]
+        else:
+            # Open-ended: read to end of stream, CAP_PROP_FRAME_COUNT is only an estimate
+            frame_level_data = self.detect_range(0, None, FRAME_SKIP, fps, total_frames)
 
-            # ----------------------------
-            # 2️⃣ SEGMENTATION
-            # ----------------------------
+        if self._stream is not None:
+            return self._close_stream(source)
 
-            seg_results = segmentation_model.predict(
-                resized,
-                conf=0.25,
-                verbose=False
-            )[0]
+        print("⏱ Pipeline Stages:", json.dumps(self.stage_report))
 
-            segmentation_data = []
+        write_detections(f"{source}/{DETECTION_NPZ}", frame_level_data)
 
-            if seg_results.masks is not None:
+        if self.debug_json:
+            with open(f"{source}/{DETECTION_JSON}", "w") as f:
+                json.dump(frame_level_data, f, indent=4)
 
-                for mask_xy, box in zip(seg_results.masks.xy, seg_results.boxes):
+        print("✅ Frame-level Detection Ready (NPZ" + (" + debug JSON)" if self.debug_json else ")"))
 
-                    cls = int(box.cls[0])
-                    class_name = segmentation_model.names[cls]
+        return frame_level_data
 
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+    def _close_stream(self, source):
 
-                    segmentation_data.append({
-                        "class": class_name,
-                        "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                        "polygon": mask_xy.tolist()
-                    })
+        writer, self._stream = self._stream, None
+        writer.close()
 
-            # ----------------------------
-            # 3️⃣ PROCESS DETECTIONS
-            # ----------------------------
+        self.stage_report["stream"] = writer.stats()
 
-            players = []
-            ball = None
-            rim = None
+        print("⏱ Pipeline Stages:", json.dumps(self.stage_report))
+        print("✅ Frame-level Detection Stream Ready (%d chunks)" % len(writer.chunks))
 
-            if det_results.boxes is not None:
+        return DetectionStream(f"{source}/{DETECTION_STREAM}")
 
-                for box in det_results.boxes:
+    def shard_options(self):
+        """Constructor arguments a shard worker needs to rebuild this handler."""
+
+        return {
+            "team_colors": self.team_colors,
+            "batch_size": self.batch_size,
+            "queue_size": self.queue_size,
+            "seek_gap": self.reader.seek_gap,
+            "segmentation_cache": self.seg_cache.enabled,
+            "sampling": self.sampling,
+            "backend": self.backend,
+            "roi_crop": self.roi_crop,
+            "det_size": self.det_size
+        }
+
+    def detect_range(self, start, end, FRAME_SKIP, fps, total_frames):
+        """
+        Runs the pipeline on frames [start, end) and returns their records
+        (empty when they went to the stream writer). `end=None` reads to the
+        end of the stream. The fixed-stride grid is global, so a range
+        yields exactly the frames a full run would sample there.
+        """
+
+        span = (total_frames if end is None else end) - start
+
+        # ----------------------------
+        # SAMPLING
+        # ----------------------------
+
+        sampler = None
+
+        if self.sampling == "adaptive":
+
+            min_stride = max(1, FRAME_SKIP // 3)
+
+            # Same number of inferences as the fixed stride, spent by motion
+            sampler = AdaptiveSampler(
+                budget=-(-span // FRAME_SKIP),
+                total_frames=span,
+                min_stride=min_stride,
+                max_stride=FRAME_SKIP * 3,
+                fps=fps
+            )
+            frames = sampler.frames(self.reader, _grid_start(start, min_stride), end)
+
+        else:
+            frames = self.reader.every(FRAME_SKIP, _grid_start(start, FRAME_SKIP), end)
+
+        frame_level_data = []
+        sampled = []
 
-                    cls = int(box.cls[0])
-                    label = detection_model.names[cls].lower()
+        pipeline = FramePipeline(queue_size=self.queue_size)
 
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        try:
+            pipeline.run(
+                produce=self._sampled_frames(frames),
+                infer=self._infer_items,
+                postprocess=lambda result: self._postprocess_items(result, frame_level_data, sampled),
+                batch_size=self.batch_size
+            )
+        finally:
+            self.video.release()
 
-                    cx = (x1 + x2) / 2
-                    cy = (y1 + y2) / 2
+        self._flush_pending_teams()
 
-                    # FOOT POSITION (important for zone detection)
-                    foot_point = Point(cx, y2)
+        self.stage_report = pipeline.report()
+        self.stage_report["reader"] = self.reader.stats()
+        self.stage_report["segmentation_cache"] = self.seg_cache.stats()
+        self.stage_report["team_palette"] = self.palette.stats()
+        self.stage_report["inference_split"] = {
+            name: round(sec, 3) for name, sec in self.inference_split.items()
+        }
 
-                    # ----------------------------
-                    # PLAYER
-                    # ----------------------------
+        if self.roi_crop:
+            self.stage_report["court_roi"] = dict(self.roi_stats, det_size=self.det_size)
 
-                    if "person" in label or "player" in label:
+        if sampler is not None:
+            self.stage_report["sampling"] = sampler.report(total_frames)
+        else:
+            self.stage_report["sampling"] = {
+                "mode": "fixed",
+                "stride": FRAME_SKIP,
+                "samples": len(sampled),
+                "segments": segment_rates(sampled, fps, total_frames)
+            }
 
-                        zone = "unknown"
+        return frame_level_data
 
-                        for seg in segmentation_data:
-                            polygon = Polygon(seg["polygon"])
+    # ----------------------------
+    # PER-FRAME POST-PROCESSING
+    # ----------------------------
 
-                            if polygon.contains(foot_point):
+    def _assign_teams(self, players, jersey, valid):
+        """
+        Labels players against the per-video palette. Until enough jerseys
+        have been seen to fit it, frames are held back and labelled as soon
+        as the palette is ready.
+        """
 
-                                if seg["class"] == "paint":
-                                    zone = "paint"
+        self.palette.observe(jersey[valid])
 
-                                elif seg["class"] == "three point line":
-                                    zone = "three_point"
+        if not self.palette.ready:
+            self._pending_teams.append((players, jersey, valid))
+            return
 
-                                elif seg["class"] == "center-circle":
-                                    zone = "center_circle"
+        self._flush_pending_teams()
 
-                        crop = resized[int(y1):int(y2), int(x1):int(x2)]
+        for player, team, ok in zip(players, self.palette.classify(jersey), valid):
+            if ok:
+                player["team"] = team
 
-                        if crop.size != 0:
-                            avg_color = crop.mean(axis=(0, 1))
-                            team = closest_color(avg_color, self.team_colors)
-                        else:
-                            team = "unknown"
+    def _flush_pending_teams(self):
 
-                        players.append({
-                            "center": [float(cx), float(cy)],
-                            "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                            "team": team,
-                            "zone": zone
-                        })
+        if not self._pending_teams:
+            return
 
-                    # ----------------------------
-                    # BALL
-                    # ----------------------------
+        if not self.palette.ready:
+            self.palette.fit()
 
-                    if "ball" in label:
-                        ball = [float(cx), float(cy)]
+        pending, self._pending_teams = self._pending_teams, []
 
-                    # ----------------------------
-                    # RIM
-                    # ----------------------------
+        for players, jersey, valid in pending:
+            for player, team, ok in zip(players, self.palette.classify(jersey), valid):
+                if ok:
+                    player["team"] = team
 
-                    if "rim" in label or "basket" in label:
-                        rim = [float(cx), float(cy)]
+    def _zone_mask(self, segmentation_data, shape):
+        """Rasterizes the court polygons once per segmentation result."""
+
+        if self._zone_mask_source is not segmentation_data:
+            self._zone_mask_cached = ZoneMask(segmentation_data, shape)
+            self._zone_mask_source = segmentation_data
+
+        return self._zone_mask_cached
+
+    def _build_frame_record(self, frame_count, resized, detections, segmentation_data):
+
+        # ----------------------------
+        # PROCESS DETECTIONS
+        # ----------------------------
+
+        players = []
+        foot_points = []
+        ball = None
+        rim = None
+
+        xyxy, classes = detections
+
+        for (x1, y1, x2, y2), cls in zip(xyxy, classes):
+
+            label = self.detection_model.names[int(cls)].lower()
+
+            cx = (x1 + x2) / 2
+            cy = (y1 + y2) / 2
+
+            # ----------------------------
+            # PLAYER
+            # ----------------------------
+
+            if "person" in label or "player" in label:
+
+                # FOOT POSITION (important for zone detection)
+                foot_points.append((cx, y2))
+
+                players.append({
+                    "center": [float(cx), float(cy)],
+                    "bbox": [float(x1), float(y1), float(x2), float(y2)],
+                    "team": "unknown",
+                    "zone": "unknown"
+                })
 
             # ----------------------------
-            # SAVE FRAME DATA
+            # BALL
             # ----------------------------
 
-            frame_level_data.append({
-                "frame": frame_count,
-                "players": players,
-                "ball": ball,
-                "rim": rim,
-                "segmentation": segmentation_data
-            })
+            if "ball" in label:
+                ball = [float(cx), float(cy)]
+
+            # ----------------------------
+            # RIM
+            # ----------------------------
+
+            if "rim" in label or "basket" in label:
+                rim = [float(cx), float(cy)]
+
+        # ----------------------------
+        # ZONES (one mask lookup for all players)
+        # ----------------------------
+
+        if players and segmentation_data:
+
+            zone_mask = self._zone_mask(segmentation_data, resized.shape[:2])
 
-            frame_count += 1
+            for player, zone in zip(players, zone_mask.lookup(foot_points)):
+                player["zone"] = zone
 
-        self.video.release()
+        # ----------------------------
+        # TEAMS (batched jersey colors)
+        # ----------------------------
 
-        output_path = f"{source}/frame_level_detection.json"
+        if players and self.palette.enabled:
 
-        with open(output_path, "w") as f:
-            json.dump(frame_level_data, f, indent=4)
+            jersey, valid = jersey_colors(resized, [p["bbox"] for p in players])
+            self._assign_teams(players, jersey, valid)
 
-        print("✅ Frame-level Detection Ready (With Segmentation JSON)")
+        # ----------------------------
+        # SAVE FRAME DATA
+        # ----------------------------
 
-        return frame_level_data
\ No newline at end of file
+        return {
+            "frame": frame_count,
+            "players": players,
+            "ball": ball,
+            "rim": rim,
+            "segmentation": segmentation_data
+        }